@@ -1,1736 +1,6108 @@
-import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
-import json
-import platform
-import os
-import threading
-import numpy as np
-import simpleaudio as sa
-from reportlab.pdfgen import canvas as pdf_canvas
-from reportlab.lib.pagesizes import A4
-import time
-import mido
-import sys
-import configparser
-
-# Ensure 'python-rtmidi' is available
-try:
-    import rtmidi  # Required for mido to access MIDI ports
-except ImportError:
-    print("The 'python-rtmidi' library is required for MIDI functionality.")
-    sys.exit(1)
-
-
-class PianoKey:
-    """Class representing a single piano key."""
-
-    def __init__(self, canvas, x, y, width, height, color, is_black=False,
-                 note_name=None, frequency=None, midi_note=None, app=None):
-        self.canvas = canvas
-        self.is_black = is_black
-        self.selected = False
-        self.original_color = color
-        self.note_name = note_name
-        self.frequency = frequency
-        self.midi_note = midi_note
-        self.app = app  # Reference to the main application
-
-        # Draw the key on the canvas
-        self.rect = canvas.create_rectangle(x, y, x + width, y + height,
-                                            fill=color, outline="black", width=1)
-
-        # Bind mouse click to the key
-        canvas.tag_bind(self.rect, "<Button-1>", self.on_click)
-
-    def on_click(self, event):
-        if not self.selected:
-            # Mark the key as selected
-            self.selected = True
-            self.canvas.itemconfig(self.rect, fill="blue")
-        else:
-            # Deselect the key
-            self.selected = False
-            self.canvas.itemconfig(self.rect, fill=self.original_color)
-        # Play the note if not muted
-        if not self.app.is_muted:
-            self.app.play_note_wrapper(self)
-        # Update button states
-        self.app.update_button_states()
-
-
-class SavedKeyboard:
-    """Class representing a saved keyboard (chord)."""
-
-    def __init__(self, canvas, chord_name, key_states):
-        self.canvas = canvas
-        self.chord_name = chord_name
-        self.key_states = key_states
-        self.border_rect = None  # For highlighting during playback
-
-
-class ScrollFrame(tk.Frame):
-    """A scrollable frame class for Tkinter."""
-
-    def __init__(self, parent, *args, **kwargs):
-        super().__init__(parent, *args, **kwargs)
-
-        # Create a canvas object and a vertical scrollbar for scrolling
-        self.vscrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL)
-        self.vscrollbar.pack(fill=tk.Y, side=tk.RIGHT, expand=False)
-        self.canvas = tk.Canvas(self, bd=0, highlightthickness=0,
-                                yscrollcommand=self.vscrollbar.set)
-        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        self.vscrollbar.config(command=self.canvas.yview)
-
-        # Create a frame inside the canvas which will be scrolled
-        self.scrollable_frame = tk.Frame(self.canvas)
-        # Store the window item ID
-        self.window_item = self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor='nw')
-
-        # Bind events to make sure the scrollable frame resizes properly
-        self.scrollable_frame.bind("<Configure>", self.on_frame_configure)
-        self.canvas.bind("<Configure>", self.on_canvas_configure)
-
-        # Bind mousewheel events
-        self.bind_mousewheel(self.canvas)
-
-    def on_frame_configure(self, event):
-        # Update the scroll region to encompass the inner frame
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-
-    def on_canvas_configure(self, event):
-        # Resize the inner frame to match the canvas size
-        canvas_width = event.width
-        self.canvas.itemconfigure(self.window_item, width=canvas_width)
-
-    def bind_mousewheel(self, widget):
-        # Cross-platform scrolling
-        widget.bind("<Enter>", lambda _: widget.bind_all("<MouseWheel>", self._on_mousewheel))
-        widget.bind("<Leave>", lambda _: widget.unbind_all("<MouseWheel>"))
-
-    def _on_mousewheel(self, event):
-        # Handle mousewheel scrolling
-        if platform.system() == 'Windows':
-            delta = int(-1 * (event.delta / 120))
-        elif platform.system() == 'Darwin':
-            delta = int(-1 * event.delta)
-        else:
-            delta = 1 if event.num == 5 else -1
-        self.canvas.yview_scroll(delta, "units")
-
-
-class PianoApp:
-    def __init__(self, root):
-        self.root = root
-
-        # Initialize configuration
-        self.config = configparser.ConfigParser()
-        self.load_settings()
-
-        # Initialize language variable
-        self.language_var = tk.StringVar(value=self.config.get('Settings', 'language', fallback='en'))
-        self.language_var.trace('w', self.change_language)
-
-        # Translation dictionary
-        self.translations = {
-            'en': {
-                'title': "Pianoman v1.0 by FvD",
-                'song_name': "Song Name",
-                'number_of_octaves': "Number of Octaves",
-                'next_chord': "Next Chord",
-                'save_chord': "Save Chord",
-                'play_chord': "Play Chord",
-                'clear_chord': "Clear Chord",
-                'delete_chord': "Delete Chord",
-                'play_song': "Play Song",
-                'stop_song': "Stop Song",
-                'mute_input': "Mute Input",
-                'unmute_input': "Unmute Input",
-                'what_chord': "What Chord?",
-                'pc_volume': "PC Volume:",
-                'midi_volume': "MIDI Volume:",
-                'chord_speed': "Chord Speed:",
-                'song_speed': "Song Speed:",
-                'help': "Help",
-                'file_menu': "File",
-                'edit_menu': "Edit",
-                'playback_menu': "Playback",
-                'options_menu': "Options",
-                'language_menu': "Language / Taal",
-                'new_song': "New Song",
-                'load_song': "Load Song",
-                'save_song': "Save Song",
-                'save_song_as': "Save Song As",
-                'save_as_pdf': "Save as PDF",
-                'print_pdf': "Print PDF",
-                'exit': "Exit",
-                'unsaved_changes_message': "You have unsaved changes. Do you want to save before exiting?",
-                'save_song_prompt': "The song has not been saved yet. Do you want to save before exiting?",
-                'delete_chord_message': "There is no chord in edit mode to delete.",
-                'playing': "Playing:",
-                'playback_stopped': "Playback stopped.",
-                'invalid_note': "The note is out of MIDI range after octave adjustment.",
-                'invalid_note_title': "Invalid Note",
-                'chord_not_recognized': "Chord not recognized.",
-                'chord_recognition_title': "Chord Recognition",
-                'edit_keys_message': "Edit keys and press Save Chord when finished.",
-                # Add other translations as needed
-            },
-            'nl': {
-                'title': "Pianoman v1.0 door FvD",
-                'song_name': "Liednaam",
-                'number_of_octaves': "Aantal Octaven",
-                'next_chord': "Volgend Akkoord",
-                'save_chord': "Akkoord Opslaan",
-                'play_chord': "Speel Akkoord",
-                'clear_chord': "Wis Akkoord",
-                'delete_chord': "Verwijder Akkoord",
-                'play_song': "Speel Lied",
-                'stop_song': "Stop Lied",
-                'mute_input': "Geluid Uit",
-                'unmute_input': "Geluid Aan",
-                'what_chord': "Welk Akkoord?",
-                'pc_volume': "PC Volume:",
-                'midi_volume': "MIDI Volume:",
-                'chord_speed': "Akkoordsnelheid:",
-                'song_speed': "Liedsnelheid:",
-                'help': "Help",
-                'file_menu': "Bestand",
-                'edit_menu': "Bewerken",
-                'playback_menu': "Afspelen",
-                'options_menu': "Opties",
-                'language_menu': "Taal / Language",
-                'new_song': "Nieuw Lied",
-                'load_song': "Laad Lied",
-                'save_song': "Bewaar Lied",
-                'save_song_as': "Bewaar Lied Als",
-                'save_as_pdf': "Bewaar als PDF",
-                'print_pdf': "Print PDF",
-                'exit': "Afsluiten",
-                'unsaved_changes_message': "Je hebt niet-opgeslagen wijzigingen. Wil je opslaan voor het afsluiten?",
-                'save_song_prompt': "Het lied is nog niet opgeslagen. Wil je opslaan voor het afsluiten?",
-                'delete_chord_message': "Er is geen akkoord in bewerkingsmodus om te verwijderen.",
-                'playing': "Speelt:",
-                'playback_stopped': "Afspelen gestopt.",
-                'invalid_note': "De noot ligt buiten het MIDI-bereik na octaafaanpassing.",
-                'invalid_note_title': "Ongeldige Noot",
-                'chord_not_recognized': "Akkoord niet herkend.",
-                'chord_recognition_title': "Akkoordherkenning",
-                'edit_keys_message': "Bewerk toetsen en druk op Akkoord Opslaan wanneer klaar.",
-                # Add other translations as needed
-            }
-        }
-
-        # Set window title
-        self.root.title(self.translations[self.language_var.get()]['title'])
-
-        # Number of octaves (from settings, default is 4)
-        self.octaves = self.config.getint('Settings', 'number_of_octaves', fallback=4)
-
-        # Key dimensions
-        self.white_key_width = 20
-        self.white_key_height = 100
-        self.black_key_width = 12
-        self.black_key_height = 60
-
-        # Calculate total width of a keyboard
-        total_white_keys = self.octaves * 7
-        keyboard_width = total_white_keys * self.white_key_width + 20  # Extra 20 pixels for margin
-        keyboard_height = 150  # Height of the input keyboard canvas
-
-        # Set main window dimensions
-        window_width = int(2 * keyboard_width) + 50  # Extra margin for scrollbars and borders
-        window_height = int(5 * keyboard_height) + 250  # Adjusted to fit new buttons
-        self.root.geometry(f"{window_width}x{window_height}")
-
-        # Handle window close event
-        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
-
-        # Flag to track unsaved changes
-        self.unsaved_changes = False
-        self.song_saved = False  # Tracks if the song has been saved at least once
-        self.current_song_file = None  # Stores the current song file path
-
-        # Variable to store the last saved PDF file path
-        self.last_pdf_file = None
-
-        # Mute status
-        self.is_muted = False
-
-        # Output method (PC Audio or MIDI)
-        self.output_method = tk.StringVar(value=self.config.get('Settings', 'output_method', fallback="PC Audio"))
-        self.output_method.trace("w", self.update_midi_instrument_menu_state)  # Trace changes
-
-        # MIDI output port
-        self.midi_output = None
-        self.selected_midi_port = self.config.get('Settings', 'midi_port', fallback=None)
-
-        # MIDI instrument (default to Acoustic Grand Piano, program number 0)
-        self.midi_instrument = self.config.getint('Settings', 'midi_instrument', fallback=0)
-        self.midi_instrument_name = self.config.get('Settings', 'midi_instrument_name', fallback="Acoustic Grand Piano")
-
-        # Volume controls
-        self.pc_volume = tk.DoubleVar(value=self.config.getfloat('Settings', 'pc_volume', fallback=0.5))
-        self.midi_volume = tk.IntVar(value=self.config.getint('Settings', 'midi_volume', fallback=64))
-
-        # Song speed control (1 to 20, integer)
-        self.song_speed = tk.IntVar(value=self.config.getint('Settings', 'song_speed', fallback=10))  # Default to medium speed
-
-        # Chord speed control
-        self.chord_speed = tk.IntVar(value=self.config.getint('Settings', 'chord_speed', fallback=0))  # 0 = all notes at once, 1-20 = arpeggiated speed
-
-        # Starting octave for playback
-        self.playback_octave = tk.IntVar(value=self.config.getint('Settings', 'playback_octave', fallback=0))
-
-        # Help window relative position to main window
-        self.help_window_rel_x = None
-        self.help_window_rel_y = None
-
-        # Flag to control song playback
-        self.is_playing_song = False
-
-        # Song Name Entry with Label
-        self.song_name_var = tk.StringVar()
-        song_name_frame = tk.Frame(root)
-        song_name_frame.pack(pady=5)
-
-        # Add a label for the song name
-        self.song_name_label = tk.Label(song_name_frame, text=self.translations[self.language_var.get()]['song_name'])
-        self.song_name_label.pack(side=tk.LEFT)
-
-        self.song_name_entry = tk.Entry(song_name_frame, textvariable=self.song_name_var)
-        self.song_name_entry.pack(side=tk.LEFT)
-        self.song_name_var.trace("w", self.mark_unsaved)
-
-        # Label for the number of octaves
-        octave_frame = tk.Frame(root)
-        octave_frame.pack(pady=5)
-        self.octave_label = tk.Label(octave_frame, text=f"{self.translations[self.language_var.get()]['number_of_octaves']}: {self.octaves}")
-        self.octave_label.pack(side=tk.LEFT)
-
-        # Frame with scrollbar for saved keyboards using ScrollFrame
-        self.saved_keyboards_frame = ScrollFrame(root)
-        self.saved_keyboards_frame.pack(fill=tk.BOTH, expand=True)
-
-        # Frame for the current row of keyboards
-        self.current_row_frame = tk.Frame(self.saved_keyboards_frame.scrollable_frame)
-        self.current_row_frame.pack(anchor='w')
-
-        # Message label above the input keyboard
-        self.message_label_var = tk.StringVar()
-        self.message_label = tk.Label(root, textvariable=self.message_label_var, font=("Arial", 10), fg="red")
-        self.message_label.pack()
-
-        # Canvas for the input keyboard
-        self.input_canvas = tk.Canvas(root, width=keyboard_width, height=keyboard_height, bg='lightgray',
-                                      bd=0, highlightthickness=0)
-        self.input_canvas.pack(pady=5)
-
-        # Add chord name input field and "What Chord?" button
-        self.chord_name_var = tk.StringVar()
-        chord_name_frame = tk.Frame(root)
-        chord_name_frame.pack(pady=5)
-        self.chord_name_entry = tk.Entry(chord_name_frame, textvariable=self.chord_name_var, width=20, justify='center')
-        self.chord_name_entry.pack(side=tk.LEFT)
-        self.chord_name_var.trace("w", self.mark_unsaved)
-
-        # Add the "What Chord?" button next to the input field
-        self.what_chord_button = tk.Button(chord_name_frame, text=self.translations[self.language_var.get()]['what_chord'], command=self.recognize_chord)
-        self.what_chord_button.pack(side=tk.LEFT, padx=5)
-
-        # Status label to display the chord being played during playback
-        self.playback_status_var = tk.StringVar()
-        self.playback_status_label = tk.Label(root, textvariable=self.playback_status_var, font=("Arial", 12), fg="blue")
-        self.playback_status_label.pack(pady=5)
-
-        # Add buttons below the input keyboard
-        button_frame = tk.Frame(root)
-        button_frame.pack(pady=5)
-
-        self.next_chord_button = tk.Button(button_frame, text=self.translations[self.language_var.get()]['next_chord'], command=self.save_and_reset_keyboard)
-        self.next_chord_button.pack(side=tk.LEFT, padx=5)
-
-        self.play_chord_button = tk.Button(button_frame, text=self.translations[self.language_var.get()]['play_chord'], command=self.play_chord)
-        self.play_chord_button.pack(side=tk.LEFT, padx=5)
-
-        self.clear_chord_button = tk.Button(button_frame, text=self.translations[self.language_var.get()]['clear_chord'], command=self.clear_keyboard)
-        self.clear_chord_button.pack(side=tk.LEFT, padx=5)
-
-        self.delete_chord_button = tk.Button(button_frame, text=self.translations[self.language_var.get()]['delete_chord'], command=self.delete_current_chord)
-        self.delete_chord_button.pack(side=tk.LEFT, padx=5)
-
-        self.play_song_button = tk.Button(button_frame, text=self.translations[self.language_var.get()]['play_song'], command=self.play_or_stop_song)
-        self.play_song_button.pack(side=tk.LEFT, padx=5)
-
-        self.mute_button = tk.Button(button_frame, text=self.translations[self.language_var.get()]['mute_input'], command=self.toggle_mute)
-        self.mute_button.pack(side=tk.LEFT, padx=5)
-
-        # Volume and Speed Controls
-        volume_frame = tk.Frame(root)
-        volume_frame.pack(pady=5)
-
-        self.pc_volume_label = tk.Label(volume_frame, text=self.translations[self.language_var.get()]['pc_volume'])
-        self.pc_volume_label.pack(side=tk.LEFT)
-        self.pc_volume_slider = tk.Scale(volume_frame, from_=0, to=1, orient=tk.HORIZONTAL, resolution=0.01,
-                                         variable=self.pc_volume)
-        self.pc_volume_slider.pack(side=tk.LEFT)
-
-        self.midi_volume_label = tk.Label(volume_frame, text=self.translations[self.language_var.get()]['midi_volume'])
-        self.midi_volume_label.pack(side=tk.LEFT)
-        self.midi_volume_slider = tk.Scale(volume_frame, from_=0, to=127, orient=tk.HORIZONTAL,
-                                           variable=self.midi_volume)
-        self.midi_volume_slider.pack(side=tk.LEFT)
-
-        self.chord_speed_label = tk.Label(volume_frame, text=self.translations[self.language_var.get()]['chord_speed'])
-        self.chord_speed_label.pack(side=tk.LEFT, padx=5)
-        self.chord_speed_slider = tk.Scale(volume_frame, from_=0, to=20, orient=tk.HORIZONTAL,
-                                           variable=self.chord_speed)
-        self.chord_speed_slider.pack(side=tk.LEFT)
-
-        self.song_speed_label = tk.Label(volume_frame, text=self.translations[self.language_var.get()]['song_speed'])
-        self.song_speed_label.pack(side=tk.LEFT, padx=5)
-        self.song_speed_slider = tk.Scale(volume_frame, from_=1, to=20, orient=tk.HORIZONTAL,
-                                          variable=self.song_speed)
-        self.song_speed_slider.pack(side=tk.LEFT)
-
-        # List to keep track of saved keyboards
-        self.saved_keyboards = []
-
-        # Counter to track the number of keyboards per row
-        self.keyboards_in_row = 0
-
-        # Maximum number of keyboards per row
-        self.max_keyboards_per_row = 2
-
-        # Track which keyboard is currently being edited
-        self.currently_editing_keyboard = None
-
-        # Create the menu bar
-        self.create_menu()
-
-        # Draw the input keyboard (moved after button definitions)
-        self.draw_piano()
-
-        # Update button states
-        self.update_button_states()
-
-        # Load MIDI output if necessary
-        if self.output_method.get() == "MIDI Output":
-            self.load_midi_output()
-
-    def create_menu(self):
-        menubar = tk.Menu(self.root)
-
-        lang = self.language_var.get()
-
-        # File Menu
-        file_menu = tk.Menu(menubar, tearoff=0)
-        file_menu.add_command(label=self.translations[lang]['new_song'], command=self.new_song)
-        file_menu.add_command(label=self.translations[lang]['load_song'], command=self.load_song)
-        file_menu.add_command(label=self.translations[lang]['save_song'], command=self.save_song)
-        file_menu.add_command(label=self.translations[lang]['save_song_as'], command=self.save_song_as)
-        file_menu.add_separator()
-        file_menu.add_command(label=self.translations[lang]['save_as_pdf'], command=self.save_pdf)
-        file_menu.add_command(label=self.translations[lang]['print_pdf'], command=self.print_pdf)
-        file_menu.add_separator()
-        file_menu.add_command(label=self.translations[lang]['exit'], command=self.on_closing)
-        menubar.add_cascade(label=self.translations[lang]['file_menu'], menu=file_menu)
-
-        # Edit Menu
-        edit_menu = tk.Menu(menubar, tearoff=0)
-        edit_menu.add_command(label=self.translations[lang]['next_chord'], command=self.save_and_reset_keyboard)
-        edit_menu.add_command(label=self.translations[lang]['clear_chord'], command=self.clear_keyboard)
-        edit_menu.add_command(label=self.translations[lang]['delete_chord'], command=self.delete_current_chord)
-        menubar.add_cascade(label=self.translations[lang]['edit_menu'], menu=edit_menu)
-
-        # Playback Menu
-        playback_menu = tk.Menu(menubar, tearoff=0)
-        playback_menu.add_command(label=self.translations[lang]['play_chord'], command=self.play_chord)
-        playback_menu.add_command(label=self.translations[lang]['play_song'], command=self.play_or_stop_song)
-        playback_menu.add_separator()
-        self.is_muted_var = tk.BooleanVar(value=self.is_muted)
-        playback_menu.add_checkbutton(label=self.translations[lang]['mute_input'], variable=self.is_muted_var, command=self.toggle_mute)
-        menubar.add_cascade(label=self.translations[lang]['playback_menu'], menu=playback_menu)
-
-        # Options Menu
-        options_menu = tk.Menu(menubar, tearoff=0)
-        output_menu = tk.Menu(options_menu, tearoff=0)
-        output_menu.add_radiobutton(label="PC Audio", variable=self.output_method, value="PC Audio",
-                                    command=self.change_output_method)
-        output_menu.add_radiobutton(label="MIDI Output", variable=self.output_method, value="MIDI Output",
-                                    command=self.change_output_method)
-        options_menu.add_cascade(label="Output Method", menu=output_menu)
-
-        # MIDI Device Submenu
-        self.midi_device_menu = tk.Menu(options_menu, tearoff=0)
-        options_menu.add_cascade(label="MIDI Devices", menu=self.midi_device_menu)
-        self.update_midi_device_menu()
-
-        # MIDI Instrument Submenu
-        self.midi_instrument_menu = tk.Menu(options_menu, tearoff=0)
-        options_menu.add_cascade(label="MIDI Instruments", menu=self.midi_instrument_menu)
-        self.create_midi_instrument_menu()
-        self.update_midi_instrument_menu_state()
-
-        # Starting Octave Menu
-        starting_octave_menu = tk.Menu(options_menu, tearoff=0)
-        for i in range(-4, 5):
-            starting_octave_menu.add_radiobutton(label=str(i), command=lambda i=i: self.set_playback_octave(i),
-                                                 value=i, variable=self.playback_octave)
-        options_menu.add_cascade(label="Starting Octave", menu=starting_octave_menu)
-
-        # Octave Selection
-        octave_menu = tk.Menu(options_menu, tearoff=0)
-        for i in range(1, 5):
-            octave_menu.add_radiobutton(label=str(i), command=lambda i=i: self.set_octaves(i),
-                                        value=i, variable=tk.IntVar(value=self.octaves))
-        options_menu.add_cascade(label=self.translations[lang]['number_of_octaves'], menu=octave_menu)
-
-        # Language Selection Submenu
-        language_menu = tk.Menu(options_menu, tearoff=0)
-        options_menu.add_cascade(label=self.translations[lang]['language_menu'], menu=language_menu)
-
-        language_menu.add_radiobutton(label="English / Engels", variable=self.language_var, value="en", command=self.change_language)
-        language_menu.add_radiobutton(label="Dutch / Nederlands", variable=self.language_var, value="nl", command=self.change_language)
-
-        menubar.add_cascade(label=self.translations[lang]['options_menu'], menu=options_menu)
-
-        # Help Menu
-        help_menu = tk.Menu(menubar, tearoff=0)
-        help_menu.add_command(label=self.translations[lang]['help'], command=self.show_help)
-        menubar.add_cascade(label=self.translations[lang]['help'], menu=help_menu)
-
-        self.root.config(menu=menubar)
-
-    def update_midi_instrument_menu_state(self, *args):
-        if self.output_method.get() == "MIDI Output":
-            self.midi_instrument_menu.entryconfig("Instrument Groups", state="normal")
-        else:
-            self.midi_instrument_menu.entryconfig("Instrument Groups", state="disabled")
-
-    def create_midi_instrument_menu(self):
-        # General MIDI Instrument Families and Instruments
-        self.instrument_families = [
-            ("Piano", ["Acoustic Grand Piano", "Bright Acoustic Piano", "Electric Grand Piano",
-                       "Honky-tonk Piano", "Electric Piano 1", "Electric Piano 2",
-                       "Harpsichord", "Clavinet"]),
-            ("Chromatic Percussion", ["Celesta", "Glockenspiel", "Music Box", "Vibraphone",
-                                      "Marimba", "Xylophone", "Tubular Bells", "Dulcimer"]),
-            ("Organ", ["Drawbar Organ", "Percussive Organ", "Rock Organ", "Church Organ",
-                       "Reed Organ", "Accordion", "Harmonica", "Tango Accordion"]),
-            ("Guitar", ["Acoustic Guitar (nylon)", "Acoustic Guitar (steel)", "Electric Guitar (jazz)",
-                        "Electric Guitar (clean)", "Electric Guitar (muted)", "Overdriven Guitar",
-                        "Distortion Guitar", "Guitar harmonics"]),
-            ("Bass", ["Acoustic Bass", "Electric Bass (finger)", "Electric Bass (pick)", "Fretless Bass",
-                      "Slap Bass 1", "Slap Bass 2", "Synth Bass 1", "Synth Bass 2"]),
-            ("Strings", ["Violin", "Viola", "Cello", "Contrabass", "Tremolo Strings",
-                         "Pizzicato Strings", "Orchestral Harp", "Timpani"]),
-            ("Ensemble", ["String Ensemble 1", "String Ensemble 2", "SynthStrings 1", "SynthStrings 2",
-                          "Choir Aahs", "Voice Oohs", "Synth Choir", "Orchestra Hit"]),
-            ("Brass", ["Trumpet", "Trombone", "Tuba", "Muted Trumpet", "French Horn",
-                       "Brass Section", "SynthBrass 1", "SynthBrass 2"]),
-            ("Reed", ["Soprano Sax", "Alto Sax", "Tenor Sax", "Baritone Sax",
-                      "Oboe", "English Horn", "Bassoon", "Clarinet"]),
-            ("Pipe", ["Piccolo", "Flute", "Recorder", "Pan Flute", "Blown Bottle",
-                      "Shakuhachi", "Whistle", "Ocarina"]),
-            ("Synth Lead", ["Lead 1 (square)", "Lead 2 (sawtooth)", "Lead 3 (calliope)",
-                            "Lead 4 (chiff)", "Lead 5 (charang)", "Lead 6 (voice)",
-                            "Lead 7 (fifths)", "Lead 8 (bass + lead)"]),
-            ("Synth Pad", ["Pad 1 (new age)", "Pad 2 (warm)", "Pad 3 (polysynth)",
-                           "Pad 4 (choir)", "Pad 5 (bowed)", "Pad 6 (metallic)",
-                           "Pad 7 (halo)", "Pad 8 (sweep)"]),
-            ("Synth Effects", ["FX 1 (rain)", "FX 2 (soundtrack)", "FX 3 (crystal)",
-                               "FX 4 (atmosphere)", "FX 5 (brightness)", "FX 6 (goblins)",
-                               "FX 7 (echoes)", "FX 8 (sci-fi)"]),
-            ("Ethnic", ["Sitar", "Banjo", "Shamisen", "Koto", "Kalimba",
-                        "Bag pipe", "Fiddle", "Shanai"]),
-            ("Percussive", ["Tinkle Bell", "Agogo", "Steel Drums", "Woodblock",
-                            "Taiko Drum", "Melodic Tom", "Synth Drum", "Reverse Cymbal"]),
-            ("Sound Effects", ["Guitar Fret Noise", "Breath Noise", "Seashore", "Bird Tweet",
-                               "Telephone Ring", "Helicopter", "Applause", "Gunshot"])
-        ]
-
-        self.midi_instrument_menu.add_command(label="Instrument Groups", state="normal")  # Dummy entry
-
-        # Create submenus for instrument families
-        for family_index, (family_name, instruments) in enumerate(self.instrument_families):
-            family_menu = tk.Menu(self.midi_instrument_menu, tearoff=0)
-            for instrument_index, instrument_name in enumerate(instruments):
-                program_number = family_index * 8 + instrument_index
-                family_menu.add_radiobutton(
-                    label=instrument_name,
-                    command=lambda p=program_number, n=instrument_name: self.select_midi_instrument(p, n),
-                    variable=tk.IntVar(value=self.midi_instrument),
-                    value=program_number
-                )
-            self.midi_instrument_menu.add_cascade(label=family_name, menu=family_menu)
-
-    def select_midi_instrument(self, program_number, instrument_name, show_message=True):
-        self.midi_instrument = program_number
-        self.midi_instrument_name = instrument_name
-        if self.midi_output:
-            try:
-                msg = mido.Message('program_change', program=program_number)
-                self.midi_output.send(msg)
-                if show_message:
-                    messagebox.showinfo("MIDI Instrument", f"Instrument set to '{instrument_name}'.")
-                self.save_settings()
-            except Exception as e:
-                messagebox.showerror("Error", f"An error occurred while setting the MIDI instrument:\n{e}")
-
-    def update_midi_device_menu(self):
-        self.midi_device_menu.delete(0, tk.END)
-        available_ports = mido.get_output_names()
-        if not available_ports:
-            self.midi_device_menu.add_command(label="No MIDI devices available", state=tk.DISABLED)
-        else:
-            for port in available_ports:
-                self.midi_device_menu.add_radiobutton(label=port, command=lambda p=port: self.select_midi_port(p),
-                                                      value=port, variable=tk.StringVar(value=self.selected_midi_port))
-
-    def select_midi_port(self, port_name):
-        self.selected_midi_port = port_name
-        if self.midi_output:
-            self.midi_output.close()
-        self.midi_output = mido.open_output(port_name)
-        # Send program change message to set the instrument
-        self.select_midi_instrument(self.midi_instrument, self.midi_instrument_name, show_message=False)  # Suppress message
-        messagebox.showinfo("MIDI Output", f"MIDI output set to '{port_name}'.")
-        self.save_settings()
-
-    def set_octaves(self, num_octaves):
-        self.octaves = num_octaves
-        # Redraw the keyboard
-        self.draw_piano()
-        # Update the label
-        lang = self.language_var.get()
-        self.octave_label.config(text=f"{self.translations[lang]['number_of_octaves']}: {self.octaves}")
-        self.save_settings()
-
-    def set_playback_octave(self, octave):
-        self.playback_octave.set(octave)
-        self.save_settings()
-
-    def change_output_method(self):
-        method = self.output_method.get()
-        if method == "MIDI Output":
-            # Open MIDI output port
-            self.load_midi_output()
-        else:
-            # Close MIDI output port if open
-            if self.midi_output:
-                self.midi_output.close()
-                self.midi_output = None
-        self.save_settings()
-        self.update_midi_instrument_menu_state()
-
-    def load_midi_output(self):
-        available_ports = mido.get_output_names()
-        if not available_ports:
-            messagebox.showwarning("MIDI Output", "No MIDI output ports available.")
-            self.output_method.set("PC Audio")
-            return
-        if self.selected_midi_port not in available_ports:
-            self.selected_midi_port = available_ports[0]
-        self.midi_output = mido.open_output(self.selected_midi_port)
-        # Send program change message to set the instrument
-        self.select_midi_instrument(self.midi_instrument, self.midi_instrument_name, show_message=False)  # Suppress message on startup
-        self.save_settings()
-
-    def mark_unsaved(self, *args):
-        self.unsaved_changes = True
-
-    def update_button_states(self):
-        # Check if any keys are selected
-        selected_keys = any(key.selected for key in self.white_keys + self.black_keys)
-        if selected_keys:
-            self.play_chord_button.config(state=tk.NORMAL)
-            self.clear_chord_button.config(state=tk.NORMAL)
-        else:
-            self.play_chord_button.config(state=tk.DISABLED)
-            self.clear_chord_button.config(state=tk.DISABLED)
-
-        # Enable or disable the 'Delete Chord' button based on edit mode
-        if self.currently_editing_keyboard:
-            self.delete_chord_button.config(state=tk.NORMAL)
-        else:
-            self.delete_chord_button.config(state=tk.DISABLED)
-
-    def save_and_reset_keyboard(self):
-        # Calculate the width of the saved canvas
-        canvas_width = self.input_canvas.winfo_width()
-        canvas_height = self.input_canvas.winfo_height()
-
-        # Save the keyboard state
-        key_states = [key.selected for key in self.white_keys + self.black_keys]
-        chord_name = self.chord_name_var.get()
-
-        if self.currently_editing_keyboard:
-            # Update the existing saved keyboard
-            saved_keyboard = self.currently_editing_keyboard
-            saved_keyboard.key_states = key_states
-            saved_keyboard.chord_name = chord_name
-            self.update_saved_canvas(saved_keyboard)
-            # Reset the currently editing keyboard
-            self.currently_editing_keyboard = None
-            # Clear the message label
-            self.message_label_var.set("")
-            # Reset the button text back to "Next Chord"
-            lang = self.language_var.get()
-            self.next_chord_button.config(text=self.translations[lang]['next_chord'])
-        else:
-            # Create a new canvas to display the saved keyboard
-            saved_canvas = tk.Canvas(self.current_row_frame, width=canvas_width, height=canvas_height + 20,  # Extra height for chord name
-                                     bg='lightgray', bd=0, highlightthickness=0)
-
-            saved_canvas.pack(side='left', padx=5, pady=5)
-            self.keyboards_in_row += 1
-
-            # Draw the keys on the saved canvas
-            self.draw_saved_canvas(saved_canvas, key_states)
-
-            # Add the chord name above the saved keyboard
-            saved_canvas.create_text(canvas_width / 2, canvas_height + 10, text=chord_name, font=("Arial", 10))
-
-            # Create a SavedKeyboard object and add it to the list
-            saved_keyboard = SavedKeyboard(saved_canvas, chord_name, key_states)
-            self.saved_keyboards.append(saved_keyboard)
-
-            # Bind click event to load the saved keyboard for editing
-            saved_canvas.bind("<Button-1>", lambda event, sk=saved_keyboard: self.load_keyboard(sk))
-
-            if self.keyboards_in_row >= self.max_keyboards_per_row:
-                # Start a new row
-                self.current_row_frame = tk.Frame(self.saved_keyboards_frame.scrollable_frame)
-                self.current_row_frame.pack(anchor='w', pady=5)
-                self.keyboards_in_row = 0
-
-            # Clear the message label
-            self.message_label_var.set("")
-
-        # Reset the input keyboard
-        self.clear_keyboard()
-
-        # Update the scroll region
-        self.saved_keyboards_frame.canvas.update_idletasks()
-        self.saved_keyboards_frame.canvas.configure(scrollregion=self.saved_keyboards_frame.canvas.bbox('all'))
-
-        # Scroll to the bottom to show the latest keyboard
-        self.saved_keyboards_frame.canvas.yview_moveto(1.0)
-
-        # Mark as having unsaved changes
-        self.unsaved_changes = True
-
-    def draw_piano(self):
-        # Clear existing keys if any
-        self.input_canvas.delete("all")
-
-        starting_midi_note = 48  # C3
-        starting_octave = 3
-
-        white_notes = ['C', 'D', 'E', 'F', 'G', 'A', 'B']
-        white_key_offsets = [0, 2, 4, 5, 7, 9, 11]
-
-        black_notes = ['C#', 'D#', '', 'F#', 'G#', 'A#', '']
-        black_key_offsets = [1, 3, None, 6, 8, 10, None]
-
-        x = 10
-        y = 10
-
-        self.white_keys = []
-        self.black_keys = []
-
-        total_white_keys = self.octaves * 7
-        keyboard_width = total_white_keys * self.white_key_width + 20  # Extra 20 pixels for margin
-        self.input_canvas.config(width=keyboard_width)
-
-        for octave in range(self.octaves):
-            # Draw white keys
-            for i in range(len(white_notes)):
-                note_name = white_notes[i] + str(starting_octave + octave)
-                semitone_offset = white_key_offsets[i] + octave * 12
-                midi_number = starting_midi_note + semitone_offset
-                frequency = 440 * 2 ** ((midi_number - 69) / 12)
-                key = PianoKey(
-                    self.input_canvas,
-                    x + (octave * 7 + i) * self.white_key_width,
-                    y,
-                    self.white_key_width,
-                    self.white_key_height,
-                    "white",
-                    is_black=False,
-                    note_name=note_name,
-                    frequency=frequency,
-                    midi_note=midi_number,
-                    app=self  # Reference to main application
-                )
-                self.white_keys.append(key)
-
-            # Draw black keys
-            for i in range(len(black_notes)):
-                if black_notes[i] != '':
-                    note_name = black_notes[i] + str(starting_octave + octave)
-                    semitone_offset = black_key_offsets[i] + octave * 12
-                    midi_number = starting_midi_note + semitone_offset
-                    frequency = 440 * 2 ** ((midi_number - 69) / 12)
-                    key = PianoKey(
-                        self.input_canvas,
-                        x + (octave * 7 + i) * self.white_key_width + self.white_key_width - self.black_key_width / 2,
-                        y,
-                        self.black_key_width,
-                        self.black_key_height,
-                        "black",
-                        is_black=True,
-                        note_name=note_name,
-                        frequency=frequency,
-                        midi_note=midi_number,
-                        app=self  # Reference to main application
-                    )
-                    self.black_keys.append(key)
-
-        # Update button states
-        self.update_button_states()
-
-    def draw_saved_canvas(self, saved_canvas, key_states):
-        all_keys = self.white_keys + self.black_keys
-        for key, selected in zip(all_keys, key_states):
-            fill_color = "blue" if selected else key.original_color
-            coords = self.input_canvas.coords(key.rect)
-            x1, y1, x2, y2 = coords
-            tags = ('white_key',) if not key.is_black else ('black_key',)
-            saved_canvas.create_rectangle(
-                x1, y1, x2, y2,
-                fill=fill_color,
-                outline="black",
-                width=1,
-                tags=tags
-            )
-
-    def update_saved_canvas(self, saved_keyboard):
-        saved_canvas = saved_keyboard.canvas
-        saved_canvas.delete("all")
-        canvas_width = saved_canvas.winfo_width()
-        canvas_height = saved_canvas.winfo_height() - 20  # 20 pixels for chord name
-
-        # Draw the keys on the saved canvas
-        self.draw_saved_canvas(saved_canvas, saved_keyboard.key_states)
-
-        # Add the chord name above the saved keyboard
-        chord_name = saved_keyboard.chord_name
-        saved_canvas.create_text(canvas_width / 2, canvas_height + 10, text=chord_name, font=("Arial", 10))
-
-    def load_keyboard(self, saved_keyboard):
-        # Set the currently editing keyboard
-        self.currently_editing_keyboard = saved_keyboard
-        # Load the saved keys into the input keyboard
-        key_states = saved_keyboard.key_states
-        all_keys = self.white_keys + self.black_keys
-
-        for key, selected in zip(all_keys, key_states):
-            key.selected = selected
-            fill_color = "blue" if selected else key.original_color
-            self.input_canvas.itemconfig(key.rect, fill=fill_color)
-
-        # Set the chord name
-        self.chord_name_var.set(saved_keyboard.chord_name)
-
-        # Show the message above the input keyboard
-        lang = self.language_var.get()
-        self.message_label_var.set(self.translations[lang]['edit_keys_message'])
-
-        # Change the button text to "Save Chord"
-        self.next_chord_button.config(text=self.translations[lang]['save_chord'])
-
-        # Update button states
-        self.update_button_states()
-
-    def clear_keyboard(self):
-        # Deselect all keys and reset colors
-        for key in self.white_keys + self.black_keys:
-            key.selected = False
-            self.input_canvas.itemconfig(key.rect, fill=key.original_color)
-
-        # Reset the chord name input field
-        self.chord_name_var.set("")
-        # Reset the currently editing keyboard
-        self.currently_editing_keyboard = None
-        # Clear the message label
-        self.message_label_var.set("")
-
-        # Reset the button text to "Next Chord"
-        lang = self.language_var.get()
-        self.next_chord_button.config(text=self.translations[lang]['next_chord'])
-
-        # Update button states
-        self.update_button_states()
-
-    def delete_current_chord(self):
-        if self.currently_editing_keyboard:
-            # Remove the canvas of the current keyboard
-            self.currently_editing_keyboard.canvas.destroy()
-            # Remove the keyboard from the list
-            index = self.saved_keyboards.index(self.currently_editing_keyboard)
-            del self.saved_keyboards[index]
-
-            # Update the GUI to shift subsequent keyboards
-            # Remove all keyboards from the GUI
-            for widget in self.saved_keyboards_frame.scrollable_frame.winfo_children():
-                widget.destroy()
-
-            # Reset the counter for keyboards per row
-            self.keyboards_in_row = 0
-            self.current_row_frame = tk.Frame(self.saved_keyboards_frame.scrollable_frame)
-            self.current_row_frame.pack(anchor='w')
-
-            # Redraw all saved keyboards
-            for saved_keyboard in self.saved_keyboards:
-                # Create a new canvas for each keyboard
-                canvas_width = self.input_canvas.winfo_width()
-                canvas_height = self.input_canvas.winfo_height()
-                saved_canvas = tk.Canvas(self.current_row_frame, width=canvas_width, height=canvas_height + 20,
-                                         bg='lightgray', bd=0, highlightthickness=0)
-                saved_canvas.pack(side='left', padx=5, pady=5)
-                self.keyboards_in_row += 1
-
-                # Draw the keys on the saved canvas
-                self.draw_saved_canvas(saved_canvas, saved_keyboard.key_states)
-
-                # Add the chord name above the saved keyboard
-                saved_canvas.create_text(canvas_width / 2, canvas_height + 10, text=saved_keyboard.chord_name, font=("Arial", 10))
-
-                # Update the canvas of the saved keyboard
-                saved_keyboard.canvas = saved_canvas
-
-                # Bind click event to load the saved keyboard for editing
-                saved_canvas.bind("<Button-1>", lambda event, sk=saved_keyboard: self.load_keyboard(sk))
-
-                if self.keyboards_in_row >= self.max_keyboards_per_row:
-                    # Start a new row
-                    self.current_row_frame = tk.Frame(self.saved_keyboards_frame.scrollable_frame)
-                    self.current_row_frame.pack(anchor='w', pady=5)
-                    self.keyboards_in_row = 0
-
-            # Reset the currently editing keyboard
-            self.currently_editing_keyboard = None
-            # Clear the message label
-            self.message_label_var.set("")
-            # Reset the button text to "Next Chord"
-            lang = self.language_var.get()
-            self.next_chord_button.config(text=self.translations[lang]['next_chord'])
-            # Reset the input keyboard
-            self.clear_keyboard()
-            # Mark as having unsaved changes
-            self.unsaved_changes = True
-            # Update button states
-            self.update_button_states()
-        else:
-            messagebox.showinfo(self.translations[self.language_var.get()]['delete_chord'], self.translations[self.language_var.get()]['delete_chord_message'])
-
-    def new_song(self):
-        if not self.song_saved:
-            response = messagebox.askyesnocancel(self.translations[self.language_var.get()]['save_song'],
-                                                 self.translations[self.language_var.get()]['save_song_prompt'])
-            if response:  # User chose 'Yes' to save
-                self.save_song()
-            elif response is False:  # User chose 'No'
-                pass
-            else:
-                return  # User chose 'Cancel' or closed the dialog
-
-        self.song_name_var.set("")
-        self.chord_name_var.set("")
-        self.saved_keyboards.clear()
-        self.keyboards_in_row = 0
-        for widget in self.saved_keyboards_frame.scrollable_frame.winfo_children():
-            widget.destroy()
-        self.current_row_frame = tk.Frame(self.saved_keyboards_frame.scrollable_frame)
-        self.current_row_frame.pack(anchor='w')
-        self.clear_keyboard()
-        self.unsaved_changes = False
-        self.song_saved = False
-        self.current_song_file = None
-
-    def save_pdf(self):
-        if not self.saved_keyboards:
-            messagebox.showwarning("Save as PDF", "No chords have been saved yet.")
-            return
-
-        song_title = self.song_name_var.get() or "Untitled"
-        default_pdf_path = self.config.get('Settings', 'default_pdf_path', fallback='')
-        file_path = filedialog.asksaveasfilename(defaultextension=".pdf", initialfile=f"{song_title}.pdf",
-                                                 filetypes=[("PDF files", "*.pdf")],
-                                                 initialdir=default_pdf_path)
-        if not file_path:
-            return  # User canceled
-
-        # Save default PDF path
-        self.config.set('Settings', 'default_pdf_path', os.path.dirname(file_path))
-        self.save_settings()
-
-        try:
-            self.generate_pdf(file_path, song_title)
-            # Store the last saved PDF file path
-            self.last_pdf_file = file_path
-            messagebox.showinfo("PDF Saved", f"The file '{file_path}' has been saved.")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred while saving the PDF:\n{e}")
-
-    def generate_pdf(self, file_path, song_title):
-        c = pdf_canvas.Canvas(file_path, pagesize=A4)
-        page_width, page_height = A4
-        margin = 50
-
-        # Add title
-        c.setFont("Helvetica-Bold", 16)
-        c.drawCentredString(page_width / 2, page_height - margin, song_title)
-
-        # Calculate keyboard dimensions
-        keyboard_width = page_width / 2 - margin * 1.5
-        keyboard_height = 50
-        white_key_width = keyboard_width / (self.octaves * 7)
-        black_key_width = white_key_width * 0.6
-        black_key_height = keyboard_height * 0.6
-
-        x_position = margin
-        y_position = page_height - margin - 50 - keyboard_height
-        keyboards_in_row = 0
-        keyboards_per_row = 2
-        keyboards_in_page = 0
-        keyboards_per_page = 8
-        current_page = 1
-        total_keyboards = len(self.saved_keyboards)
-        total_pages = (total_keyboards - 1) // keyboards_per_page + 1
-
-        for idx, saved_keyboard in enumerate(self.saved_keyboards, start=1):
-            # Draw chord name
-            c.setFont("Helvetica", 12)
-            c.drawString(x_position, y_position + keyboard_height + 10, saved_keyboard.chord_name)
-
-            # Draw keyboard
-            all_keys = self.white_keys + self.black_keys
-            key_states = saved_keyboard.key_states
-
-            # Draw white keys
-            for i, key in enumerate(all_keys):
-                if not key.is_black:
-                    x = x_position + i * white_key_width
-                    y = y_position
-                    c.rect(x, y, white_key_width, keyboard_height, stroke=1, fill=0)
-                    if key_states[i]:
-                        c.setFillColorRGB(0, 0, 1)  # Blue color
-                        c.rect(x, y, white_key_width, keyboard_height, stroke=0, fill=1)
-                        c.setFillColorRGB(0, 0, 0)  # Reset to black
-
-            # Draw black keys
-            for i, key in enumerate(all_keys):
-                if key.is_black:
-                    x = x_position + (i - 0.5) * white_key_width
-                    y = y_position + keyboard_height - black_key_height
-                    c.rect(x, y, black_key_width, black_key_height, stroke=1, fill=1)
-                    if key_states[i]:
-                        c.setFillColorRGB(0, 0, 1)  # Blue color
-                        c.rect(x, y, black_key_width, black_key_height, stroke=0, fill=1)
-                        c.setFillColorRGB(0, 0, 0)  # Reset to black
-
-            # Update positions
-            keyboards_in_row += 1
-            keyboards_in_page += 1
-            if keyboards_in_row >= keyboards_per_row:
-                x_position = margin
-                y_position -= keyboard_height + 70  # Adjust spacing
-                keyboards_in_row = 0
-            else:
-                x_position += keyboard_width + margin
-
-            if keyboards_in_page >= keyboards_per_page or y_position < margin:
-                # Start a new page
-                c.showPage()
-                current_page += 1
-                keyboards_in_page = 0
-                x_position = margin
-                y_position = page_height - margin - 50 - keyboard_height
-                keyboards_in_row = 0
-
-                # Add title again
-                c.setFont("Helvetica-Bold", 16)
-                c.drawCentredString(page_width / 2, page_height - margin, song_title)
-
-            if idx == total_keyboards or keyboards_in_page == keyboards_per_page:
-                # Add page numbering
-                c.setFont("Helvetica", 10)
-                c.drawCentredString(page_width / 2, margin / 2, f"Page {current_page} of {total_pages}")
-
-        c.save()
-
-    def print_pdf(self):
-        if not self.last_pdf_file:
-            messagebox.showwarning("Print PDF", "No PDF file has been saved yet.")
-            return
-        try:
-            if platform.system() == 'Windows':
-                # Use default PDF reader to print
-                os.startfile(self.last_pdf_file, "print")
-            elif platform.system() == 'Darwin':
-                # macOS
-                os.system(f'lpr \"{self.last_pdf_file}\"')
-            else:
-                # Linux and others
-                os.system(f'lpr \"{self.last_pdf_file}\"')
-            messagebox.showinfo("Print PDF", "PDF file sent to the printer.")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred while printing the PDF:\n{e}")
-
-    def show_help(self):
-        # Create a custom help window
-        help_window = tk.Toplevel(self.root)
-        help_window.title(self.translations[self.language_var.get()]['help'])
-
-        # Set the help window position if previously saved
-        if self.help_window_rel_x is not None and self.help_window_rel_y is not None:
-            # Position relative to the main window
-            main_x = self.root.winfo_x()
-            main_y = self.root.winfo_y()
-            help_window.geometry(f"+{main_x + self.help_window_rel_x}+{main_y + self.help_window_rel_y}")
-        else:
-            help_window.geometry("600x600")
-
-        # Use ScrollFrame for the help window
-        help_frame = ScrollFrame(help_window)
-        help_frame.pack(fill=tk.BOTH, expand=True)
-
-        scrollable_frame = help_frame.scrollable_frame
-
-        # Help message with explanations of all functionalities
-        help_text_en = (
-            "Welcome to Pianoman!\n\n"
-            "With this application, you can visualize piano chords, hear the notes, and save them as a PDF.\n\n"
-            "Features:\n"
-            "- **Song Name:** Enter and translate the song name dynamically.\n"
-            "- **Number of Octaves:** Select the number of octaves for your keyboard.\n"
-            "- **Chords:** Select keys to form chords, play them, save, edit, and delete.\n"
-            "- **Playback:** Play individual chords or the entire song with adjustable speed.\n"
-            "- **Volume Controls:** Adjust PC audio and MIDI volumes.\n"
-            "- **MIDI Integration:** Choose MIDI output devices and instruments.\n"
-            "- **Translations:** Switch between English and Dutch languages seamlessly.\n\n"
-            "How to Use:\n"
-            "1. **Select Keys:** Click on the piano keys to select/deselect them.\n"
-            "2. **Name Chord:** Enter a name for your chord.\n"
-            "3. **Save Chord:** Click 'Next Chord' to save the current chord.\n"
-            "4. **Edit Chord:** Click on a saved chord to edit it. The 'Next Chord' button will change to 'Save Chord'.\n"
-            "5. **Play Chord:** Play the selected chord.\n"
-            "6. **Play Song:** Play all saved chords in sequence.\n\n"
-            "For more detailed instructions, refer to the documentation or contact support."
-        )
-
-        help_text_nl = (
-            "Welkom bij Pianoman!\n\n"
-            "Met deze applicatie kun je piano-akkoorden visualiseren, de noten horen en ze opslaan als een PDF.\n\n"
-            "Functies:\n"
-            "- **Liednaam:** Voer de liednaam in en vertaal deze dynamisch.\n"
-            "- **Aantal Octaven:** Selecteer het aantal octaven voor je keyboard.\n"
-            "- **Akkoorden:** Selecteer toetsen om akkoorden te vormen, speel ze af, sla ze op, bewerk en verwijder ze.\n"
-            "- **Afspelen:** Speel individuele akkoorden of het hele lied af met aanpasbare snelheid.\n"
-            "- **Volumecontrole:** Pas het PC-audio- en MIDI-volume aan.\n"
-            "- **MIDI-integratie:** Kies MIDI-uitvoerapparaten en instrumenten.\n"
-            "- **Vertalingen:** Wissel naadloos tussen Engels en Nederlands.\n\n"
-            "Hoe te gebruiken:\n"
-            "1. **Selecteer Toetsen:** Klik op de piano toetsen om ze te selecteren/deselecteren.\n"
-            "2. **Naam Akkoord:** Voer een naam in voor je akkoord.\n"
-            "3. **Opslaan Akkoord:** Klik op 'Volgend Akkoord' om het huidige akkoord op te slaan.\n"
-            "4. **Bewerken Akkoord:** Klik op een opgeslagen akkoord om het te bewerken. De knop 'Volgend Akkoord' verandert naar 'Akkoord Opslaan'.\n"
-            "5. **Speel Akkoord:** Speel het geselecteerde akkoord af.\n"
-            "6. **Speel Lied:** Speel alle opgeslagen akkoorden in volgorde af.\n\n"
-            "Voor meer gedetailleerde instructies, raadpleeg de documentatie of neem contact op met ondersteuning."
-        )
-
-        lang = self.language_var.get()
-        help_text = help_text_en if lang == 'en' else help_text_nl
-
-        tk.Label(scrollable_frame, text=help_text, justify="left", font=("Arial", 12, "bold")).pack(anchor="w", pady=(10, 0))
-
-        # Add an Exit button at the bottom
-        exit_button = tk.Button(scrollable_frame, text="Close Help" if lang == 'en' else "Sluit Help", command=help_window.destroy)
-        exit_button.pack(pady=10)
-
-        # Save help window position on close
-        def save_help_window_position():
-            # Get positions relative to the main window
-            self.help_window_rel_x = help_window.winfo_x() - self.root.winfo_x()
-            self.help_window_rel_y = help_window.winfo_y() - self.root.winfo_y()
-            self.save_settings()
-            help_window.destroy()
-
-        help_window.protocol("WM_DELETE_WINDOW", save_help_window_position)
-
-    def save_song(self):
-        if self.current_song_file:
-            file_path = self.current_song_file
-        else:
-            result = self.save_song_as()  # Prompt for file name if not already saved
-            if not result:
-                return
-            else:
-                file_path = self.current_song_file
-        try:
-            # Prepare data to save
-            song_data = {
-                "song_name": self.song_name_var.get(),
-                "saved_keyboards": [],
-                "number_of_octaves": self.octaves
-            }
-            for saved_keyboard in self.saved_keyboards:
-                song_data["saved_keyboards"].append({
-                    "chord_name": saved_keyboard.chord_name,
-                    "key_states": saved_keyboard.key_states
-                })
-            # Write data to file
-            with open(file_path, 'w') as f:
-                json.dump(song_data, f)
-            # Update song name
-            self.song_name_var.set(song_data["song_name"])
-            self.song_name_entry.delete(0, tk.END)
-            self.song_name_entry.insert(0, song_data["song_name"])
-            messagebox.showinfo("Save Song", f"Song saved successfully to '{file_path}'.")
-            self.unsaved_changes = False
-            self.song_saved = True
-            self.current_song_file = file_path
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred while saving the song:\n{e}")
-
-    def save_song_as(self):
-        try:
-            song_title = self.song_name_var.get() or "Untitled"
-            default_song_path = self.config.get('Settings', 'default_song_path', fallback='')
-            # Ask the user for a file name to save the song
-            file_path = filedialog.asksaveasfilename(defaultextension=".json", initialfile=f"{song_title}.json",
-                                                     filetypes=[("JSON files", "*.json")],
-                                                     initialdir=default_song_path)
-            if file_path:
-                # Save default song path
-                self.config.set('Settings', 'default_song_path', os.path.dirname(file_path))
-                self.save_settings()
-                # Prepare data to save
-                song_data = {
-                    "song_name": os.path.splitext(os.path.basename(file_path))[0],
-                    "saved_keyboards": [],
-                    "number_of_octaves": self.octaves
-                }
-                for saved_keyboard in self.saved_keyboards:
-                    song_data["saved_keyboards"].append({
-                        "chord_name": saved_keyboard.chord_name,
-                        "key_states": saved_keyboard.key_states
-                    })
-                # Write data to file
-                with open(file_path, 'w') as f:
-                    json.dump(song_data, f)
-                # Update song name
-                self.song_name_var.set(song_data["song_name"])
-                self.song_name_entry.delete(0, tk.END)
-                self.song_name_entry.insert(0, song_data["song_name"])
-                messagebox.showinfo("Save Song", f"Song saved successfully to '{file_path}'.")
-                self.unsaved_changes = False
-                self.song_saved = True
-                self.current_song_file = file_path
-                return True
-            else:
-                return False  # User canceled
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred while saving the song:\n{e}")
-            return False
-
-    def load_song(self):
-        # Ask the user to select a song file to load
-        default_song_path = self.config.get('Settings', 'default_song_path', fallback='')
-        file_path = filedialog.askopenfilename(filetypes=[("JSON files", "*.json")],
-                                               initialdir=default_song_path)
-        if file_path:
-            try:
-                # Save default song path
-                self.config.set('Settings', 'default_song_path', os.path.dirname(file_path))
-                self.save_settings()
-                # Read data from file
-                with open(file_path, 'r') as f:
-                    song_data = json.load(f)
-                # Clear current song
-                self.new_song()
-                # Set song name
-                song_name = song_data.get("song_name", os.path.splitext(os.path.basename(file_path))[0])
-                self.song_name_var.set(song_name)
-                self.song_name_entry.delete(0, tk.END)
-                self.song_name_entry.insert(0, song_name)
-
-                # Set number of octaves if present
-                self.octaves = song_data.get("number_of_octaves", self.octaves)
-                self.set_octaves(self.octaves)
-
-                # Load saved keyboards
-                for keyboard_data in song_data.get("saved_keyboards", []):
-                    # Recreate the saved keyboards
-                    chord_name = keyboard_data["chord_name"]
-                    key_states = keyboard_data["key_states"]
-                    # Create a new saved keyboard
-                    canvas_width = self.input_canvas.winfo_width()
-                    canvas_height = self.input_canvas.winfo_height()
-                    saved_canvas = tk.Canvas(self.current_row_frame, width=canvas_width, height=canvas_height + 20,
-                                             bg='lightgray', bd=0, highlightthickness=0)
-
-                    saved_canvas.pack(side='left', padx=5, pady=5)
-                    self.keyboards_in_row += 1
-
-                    # Draw the keys on the saved canvas
-                    self.draw_saved_canvas(saved_canvas, key_states)
-
-                    # Add the chord name above the saved keyboard
-                    saved_canvas.create_text(canvas_width / 2, canvas_height + 10, text=chord_name, font=("Arial", 10))
-
-                    # Create a SavedKeyboard object and add it to the list
-                    saved_keyboard = SavedKeyboard(saved_canvas, chord_name, key_states)
-                    self.saved_keyboards.append(saved_keyboard)
-
-                    # Bind click event to load the saved keyboard for editing
-                    saved_canvas.bind("<Button-1>", lambda event, sk=saved_keyboard: self.load_keyboard(sk))
-
-                    if self.keyboards_in_row >= self.max_keyboards_per_row:
-                        # Start a new row
-                        self.current_row_frame = tk.Frame(self.saved_keyboards_frame.scrollable_frame)
-                        self.current_row_frame.pack(anchor='w', pady=5)
-                        self.keyboards_in_row = 0
-
-                # Update the scroll region
-                self.saved_keyboards_frame.canvas.update_idletasks()
-                self.saved_keyboards_frame.canvas.configure(scrollregion=self.saved_keyboards_frame.canvas.bbox('all'))
-
-                # Scroll to the bottom to show the latest keyboard
-                self.saved_keyboards_frame.canvas.yview_moveto(1.0)
-
-                self.unsaved_changes = False
-                self.song_saved = True
-                self.current_song_file = file_path
-
-                messagebox.showinfo("Load Song", f"Song loaded successfully from '{file_path}'.")
-            except Exception as e:
-                messagebox.showerror("Error", f"An error occurred while loading the song:\n{e}")
-
-    def on_closing(self):
-        try:
-            lang = self.language_var.get()
-            if not self.song_saved:
-                response = messagebox.askyesnocancel(self.translations[lang]['save_song'],
-                                                     self.translations[lang]['save_song_prompt'])
-                if response:  # User chose 'Yes' to save
-                    self.save_song()
-                elif response is False:  # User chose 'No'
-                    pass
-                else:
-                    return  # User chose 'Cancel' or closed the dialog
-            elif self.unsaved_changes:
-                response = messagebox.askyesnocancel(self.translations[lang]['save_song'],
-                                                     self.translations[lang]['unsaved_changes_message'])
-                if response:  # User chose 'Yes' to save
-                    self.save_song()
-                    self.root.destroy()
-                elif response is False:  # User chose 'No'
-                    self.root.destroy()
-                else:
-                    pass  # User chose 'Cancel' or closed the dialog
-            else:
-                self.root.destroy()
-            # Save settings on exit
-            self.save_settings()
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred while exiting:\n{e}")
-
-    def play_note_wrapper(self, key):
-        # Adjust the note according to playback octave
-        octave_shift = self.playback_octave.get() * 12
-        if self.output_method.get() == "MIDI Output" and self.midi_output:
-            # Adjust MIDI note
-            midi_note = key.midi_note + octave_shift
-            if 0 <= midi_note <= 127:
-                threading.Thread(target=self.play_midi_note, args=(midi_note,), daemon=True).start()
-            else:
-                lang = self.language_var.get()
-                messagebox.showwarning(self.translations[lang]['invalid_note_title'], self.translations[lang]['invalid_note'])
-        else:
-            # Adjust frequency
-            frequency = key.frequency * (2 ** self.playback_octave.get())
-            threading.Thread(target=play_note_pc, args=(frequency,), kwargs={'volume': self.pc_volume.get()}, daemon=True).start()
-
-    def play_midi_note(self, midi_note, duration=0.5):
-        velocity = self.midi_volume.get()
-        msg_on = mido.Message('note_on', note=midi_note, velocity=velocity)
-        msg_off = mido.Message('note_off', note=midi_note, velocity=velocity)
-        self.midi_output.send(msg_on)
-        time.sleep(duration)
-        self.midi_output.send(msg_off)
-
-    def play_chord(self):
-        # Collect selected keys
-        selected_keys = [key for key in self.white_keys + self.black_keys if key.selected]
-        if not selected_keys:
-            # Should not happen since button is disabled when no keys are selected
-            return
-        # Sort keys from lowest to highest frequency
-        selected_keys.sort(key=lambda k: k.frequency)
-        if self.chord_speed.get() == 0:
-            # Play all notes at once
-            if self.output_method.get() == "MIDI Output" and self.midi_output:
-                midi_notes = []
-                octave_shift = self.playback_octave.get() * 12
-                for key in selected_keys:
-                    midi_note = key.midi_note + octave_shift
-                    if 0 <= midi_note <= 127:
-                        midi_notes.append(midi_note)
-                    else:
-                        lang = self.language_var.get()
-                        messagebox.showwarning(self.translations[lang]['invalid_note_title'], self.translations[lang]['invalid_note'])
-                        return
-                threading.Thread(target=self.play_midi_chord, args=(midi_notes,), daemon=True).start()
-            else:
-                frequencies = [key.frequency * (2 ** self.playback_octave.get()) for key in selected_keys]
-                # Generate and play chord
-                threading.Thread(target=play_chord_pc, args=(frequencies,), kwargs={'volume': self.pc_volume.get()}, daemon=True).start()
-        else:
-            # Play notes one by one based on chord speed
-            threading.Thread(target=self.play_arpeggiated_chord, args=(selected_keys,), daemon=True).start()
-
-    def play_arpeggiated_chord(self, selected_keys):
-        while selected_keys:
-            speed = self.chord_speed.get()
-            if speed == 0:
-                delay = 0.1
-            else:
-                delay = 2.0 / speed  # Inverse relationship: higher speed = shorter delay
-            key = selected_keys.pop(0)
-            self.play_note_wrapper(key)
-            start_time = time.time()
-            while time.time() - start_time < delay:
-                time.sleep(0.01)
-
-    def play_midi_chord(self, midi_notes, duration=0.5):
-        velocity = self.midi_volume.get()
-        msgs_on = [mido.Message('note_on', note=note, velocity=velocity) for note in midi_notes]
-        msgs_off = [mido.Message('note_off', note=note, velocity=velocity) for note in midi_notes]
-        for msg in msgs_on:
-            self.midi_output.send(msg)
-        time.sleep(duration)
-        for msg in msgs_off:
-            self.midi_output.send(msg)
-
-    def toggle_mute(self):
-        self.is_muted = not self.is_muted
-        self.is_muted_var.set(self.is_muted)
-        lang = self.language_var.get()
-        if self.is_muted:
-            self.mute_button.config(text=self.translations[lang]['unmute_input'])
-        else:
-            self.mute_button.config(text=self.translations[lang]['mute_input'])
-
-    def play_or_stop_song(self):
-        lang = self.language_var.get()
-        if self.is_playing_song:
-            # Stop song playback
-            self.is_playing_song = False
-            self.play_song_button.config(text=self.translations[lang]['play_song'])
-            self.playback_status_var.set(self.translations[lang]['playback_stopped'])
-        else:
-            # Start song playback
-            self.is_playing_song = True
-            self.play_song_button.config(text=self.translations[lang]['stop_song'])
-            threading.Thread(target=self._play_song_thread, daemon=True).start()
-
-    def _play_song_thread(self):
-        idx = 0
-        total_chords = len(self.saved_keyboards)
-        while idx < total_chords and self.is_playing_song:
-            saved_keyboard = self.saved_keyboards[idx]
-            chord_name = saved_keyboard.chord_name
-            key_states = saved_keyboard.key_states
-            all_keys = self.white_keys + self.black_keys
-            selected_keys = [key for key, selected in zip(all_keys, key_states) if selected]
-            if selected_keys:
-                # Sort keys from lowest to highest frequency
-                selected_keys.sort(key=lambda k: k.frequency)
-                # Update playback status
-                lang = self.language_var.get()
-                self.playback_status_var.set(f"{self.translations[lang]['playing']} {chord_name}")
-                self.root.after(0, self.root.update_idletasks)
-
-                # Highlight the saved keyboard
-                self.highlight_saved_keyboard(saved_keyboard)
-
-                if self.chord_speed.get() == 0:
-                    # Play all notes at once
-                    if self.output_method.get() == "MIDI Output" and self.midi_output:
-                        midi_notes = []
-                        octave_shift = self.playback_octave.get() * 12
-                        for key in selected_keys:
-                            midi_note = key.midi_note + octave_shift
-                            if 0 <= midi_note <= 127:
-                                midi_notes.append(midi_note)
-                            else:
-                                lang = self.language_var.get()
-                                messagebox.showwarning(self.translations[lang]['invalid_note_title'], self.translations[lang]['invalid_note'])
-                                self.is_playing_song = False
-                                break
-                        if not self.is_playing_song:
-                            break
-                        self.play_midi_chord(midi_notes, duration=0.5)
-                    else:
-                        frequencies = [key.frequency * (2 ** self.playback_octave.get()) for key in selected_keys]
-                        play_chord_pc(frequencies, duration=0.5, volume=self.pc_volume.get())
-                else:
-                    # Play notes one by one based on chord speed
-                    self.play_arpeggiated_chord_during_song(selected_keys)
-
-                # Calculate delay based on song speed
-                delay = 2.0 / self.song_speed.get()  # Inverse relationship
-
-                # Wait for the duration of the song speed
-                start_time = time.time()
-                while time.time() - start_time < delay:
-                    if not self.is_playing_song:
-                        break
-                    time.sleep(0.1)
-                if not self.is_playing_song:
-                    break
-
-                # Remove highlight
-                self.unhighlight_saved_keyboard(saved_keyboard)
-            idx += 1
-        # Clear playback status after playback
-        self.playback_status_var.set("")
-        self.is_playing_song = False
-        lang = self.language_var.get()
-        self.play_song_button.config(text=self.translations[lang]['play_song'])
-
-    def play_arpeggiated_chord_during_song(self, selected_keys):
-        while selected_keys and self.is_playing_song:
-            speed = self.chord_speed.get()
-            if speed == 0:
-                delay = 0.1
-            else:
-                delay = 2.0 / speed  # Inverse relationship: higher speed = shorter delay
-            key = selected_keys.pop(0)
-            self.play_note_wrapper(key)
-            start_time = time.time()
-            while time.time() - start_time < delay:
-                if not self.is_playing_song:
-                    break
-                time.sleep(0.05)
-
-    def highlight_saved_keyboard(self, saved_keyboard):
-        saved_canvas = saved_keyboard.canvas
-        x0, y0, x1, y1 = saved_canvas.bbox("all")
-        saved_keyboard.border_rect = saved_canvas.create_rectangle(x0, y0, x1, y1, outline="red", width=2)
-
-    def unhighlight_saved_keyboard(self, saved_keyboard):
-        if saved_keyboard.border_rect:
-            saved_keyboard.canvas.delete(saved_keyboard.border_rect)
-            saved_keyboard.border_rect = None
-
-    def save_settings(self):
-        if not self.config.has_section('Settings'):
-            self.config.add_section('Settings')
-        self.config.set('Settings', 'number_of_octaves', str(self.octaves))
-        self.config.set('Settings', 'output_method', self.output_method.get())
-        self.config.set('Settings', 'midi_port', self.selected_midi_port or '')
-        self.config.set('Settings', 'midi_instrument', str(self.midi_instrument))
-        self.config.set('Settings', 'midi_instrument_name', self.midi_instrument_name)
-        self.config.set('Settings', 'pc_volume', str(self.pc_volume.get()))
-        self.config.set('Settings', 'midi_volume', str(self.midi_volume.get()))
-        self.config.set('Settings', 'song_speed', str(self.song_speed.get()))
-        self.config.set('Settings', 'chord_speed', str(self.chord_speed.get()))
-        self.config.set('Settings', 'playback_octave', str(self.playback_octave.get()))
-        self.config.set('Settings', 'language', self.language_var.get())
-        if self.help_window_rel_x is not None and self.help_window_rel_y is not None:
-            self.config.set('Settings', 'help_window_rel_x', str(self.help_window_rel_x))
-            self.config.set('Settings', 'help_window_rel_y', str(self.help_window_rel_y))
-        else:
-            if self.config.has_option('Settings', 'help_window_rel_x'):
-                self.config.remove_option('Settings', 'help_window_rel_x')
-            if self.config.has_option('Settings', 'help_window_rel_y'):
-                self.config.remove_option('Settings', 'help_window_rel_y')
-        with open('settings.ini', 'w') as configfile:
-            self.config.write(configfile)
-
-    def load_settings(self):
-        if os.path.exists('settings.ini'):
-            self.config.read('settings.ini')
-            # Load language setting
-            self.language_var = tk.StringVar(value=self.config.get('Settings', 'language', fallback='en'))
-            self.language_var.trace('w', self.change_language)
-            # Load help window position relative to main window
-            help_window_rel_x = self.config.get('Settings', 'help_window_rel_x', fallback=None)
-            help_window_rel_y = self.config.get('Settings', 'help_window_rel_y', fallback=None)
-
-            if help_window_rel_x and help_window_rel_x.strip() != '':
-                self.help_window_rel_x = int(help_window_rel_x)
-            else:
-                self.help_window_rel_x = None
-
-            if help_window_rel_y and help_window_rel_y.strip() != '':
-                self.help_window_rel_y = int(help_window_rel_y)
-            else:
-                self.help_window_rel_y = None
-        else:
-            # Create default settings if settings.ini does not exist
-            self.config['Settings'] = {
-                'number_of_octaves': '4',
-                'output_method': 'PC Audio',
-                'midi_port': '',
-                'midi_instrument': '0',
-                'midi_instrument_name': 'Acoustic Grand Piano',
-                'pc_volume': '0.5',
-                'midi_volume': '64',
-                'song_speed': '10',  # Default to medium speed
-                'chord_speed': '0',
-                'playback_octave': '0',
-                'language': 'en'
-            }
-            with open('settings.ini', 'w') as configfile:
-                self.config.write(configfile)
-            # Initialize help window positions
-            self.help_window_rel_x = None
-            self.help_window_rel_y = None
-
-    def recognize_chord(self):
-        selected_keys = [key for key in self.white_keys + self.black_keys if key.selected]
-        if not selected_keys:
-            # No keys selected
-            return
-
-        # Get MIDI numbers of selected keys
-        midi_notes = sorted([key.midi_note % 12 for key in selected_keys])  # Normalize to one octave (0-11)
-
-        # Remove duplicates
-        midi_notes = sorted(set(midi_notes))
-
-        # Map MIDI note numbers to note names
-        note_names_sharp = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-
-        # Try all possible roots
-        possible_chords = []
-        for root in midi_notes:
-            intervals = [(note - root) % 12 for note in midi_notes]
-            intervals = sorted(intervals)
-
-            # Match intervals to chord types
-            chord_type = self.match_intervals_to_chord(intervals)
-            if chord_type:
-                chord_name = f"{note_names_sharp[root]} {chord_type}"
-                possible_chords.append(chord_name)
-
-        if possible_chords:
-            # Choose the most likely chord (first in the list)
-            recognized_chord = possible_chords[0]
-            self.chord_name_var.set(recognized_chord)
-            # Suppress pop-up message
-            # messagebox.showinfo("Chord Recognition", f"Recognized Chord: {recognized_chord}")
-        else:
-            # Suppress pop-up message
-            lang = self.language_var.get()
-            messagebox.showinfo(self.translations[lang]['chord_recognition_title'], self.translations[lang]['chord_not_recognized'])
-
-    def match_intervals_to_chord(self, intervals):
-        # Common chord types and their intervals
-        chord_types = {
-            'Major': [0, 4, 7],
-            'Minor': [0, 3, 7],
-            'Diminished': [0, 3, 6],
-            'Augmented': [0, 4, 8],
-            'Major Seventh': [0, 4, 7, 11],
-            'Minor Seventh': [0, 3, 7, 10],
-            'Dominant Seventh': [0, 4, 7, 10],
-            'Suspended 2nd': [0, 2, 7],
-            'Suspended 4th': [0, 5, 7],
-            'Major Sixth': [0, 4, 7, 9],
-            'Minor Sixth': [0, 3, 7, 9],
-            'Ninth': [0, 4, 7, 10, 14],
-            'Minor Ninth': [0, 3, 7, 10, 14],
-            'Eleventh': [0, 4, 7, 10, 14, 17],
-            'Minor Eleventh': [0, 3, 7, 10, 14, 17],
-            'Thirteenth': [0, 4, 7, 10, 14, 17, 21],
-            'Minor Thirteenth': [0, 3, 7, 10, 14, 17, 21],
-            'Augmented Seventh': [0, 4, 8, 10],
-            'Diminished Seventh': [0, 3, 6, 9],
-            'Half-Diminished Seventh': [0, 3, 6, 10]
-        }
-
-        for chord_type, chord_intervals in chord_types.items():
-            if chord_intervals == intervals:
-                return chord_type
-            # Check for subset match (e.g., if user plays only root and third)
-            elif set(intervals).issubset(chord_intervals):
-                return chord_type
-        return None
-
-    def change_language(self, *args):
-        lang = self.language_var.get()
-
-        # Update window title
-        self.root.title(self.translations[lang]['title'])
-
-        # Update labels
-        self.octave_label.config(text=f"{self.translations[lang]['number_of_octaves']}: {self.octaves}")
-        self.song_name_label.config(text=self.translations[lang]['song_name'])
-
-        # Update buttons
-        if self.currently_editing_keyboard:
-            self.next_chord_button.config(text=self.translations[lang]['save_chord'])
-        else:
-            self.next_chord_button.config(text=self.translations[lang]['next_chord'])
-        self.play_chord_button.config(text=self.translations[lang]['play_chord'])
-        self.clear_chord_button.config(text=self.translations[lang]['clear_chord'])
-        self.delete_chord_button.config(text=self.translations[lang]['delete_chord'])
-        self.play_song_button.config(text=self.translations[lang]['play_song'] if not self.is_playing_song else self.translations[lang]['stop_song'])
-        self.mute_button.config(text=self.translations[lang]['mute_input'] if not self.is_muted else self.translations[lang]['unmute_input'])
-        self.what_chord_button.config(text=self.translations[lang]['what_chord'])
-
-        # Update volume and speed labels
-        self.pc_volume_label.config(text=self.translations[lang]['pc_volume'])
-        self.midi_volume_label.config(text=self.translations[lang]['midi_volume'])
-        self.chord_speed_label.config(text=self.translations[lang]['chord_speed'])
-        self.song_speed_label.config(text=self.translations[lang]['song_speed'])
-
-        # Update message labels
-        self.message_label_var.set("")
-        self.playback_status_var.set("")
-
-        # Update menu labels by recreating the menu
-        self.create_menu()
-
-        # Save the selected language to settings
-        self.save_settings()
-
-
-# Function to play a single note using PC audio
-def play_note_pc(frequency, duration=0.5, volume=0.5):
-    fs = 44100  # Sampling rate
-    t = np.linspace(0, duration, int(fs * duration), False)
-    note = np.sin(frequency * t * 2 * np.pi)
-    audio = note * volume * (2 ** 15 - 1) / np.max(np.abs(note))
-    audio = audio.astype(np.int16)
-    sa.play_buffer(audio, 1, 2, fs)
-
-
-# Function to play a chord using PC audio
-def play_chord_pc(frequencies, duration=0.5, volume=0.5):
-    fs = 44100  # Sampling rate
-    t = np.linspace(0, duration, int(fs * duration), False)
-    # Generate sine wave for each frequency
-    notes = [np.sin(frequency * t * 2 * np.pi) for frequency in frequencies]
-    # Sum the notes
-    audio = np.sum(notes, axis=0)
-    # Normalize the audio to prevent clipping
-    audio = audio / np.max(np.abs(audio))
-    # Scale to 16-bit integer range and apply volume
-    audio = audio * volume * (2 ** 15 - 1)
-    audio = audio.astype(np.int16)
-    sa.play_buffer(audio, 1, 2, fs)
-
-
-if __name__ == "__main__":
-    root = tk.Tk()
-    app = PianoApp(root)
-    root.mainloop()
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog, simpledialog
+import json
+import platform
+import os
+import threading
+import queue
+import numpy as np
+try:
+    import simpleaudio as sa
+except ImportError:
+    sa = None  # Without simpleaudio, PC audio goes to the null backend
+from reportlab.pdfgen import canvas as pdf_canvas
+from reportlab.lib.pagesizes import A4
+import time
+import mido
+import sys
+import configparser
+import difflib
+import cProfile
+import pstats
+import sqlite3
+import argparse
+import asyncio
+import hashlib
+import io
+import tempfile
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+import re
+import struct
+from array import array
+import heapq
+import mmap
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+
+try:
+    import inotify_simple  # Optional: lets the song file watcher wait for changes instead of polling (Linux)
+except ImportError:
+    inotify_simple = None
+
+try:
+    import rtmidi  # Required for mido to access MIDI ports
+except ImportError:
+    rtmidi = None  # Without python-rtmidi, MIDI output goes to the null backend and there is no MIDI input
+
+
+class PianoKey:
+    """Class representing a single piano key."""
+
+    def __init__(self, canvas, x, y, width, height, color, is_black=False,
+                 note_name=None, frequency=None, midi_note=None, app=None):
+        self.canvas = canvas
+        self.is_black = is_black
+        self.selected = False
+        self.original_color = color
+        self.note_name = note_name
+        self.frequency = frequency
+        self.midi_note = midi_note
+        self.app = app  # Reference to the main application
+
+        # Draw the key on the canvas
+        counters.count('canvas.items')
+        self.rect = canvas.create_rectangle(x, y, x + width, y + height,
+                                            fill=color, outline="black", width=1)
+
+        # Bind mouse click to the key
+        canvas.tag_bind(self.rect, "<Button-1>", self.on_click)
+
+    def on_click(self, event):
+        # A keypress trace starts when Tk hands us the click
+        trace_id = tracer.begin('keypress', self.note_name)
+        if not self.selected:
+            # Mark the key as selected
+            self.selected = True
+            self.canvas.itemconfig(self.rect, fill="blue")
+        else:
+            # Deselect the key
+            self.selected = False
+            self.canvas.itemconfig(self.rect, fill=self.original_color)
+        # Play the note if not muted
+        if not self.app.is_muted:
+            self.app.play_note_wrapper(self, trace_id)
+        # Update button states
+        self.app.update_button_states()
+
+
+class SavedKeyboard:
+    """Class representing a saved keyboard (chord)."""
+
+    def __init__(self, canvas, chord_name, key_states):
+        self.canvas = canvas
+        self.chord_name = chord_name
+        self.key_states = key_states
+        self.border_rect = None  # For highlighting during playback
+
+
+class EditHistory:
+    """Unlimited undo/redo of chord edits, packed into one byte log per direction.
+
+    An entry is a list of operations (kind, index, mask, key count, old name, new name). Chords are
+    stored as bitmasks of their key_states; for edits the mask is the XOR of the old and new chord, so
+    undo and redo apply the same diff, and names are only stored when they change.
+    """
+
+    EDIT, INSERT, DELETE, INPUT = range(4)
+    HEADER = struct.Struct('<BIHBHH')  # Kind, index, key count, mask bytes, old name bytes, new name bytes
+
+    def __init__(self):
+        self.undo_log = bytearray()
+        self.undo_offsets = array('I')  # Start of each entry in the log
+        self.redo_log = bytearray()
+        self.redo_offsets = array('I')
+
+    @staticmethod
+    def mask(key_states):
+        return sum(1 << i for i, selected in enumerate(key_states) if selected)
+
+    @staticmethod
+    def key_states(mask, key_count):
+        return [bool(mask >> i & 1) for i in range(key_count)]
+
+    def record(self, operations):
+        if operations:
+            self._push(self.undo_log, self.undo_offsets, self._pack(operations))
+            # A new edit ends the redo branch
+            self.redo_log.clear()
+            self.redo_offsets = array('I')
+
+    def undo(self):
+        # The operations of the last entry (to be reverted in reverse order), or None
+        return self._move(self.undo_log, self.undo_offsets, self.redo_log, self.redo_offsets)
+
+    def redo(self):
+        return self._move(self.redo_log, self.redo_offsets, self.undo_log, self.undo_offsets)
+
+    def clear(self):
+        self.undo_log.clear()
+        self.redo_log.clear()
+        self.undo_offsets = array('I')
+        self.redo_offsets = array('I')
+
+    def nbytes(self):
+        return (len(self.undo_log) + len(self.redo_log) +
+                (len(self.undo_offsets) + len(self.redo_offsets)) * self.undo_offsets.itemsize)
+
+    def _move(self, source_log, source_offsets, target_log, target_offsets):
+        if not source_offsets:
+            return None
+        start = source_offsets.pop()
+        data = bytes(source_log[start:])
+        del source_log[start:]
+        self._push(target_log, target_offsets, data)
+        return self._unpack(data)
+
+    @staticmethod
+    def _push(log, offsets, data):
+        offsets.append(len(log))
+        log += data
+
+    def _pack(self, operations):
+        data = bytearray()
+        for kind, index, mask, key_count, old_name, new_name in operations:
+            mask_bytes = mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+            if old_name == new_name and kind in (self.EDIT, self.INPUT):
+                old_name = new_name = ''  # Unchanged name
+            old_bytes, new_bytes = old_name.encode('utf-8'), new_name.encode('utf-8')
+            data += self.HEADER.pack(kind, index, key_count, len(mask_bytes), len(old_bytes), len(new_bytes))
+            data += mask_bytes + old_bytes + new_bytes
+        return data
+
+    def _unpack(self, data):
+        operations = []
+        position = 0
+        while position < len(data):
+            kind, index, key_count, mask_size, old_size, new_size = self.HEADER.unpack_from(data, position)
+            position += self.HEADER.size
+            mask = int.from_bytes(data[position:position + mask_size], 'little')
+            position += mask_size
+            old_name = data[position:position + old_size].decode('utf-8')
+            position += old_size
+            new_name = data[position:position + new_size].decode('utf-8')
+            position += new_size
+            operations.append((kind, index, mask, key_count, old_name, new_name))
+        return operations
+
+
+class SongFileWatcher:
+    """Watches a song file for changes made by other programs and parses it again on a background thread.
+
+    Uses inotify (through the optional inotify_simple package) where available, and polls the
+    modification time and size otherwise. Parsed songs are put on a queue for the Tk thread.
+    """
+
+    def __init__(self, file_path, interval=0.5):
+        self.file_path = file_path
+        self.interval = interval
+        self.changes = queue.SimpleQueue()  # (song name, number of octaves, [(chord name, key_states)])
+        self.stamp = self._stamp()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._watch_loop, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def mark_seen(self):
+        # The app wrote the file itself; that version needs no reload
+        self.stamp = self._stamp()
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _watch_loop(self):
+        if inotify_simple is not None:
+            try:
+                self._inotify_loop()
+                return
+            except OSError:
+                pass  # No inotify here after all; poll instead
+        while not self.stop_event.wait(self.interval):
+            self._check()
+
+    def _inotify_loop(self):
+        # Watch the folder, since editors and scripts often replace the file instead of writing it in place
+        inotify = inotify_simple.INotify()
+        try:
+            flags = inotify_simple.flags
+            inotify.add_watch(os.path.dirname(os.path.abspath(self.file_path)),
+                              flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE)
+            file_name = os.path.basename(self.file_path)
+            while not self.stop_event.is_set():
+                if any(event.name == file_name for event in inotify.read(timeout=int(self.interval * 1000))):
+                    self._check()
+        finally:
+            inotify.close()
+
+    def _check(self):
+        stamp = self._stamp()
+        if stamp is None or stamp == self.stamp:
+            return
+        # Wait for a writer that is still busy to finish
+        time.sleep(0.1)
+        if self._stamp() != stamp:
+            return  # Checked again on the next round
+        self.stamp = stamp
+        try:
+            with open(self.file_path, 'r') as f:
+                song_data = json.load(f)
+            chords = [(keyboard_data["chord_name"], keyboard_data["key_states"])
+                      for keyboard_data in song_keyboards(song_data)]
+        except (OSError, ValueError, KeyError, TypeError):
+            return  # Half-written or not a song (yet); the next write is checked again
+        self.changes.put((song_data.get("song_name"), song_data.get("number_of_octaves"), chords))
+
+
+class ScrollFrame(tk.Frame):
+    """A scrollable frame class for Tkinter."""
+
+    def __init__(self, parent, *args, **kwargs):
+        super().__init__(parent, *args, **kwargs)
+
+        # Create a canvas object and a vertical scrollbar for scrolling
+        self.vscrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL)
+        self.vscrollbar.pack(fill=tk.Y, side=tk.RIGHT, expand=False)
+        self.canvas = tk.Canvas(self, bd=0, highlightthickness=0,
+                                yscrollcommand=self.vscrollbar.set)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.vscrollbar.config(command=self.canvas.yview)
+
+        # Create a frame inside the canvas which will be scrolled
+        self.scrollable_frame = tk.Frame(self.canvas)
+        # Store the window item ID
+        self.window_item = self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor='nw')
+
+        # Bind events to make sure the scrollable frame resizes properly
+        self.scrollable_frame.bind("<Configure>", self.on_frame_configure)
+        self.canvas.bind("<Configure>", self.on_canvas_configure)
+
+        # Bind mousewheel events
+        self.bind_mousewheel(self.canvas)
+
+    def on_frame_configure(self, event):
+        # Update the scroll region to encompass the inner frame
+        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+
+    def on_canvas_configure(self, event):
+        # Resize the inner frame to match the canvas size
+        canvas_width = event.width
+        self.canvas.itemconfigure(self.window_item, width=canvas_width)
+
+    def bind_mousewheel(self, widget):
+        # Cross-platform scrolling
+        widget.bind("<Enter>", lambda _: widget.bind_all("<MouseWheel>", self._on_mousewheel))
+        widget.bind("<Leave>", lambda _: widget.unbind_all("<MouseWheel>"))
+
+    def _on_mousewheel(self, event):
+        # Handle mousewheel scrolling
+        if platform.system() == 'Windows':
+            delta = int(-1 * (event.delta / 120))
+        elif platform.system() == 'Darwin':
+            delta = int(-1 * event.delta)
+        else:
+            delta = 1 if event.num == 5 else -1
+        self.canvas.yview_scroll(delta, "units")
+
+
+class ChordPrerenderer:
+    """Background worker that renders upcoming song chords while the current one plays."""
+
+    def __init__(self, render_function, chords, lookahead=4, cache_size=16):
+        self.render_function = render_function
+        self.chords = chords
+        # Recently rendered chords, so repeated chords in a song are synthesized once
+        self.rendered = OrderedDict()
+        self.cache_size = cache_size
+        # Bounded queue so memory stays flat on long songs
+        self.queue = queue.Queue(maxsize=max(1, lookahead))
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._render_loop, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _render_loop(self):
+        for chord in self.chords:
+            if self.stop_event.is_set():
+                return
+            key = tuple(chord)
+            audio = self.rendered.get(key)
+            if audio is None:
+                counters.count('prerender_cache.misses')
+                audio = self.render_function(chord)
+                self.rendered[key] = audio
+                while len(self.rendered) > self.cache_size:
+                    self.rendered.popitem(last=False)
+            else:
+                counters.count('prerender_cache.hits')
+                self.rendered.move_to_end(key)
+            # Block while the queue is full, but keep checking for a stop request
+            while not self.stop_event.is_set():
+                try:
+                    self.queue.put(audio, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+
+    def get_nowait(self):
+        # Return the next rendered chord, or None if it is not ready yet (underrun)
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def get(self):
+        # Wait for the next rendered chord; returns None when the worker was stopped
+        while not self.stop_event.is_set():
+            try:
+                return self.queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return None
+
+
+class MidiClockFollower:
+    """Follows incoming MIDI clock (24 ticks per beat), smoothing the tick times with an alpha-beta filter."""
+
+    TICKS_PER_BEAT = 24
+
+    def __init__(self, alpha=0.2, beta=0.05):
+        self.alpha = alpha  # Correction of the tick time
+        self.beta = beta  # Correction of the tick period
+        self.condition = threading.Condition()
+        self.running = False
+        self.generation = 0  # Counts start messages, so playback notices a restart
+        self.tick = -1  # Ticks since the last start message
+        self.tick_time = None  # Smoothed time of the last tick
+        self.tick_period = None  # Smoothed seconds per tick
+
+    def handle(self, msg, timestamp):
+        with self.condition:
+            if msg.type == 'start':
+                self.running = True
+                self.generation += 1
+                self.tick = -1
+                self.tick_time = None
+            elif msg.type == 'continue':
+                # The pause is not a tick interval: keep the tempo, but take the phase from the next tick
+                self.running = True
+                self.tick_time = None
+            elif msg.type == 'stop':
+                self.running = False
+            elif msg.type == 'clock' and self.running:
+                self.tick += 1
+                if self.tick_time is None:
+                    self.tick_time = timestamp
+                elif self.tick_period is None:
+                    self.tick_period = timestamp - self.tick_time
+                    self.tick_time = timestamp
+                else:
+                    predicted = self.tick_time + self.tick_period
+                    error = timestamp - predicted
+                    self.tick_time = predicted + self.alpha * error
+                    self.tick_period = max(1e-4, self.tick_period + self.beta * error)
+            self.condition.notify_all()
+
+    def bpm(self):
+        with self.condition:
+            return 60.0 / (self.tick_period * self.TICKS_PER_BEAT) if self.tick_period else None
+
+    def wait_for_start(self, keep_waiting):
+        # Wait for a start (or continue) message; returns the generation, or None if waiting was cancelled
+        with self.condition:
+            while keep_waiting() and not self.running:
+                self.condition.wait(0.05)
+            return self.generation if keep_waiting() else None
+
+    def wait_for_tick(self, tick, generation, keep_waiting):
+        # Return the smoothed time at which the given tick falls, waiting until it can be predicted;
+        # None if waiting was cancelled or the clock was restarted
+        with self.condition:
+            while keep_waiting() and self.generation == generation and (
+                    not self.running or self.tick_time is None or self.tick_period is None or self.tick < tick - 1):
+                self.condition.wait(0.05)
+            if not keep_waiting() or self.generation != generation:
+                return None
+            return self.tick_time + (tick - self.tick) * self.tick_period
+
+
+class MidiClockSender:
+    """Sends MIDI clock (24 ticks per beat) on a background thread, at a tempo read from a function."""
+
+    def __init__(self, send, bpm_function):
+        self.send = send
+        self.bpm_function = bpm_function
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._clock_loop, daemon=True)
+
+    def start(self):
+        self.send(mido.Message('start'))
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join(timeout=1)
+        self.send(mido.Message('stop'))
+
+    def _clock_loop(self):
+        # Absolute deadlines, so sleep inaccuracies do not add up to drift
+        next_tick = time.perf_counter()
+        while not self.stop_event.is_set():
+            self.send(mido.Message('clock'))
+            next_tick += 60.0 / (self.bpm_function() * MidiClockFollower.TICKS_PER_BEAT)
+            remaining = next_tick - time.perf_counter()
+            if remaining > 0:
+                self.stop_event.wait(remaining)
+
+
+class PianoApp:
+    def __init__(self, root):
+        self.root = root
+
+        # Initialize configuration
+        self.config = configparser.ConfigParser()
+        self.load_settings()
+
+        # Initialize language variable
+        self.language_var = tk.StringVar(value=self.config.get('Settings', 'language', fallback='en'))
+        self.language_var.trace('w', self.change_language)
+
+        # Translation dictionary
+        self.translations = {
+            'en': {
+                'title': "Pianoman v1.0 by FvD",
+                'song_name': "Song Name",
+                'number_of_octaves': "Number of Octaves",
+                'next_chord': "Next Chord",
+                'save_chord': "Save Chord",
+                'play_chord': "Play Chord",
+                'clear_chord': "Clear Chord",
+                'delete_chord': "Delete Chord",
+                'play_song': "Play Song",
+                'stop_song': "Stop Song",
+                'mute_input': "Mute Input",
+                'unmute_input': "Unmute Input",
+                'what_chord': "What Chord?",
+                'pc_volume': "PC Volume:",
+                'midi_volume': "MIDI Volume:",
+                'chord_speed': "Chord Speed:",
+                'song_speed': "Song Speed:",
+                'help': "Help",
+                'file_menu': "File",
+                'edit_menu': "Edit",
+                'analyze_key': "Analyze Key",
+                'smooth_voicings': "Smooth Voicings",
+                'enter_progression': "Enter Progression...",
+                'unknown_chord': "Unknown chord",
+                'undo': "Undo",
+                'redo': "Redo",
+                'playback_menu': "Playback",
+                'options_menu': "Options",
+                'language_menu': "Language / Taal",
+                'new_song': "New Song",
+                'load_song': "Load Song",
+                'save_song': "Save Song",
+                'save_song_as': "Save Song As",
+                'save_as_pdf': "Save as PDF",
+                'print_pdf': "Print PDF",
+                'export_midi': "Export MIDI",
+                'import_midi': "Import MIDI",
+                'import_audio': "Import Audio (WAV)",
+                'song_library': "Song Library",
+                'create_songbook': "Create Songbook...",
+                'export_songbook_pdf': "Export Songbook as PDF...",
+                'exit': "Exit",
+                'unsaved_changes_message': "You have unsaved changes. Do you want to save before exiting?",
+                'save_song_prompt': "The song has not been saved yet. Do you want to save before exiting?",
+                'delete_chord_message': "There is no chord in edit mode to delete.",
+                'playing': "Playing:",
+                'playback_stopped': "Playback stopped.",
+                'playback_diagnostics': "Late chords: {late}, underruns: {underruns}",
+                'clear_loop': "Clear Loop (A-B)",
+                'looping': "Looping:",
+                'sync_midi_clock': "Sync to External MIDI Clock",
+                'send_midi_clock': "Send MIDI Clock",
+                'waiting_for_clock': "Waiting for MIDI clock start...",
+                'invalid_note': "The note is out of MIDI range after octave adjustment.",
+                'invalid_note_title': "Invalid Note",
+                'chord_not_recognized': "Chord not recognized.",
+                'chord_recognition_title': "Chord Recognition",
+                'edit_keys_message': "Edit keys and press Save Chord when finished.",
+                # Add other translations as needed
+            },
+            'nl': {
+                'title': "Pianoman v1.0 door FvD",
+                'song_name': "Liednaam",
+                'number_of_octaves': "Aantal Octaven",
+                'next_chord': "Volgend Akkoord",
+                'save_chord': "Akkoord Opslaan",
+                'play_chord': "Speel Akkoord",
+                'clear_chord': "Wis Akkoord",
+                'delete_chord': "Verwijder Akkoord",
+                'play_song': "Speel Lied",
+                'stop_song': "Stop Lied",
+                'mute_input': "Geluid Uit",
+                'unmute_input': "Geluid Aan",
+                'what_chord': "Welk Akkoord?",
+                'pc_volume': "PC Volume:",
+                'midi_volume': "MIDI Volume:",
+                'chord_speed': "Akkoordsnelheid:",
+                'song_speed': "Liedsnelheid:",
+                'help': "Help",
+                'file_menu': "Bestand",
+                'edit_menu': "Bewerken",
+                'analyze_key': "Analyseer Toonsoort",
+                'smooth_voicings': "Vloeiende Liggingen",
+                'enter_progression': "Akkoordenreeks Invoeren...",
+                'unknown_chord': "Onbekend akkoord",
+                'undo': "Ongedaan Maken",
+                'redo': "Opnieuw Uitvoeren",
+                'playback_menu': "Afspelen",
+                'options_menu': "Opties",
+                'language_menu': "Taal / Language",
+                'new_song': "Nieuw Lied",
+                'load_song': "Laad Lied",
+                'save_song': "Bewaar Lied",
+                'save_song_as': "Bewaar Lied Als",
+                'save_as_pdf': "Bewaar als PDF",
+                'print_pdf': "Print PDF",
+                'export_midi': "Exporteer MIDI",
+                'import_midi': "Importeer MIDI",
+                'import_audio': "Importeer Audio (WAV)",
+                'song_library': "Songbibliotheek",
+                'create_songbook': "Maak Songbook...",
+                'export_songbook_pdf': "Exporteer Songbook als PDF...",
+                'exit': "Afsluiten",
+                'unsaved_changes_message': "Je hebt niet-opgeslagen wijzigingen. Wil je opslaan voor het afsluiten?",
+                'save_song_prompt': "Het lied is nog niet opgeslagen. Wil je opslaan voor het afsluiten?",
+                'delete_chord_message': "Er is geen akkoord in bewerkingsmodus om te verwijderen.",
+                'playing': "Speelt:",
+                'playback_stopped': "Afspelen gestopt.",
+                'playback_diagnostics': "Te late akkoorden: {late}, onderbrekingen: {underruns}",
+                'clear_loop': "Wis Lus (A-B)",
+                'looping': "Lus:",
+                'sync_midi_clock': "Volg Externe MIDI-klok",
+                'send_midi_clock': "Verstuur MIDI-klok",
+                'waiting_for_clock': "Wachten op start van MIDI-klok...",
+                'invalid_note': "De noot ligt buiten het MIDI-bereik na octaafaanpassing.",
+                'invalid_note_title': "Ongeldige Noot",
+                'chord_not_recognized': "Akkoord niet herkend.",
+                'chord_recognition_title': "Akkoordherkenning",
+                'edit_keys_message': "Bewerk toetsen en druk op Akkoord Opslaan wanneer klaar.",
+                # Add other translations as needed
+            }
+        }
+
+        # Set window title
+        self.root.title(self.translations[self.language_var.get()]['title'])
+
+        # Number of octaves (from settings, default is 4)
+        self.octaves = self.config.getint('Settings', 'number_of_octaves', fallback=4)
+
+        # Key dimensions
+        self.white_key_width = 20
+        self.white_key_height = 100
+        self.black_key_width = 12
+        self.black_key_height = 60
+
+        # Calculate total width of a keyboard
+        total_white_keys = self.octaves * 7
+        keyboard_width = total_white_keys * self.white_key_width + 20  # Extra 20 pixels for margin
+        keyboard_height = 150  # Height of the input keyboard canvas
+
+        # Set main window dimensions
+        window_width = int(2 * keyboard_width) + 50  # Extra margin for scrollbars and borders
+        window_height = int(5 * keyboard_height) + 250  # Adjusted to fit new buttons
+        self.root.geometry(f"{window_width}x{window_height}")
+
+        # Handle window close event
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.root.bind("<Control-z>", lambda event: self.undo())
+        self.root.bind("<Control-y>", lambda event: self.redo())
+        self.root.bind("<Control-Z>", lambda event: self.redo())  # Ctrl+Shift+Z
+
+        # Flag to track unsaved changes
+        self.unsaved_changes = False
+        self.song_saved = False  # Tracks if the song has been saved at least once
+        self.current_song_file = None  # Stores the current song file path
+        self.history = EditHistory()  # Undo/redo of chord edits
+        self.song_loader_stop = threading.Event()  # Set to stop the song file that is being loaded
+
+        # Reload the current song file when another program changes it
+        self.watch_song_file = tk.BooleanVar(value=self.config.getboolean('Settings', 'watch_song_file', fallback=False))
+        self.song_watcher = None
+        self.song_watch_poll_id = None
+
+        # Song library index
+        self.library_path = self.config.get('Settings', 'library_path', fallback='')
+        self.library_database = 'library.sqlite'
+        self.song_library = SongLibrary(self.library_database)
+        self.library_window = None
+        self.library_sort = None  # (column, reversed) of the last sort in the library view
+
+        # Variable to store the last saved PDF file path
+        self.last_pdf_file = None
+
+        # Mute status
+        self.is_muted = False
+
+        # Output method (PC Audio or MIDI)
+        self.output_method = tk.StringVar(value=self.config.get('Settings', 'output_method', fallback="PC Audio"))
+        self.output_method.trace("w", self.update_midi_instrument_menu_state)  # Trace changes
+
+        # MIDI output port
+        self.midi_output = None
+        self.selected_midi_port = self.config.get('Settings', 'midi_port', fallback=None)
+
+        # MIDI input port (live chord entry from a MIDI keyboard)
+        self.midi_input = None
+        self.selected_midi_input_port = self.config.get('Settings', 'midi_input_port', fallback='')
+        self.midi_input_queue = queue.SimpleQueue()
+        self.midi_input_poll_id = None
+        self.held_midi_notes = set()  # Notes currently held down on the MIDI keyboard
+        self.midi_chord_notes = set()  # Notes struck since the last committed chord
+
+        # MIDI clock: follow an external clock on the input port, or send our own on the output port
+        self.clock_follower = MidiClockFollower()
+        self.clock_sync_enabled = tk.BooleanVar(value=self.config.getboolean('Settings', 'clock_sync', fallback=False))
+        self.send_midi_clock = tk.BooleanVar(value=self.config.getboolean('Settings', 'send_midi_clock', fallback=False))
+        self.clock_beats_per_chord = self.config.getint('Settings', 'clock_beats_per_chord', fallback=1)
+
+        # MIDI instrument (default to Acoustic Grand Piano, program number 0)
+        self.midi_instrument = self.config.getint('Settings', 'midi_instrument', fallback=0)
+        self.midi_instrument_name = self.config.get('Settings', 'midi_instrument_name', fallback="Acoustic Grand Piano")
+
+        # PC audio timbre (wavetable synthesizer or sample library)
+        self.pc_timbre = tk.StringVar(value=self.config.get('Settings', 'pc_timbre', fallback="Sine"))
+        self.sample_library_path = self.config.get('Settings', 'sample_library_path', fallback='')
+        if self.sample_library_path:
+            try:
+                load_sample_library(self.sample_library_path)
+            except (OSError, ValueError) as e:
+                print(f"Could not load the sample library: {e}")
+
+        # Volume controls
+        self.pc_volume = tk.DoubleVar(value=self.config.getfloat('Settings', 'pc_volume', fallback=0.5))
+        self.midi_volume = tk.IntVar(value=self.config.getint('Settings', 'midi_volume', fallback=64))
+
+        # Song speed control (1 to 20, integer)
+        self.song_speed = tk.IntVar(value=self.config.getint('Settings', 'song_speed', fallback=10))  # Default to medium speed
+
+        # Chord speed control
+        self.chord_speed = tk.IntVar(value=self.config.getint('Settings', 'chord_speed', fallback=0))  # 0 = all notes at once, 1-20 = arpeggiated speed
+
+        # Starting octave for playback
+        self.playback_octave = tk.IntVar(value=self.config.getint('Settings', 'playback_octave', fallback=0))
+
+        # PC audio effects (reverb from a local impulse response WAV, three-band EQ)
+        self.reverb_enabled = tk.BooleanVar(value=self.config.getboolean('Settings', 'reverb_enabled', fallback=False))
+
+        # Latency tracing and the performance HUD overlay
+        self.latency_tracing = tk.BooleanVar(value=self.config.getboolean('Settings', 'latency_tracing', fallback=False))
+        self.show_hud = tk.BooleanVar(value=self.config.getboolean('Settings', 'show_hud', fallback=False))
+        self.hud_var = tk.StringVar()
+        self.hud_label = None
+        self.hud_update_id = None
+
+        # Profiling mode: per-subsystem counters, and a profiler around loading, exporting and playing songs
+        self.profiling_counters = tk.BooleanVar(
+            value=self.config.getboolean('Settings', 'profiling_counters', fallback=False))
+        self.profiler_mode = tk.StringVar(value=self.config.get('Settings', 'profiler', fallback='Off'))
+        self.reverb_mix = self.config.getfloat('Settings', 'reverb_mix', fallback=0.3)
+        self.impulse_response_path = self.config.get('Settings', 'impulse_response_path', fallback='')
+        self.impulse_response = None
+        if self.impulse_response_path:
+            try:
+                self.impulse_response = load_wav_mono(self.impulse_response_path)
+            except (OSError, ValueError, struct.error) as e:
+                print(f"Could not load the impulse response: {e}")
+        self.eq_preset = tk.StringVar(value=self.config.get('Settings', 'eq_preset', fallback="Flat"))
+        self.update_effects_chain()
+
+        # Help window relative position to main window
+        self.help_window_rel_x = None
+        self.help_window_rel_y = None
+
+        # Flag to control song playback
+        self.is_playing_song = False
+
+        # Number of chords rendered ahead during song playback (PC Audio)
+        self.prerender_lookahead = self.config.getint('Settings', 'prerender_lookahead', fallback=4)
+
+        # A-B loop points (saved keyboards marking the start and end of the practice section)
+        self.loop_start_keyboard = None
+        self.loop_end_keyboard = None
+
+        # Playback diagnostics: chords started late and chords whose audio was not rendered in time
+        self.playback_late_chords = 0
+        self.playback_underruns = 0
+
+        # Song Name Entry with Label
+        self.song_name_var = tk.StringVar()
+        song_name_frame = tk.Frame(root)
+        song_name_frame.pack(pady=5)
+
+        # Add a label for the song name
+        self.song_name_label = tk.Label(song_name_frame, text=self.translations[self.language_var.get()]['song_name'])
+        self.song_name_label.pack(side=tk.LEFT)
+
+        self.song_name_entry = tk.Entry(song_name_frame, textvariable=self.song_name_var)
+        self.song_name_entry.pack(side=tk.LEFT)
+        self.song_name_var.trace("w", self.mark_unsaved)
+
+        # Label for the number of octaves
+        octave_frame = tk.Frame(root)
+        octave_frame.pack(pady=5)
+        self.octave_label = tk.Label(octave_frame, text=f"{self.translations[self.language_var.get()]['number_of_octaves']}: {self.octaves}")
+        self.octave_label.pack(side=tk.LEFT)
+
+        # Frame with scrollbar for saved keyboards using ScrollFrame
+        self.saved_keyboards_frame = ScrollFrame(root)
+        self.saved_keyboards_frame.pack(fill=tk.BOTH, expand=True)
+
+        # Message label above the input keyboard
+        self.message_label_var = tk.StringVar()
+        self.message_label = tk.Label(root, textvariable=self.message_label_var, font=("Arial", 10), fg="red")
+        self.message_label.pack()
+
+        # Canvas for the input keyboard
+        self.input_canvas = tk.Canvas(root, width=keyboard_width, height=keyboard_height, bg='lightgray',
+                                      bd=0, highlightthickness=0)
+        self.input_canvas.pack(pady=5)
+
+        # Add chord name input field and "What Chord?" button
+        self.chord_name_var = tk.StringVar()
+        chord_name_frame = tk.Frame(root)
+        chord_name_frame.pack(pady=5)
+        self.chord_name_entry = tk.Entry(chord_name_frame, textvariable=self.chord_name_var, width=20, justify='center')
+        self.chord_name_entry.pack(side=tk.LEFT)
+        self.chord_name_var.trace("w", self.mark_unsaved)
+        # Enter in the chord name field selects the keys of a chord symbol, or adds a whole progression
+        self.chord_name_entry.bind("<Return>", self.apply_chord_symbol)
+
+        # Add the "What Chord?" button next to the input field
+        self.what_chord_button = tk.Button(chord_name_frame, text=self.translations[self.language_var.get()]['what_chord'], command=self.recognize_chord)
+        self.what_chord_button.pack(side=tk.LEFT, padx=5)
+
+        # Status label to display the chord being played during playback
+        self.playback_status_var = tk.StringVar()
+        self.playback_status_label = tk.Label(root, textvariable=self.playback_status_var, font=("Arial", 12), fg="blue")
+        self.playback_status_label.pack(pady=5)
+
+        # Add buttons below the input keyboard
+        button_frame = tk.Frame(root)
+        button_frame.pack(pady=5)
+
+        self.next_chord_button = tk.Button(button_frame, text=self.translations[self.language_var.get()]['next_chord'], command=self.save_and_reset_keyboard)
+        self.next_chord_button.pack(side=tk.LEFT, padx=5)
+
+        self.play_chord_button = tk.Button(button_frame, text=self.translations[self.language_var.get()]['play_chord'], command=self.play_chord)
+        self.play_chord_button.pack(side=tk.LEFT, padx=5)
+
+        self.clear_chord_button = tk.Button(button_frame, text=self.translations[self.language_var.get()]['clear_chord'], command=self.clear_chord)
+        self.clear_chord_button.pack(side=tk.LEFT, padx=5)
+
+        self.delete_chord_button = tk.Button(button_frame, text=self.translations[self.language_var.get()]['delete_chord'], command=self.delete_current_chord)
+        self.delete_chord_button.pack(side=tk.LEFT, padx=5)
+
+        self.play_song_button = tk.Button(button_frame, text=self.translations[self.language_var.get()]['play_song'], command=self.play_or_stop_song)
+        self.play_song_button.pack(side=tk.LEFT, padx=5)
+
+        self.mute_button = tk.Button(button_frame, text=self.translations[self.language_var.get()]['mute_input'], command=self.toggle_mute)
+        self.mute_button.pack(side=tk.LEFT, padx=5)
+
+        # Volume and Speed Controls
+        volume_frame = tk.Frame(root)
+        volume_frame.pack(pady=5)
+
+        self.pc_volume_label = tk.Label(volume_frame, text=self.translations[self.language_var.get()]['pc_volume'])
+        self.pc_volume_label.pack(side=tk.LEFT)
+        self.pc_volume_slider = tk.Scale(volume_frame, from_=0, to=1, orient=tk.HORIZONTAL, resolution=0.01,
+                                         variable=self.pc_volume)
+        self.pc_volume_slider.pack(side=tk.LEFT)
+
+        self.midi_volume_label = tk.Label(volume_frame, text=self.translations[self.language_var.get()]['midi_volume'])
+        self.midi_volume_label.pack(side=tk.LEFT)
+        self.midi_volume_slider = tk.Scale(volume_frame, from_=0, to=127, orient=tk.HORIZONTAL,
+                                           variable=self.midi_volume)
+        self.midi_volume_slider.pack(side=tk.LEFT)
+
+        self.chord_speed_label = tk.Label(volume_frame, text=self.translations[self.language_var.get()]['chord_speed'])
+        self.chord_speed_label.pack(side=tk.LEFT, padx=5)
+        self.chord_speed_slider = tk.Scale(volume_frame, from_=0, to=20, orient=tk.HORIZONTAL,
+                                           variable=self.chord_speed)
+        self.chord_speed_slider.pack(side=tk.LEFT)
+
+        self.song_speed_label = tk.Label(volume_frame, text=self.translations[self.language_var.get()]['song_speed'])
+        self.song_speed_label.pack(side=tk.LEFT, padx=5)
+        self.song_speed_slider = tk.Scale(volume_frame, from_=1, to=20, orient=tk.HORIZONTAL,
+                                          variable=self.song_speed)
+        self.song_speed_slider.pack(side=tk.LEFT)
+
+        # List to keep track of saved keyboards
+        self.saved_keyboards = []
+
+        # Maximum number of keyboards per row (the saved keyboards are laid out in a grid)
+        self.max_keyboards_per_row = 2
+
+        # Track which keyboard is currently being edited
+        self.currently_editing_keyboard = None
+
+        # Create the menu bar
+        self.create_menu()
+
+        # Draw the input keyboard (moved after button definitions)
+        self.draw_piano()
+
+        # Update button states
+        self.update_button_states()
+
+        # Load MIDI output if necessary
+        if self.output_method.get() == "MIDI Output":
+            self.load_midi_output()
+
+        # Restore latency tracing and the HUD from the last session
+        tracer.enabled = self.latency_tracing.get() or tracer_forced
+        if self.show_hud.get():
+            self.update_latency_tracing()
+
+        # Restore profiling mode from the last session (--profile keeps it on regardless)
+        self.update_profiling(save=False)
+
+        # Reopen the MIDI input port from the last session
+        if self.selected_midi_input_port in midi_input_names():
+            self.select_midi_input_port(self.selected_midi_input_port, show_message=False)
+
+    def create_menu(self):
+        menubar = tk.Menu(self.root)
+
+        lang = self.language_var.get()
+
+        # File Menu
+        file_menu = tk.Menu(menubar, tearoff=0)
+        file_menu.add_command(label=self.translations[lang]['new_song'], command=self.new_song)
+        file_menu.add_command(label=self.translations[lang]['load_song'], command=self.load_song)
+        file_menu.add_command(label=self.translations[lang]['song_library'], command=self.show_song_library)
+        file_menu.add_command(label=self.translations[lang]['save_song'], command=self.save_song)
+        file_menu.add_command(label=self.translations[lang]['save_song_as'], command=self.save_song_as)
+        file_menu.add_separator()
+        file_menu.add_command(label=self.translations[lang]['save_as_pdf'], command=self.save_pdf)
+        file_menu.add_command(label=self.translations[lang]['print_pdf'], command=self.print_pdf)
+        file_menu.add_command(label=self.translations[lang]['create_songbook'], command=self.create_songbook)
+        file_menu.add_command(label=self.translations[lang]['export_songbook_pdf'], command=self.export_songbook_pdf)
+        file_menu.add_command(label=self.translations[lang]['import_midi'], command=self.import_midi)
+        file_menu.add_command(label=self.translations[lang]['import_audio'], command=self.import_audio)
+        file_menu.add_command(label=self.translations[lang]['export_midi'], command=self.export_midi)
+        file_menu.add_separator()
+        file_menu.add_command(label=self.translations[lang]['exit'], command=self.on_closing)
+        menubar.add_cascade(label=self.translations[lang]['file_menu'], menu=file_menu)
+
+        # Edit Menu
+        edit_menu = tk.Menu(menubar, tearoff=0)
+        edit_menu.add_command(label=self.translations[lang]['undo'], command=self.undo, accelerator="Ctrl+Z")
+        edit_menu.add_command(label=self.translations[lang]['redo'], command=self.redo, accelerator="Ctrl+Y")
+        edit_menu.add_separator()
+        edit_menu.add_command(label=self.translations[lang]['next_chord'], command=self.save_and_reset_keyboard)
+        edit_menu.add_command(label=self.translations[lang]['clear_chord'], command=self.clear_chord)
+        edit_menu.add_command(label=self.translations[lang]['delete_chord'], command=self.delete_current_chord)
+        edit_menu.add_separator()
+        edit_menu.add_command(label=self.translations[lang]['enter_progression'], command=self.enter_progression)
+        edit_menu.add_command(label=self.translations[lang]['smooth_voicings'], command=self.smooth_song_voicings)
+        edit_menu.add_command(label=self.translations[lang]['analyze_key'], command=self.analyze_key)
+        menubar.add_cascade(label=self.translations[lang]['edit_menu'], menu=edit_menu)
+
+        # Playback Menu
+        playback_menu = tk.Menu(menubar, tearoff=0)
+        playback_menu.add_command(label=self.translations[lang]['play_chord'], command=self.play_chord)
+        playback_menu.add_command(label=self.translations[lang]['play_song'], command=self.play_or_stop_song)
+        playback_menu.add_command(label=self.translations[lang]['clear_loop'], command=self.clear_loop_points)
+        playback_menu.add_separator()
+        playback_menu.add_checkbutton(label=self.translations[lang]['sync_midi_clock'], variable=self.clock_sync_enabled,
+                                      command=self.save_settings)
+        playback_menu.add_checkbutton(label=self.translations[lang]['send_midi_clock'], variable=self.send_midi_clock,
+                                      command=self.save_settings)
+        playback_menu.add_separator()
+        self.is_muted_var = tk.BooleanVar(value=self.is_muted)
+        playback_menu.add_checkbutton(label=self.translations[lang]['mute_input'], variable=self.is_muted_var, command=self.toggle_mute)
+        menubar.add_cascade(label=self.translations[lang]['playback_menu'], menu=playback_menu)
+
+        # Options Menu
+        options_menu = tk.Menu(menubar, tearoff=0)
+        output_menu = tk.Menu(options_menu, tearoff=0)
+        output_menu.add_radiobutton(label="PC Audio", variable=self.output_method, value="PC Audio",
+                                    command=self.change_output_method)
+        output_menu.add_radiobutton(label="MIDI Output", variable=self.output_method, value="MIDI Output",
+                                    command=self.change_output_method)
+        options_menu.add_cascade(label="Output Method", menu=output_menu)
+
+        # MIDI Device Submenu
+        self.midi_device_menu = tk.Menu(options_menu, tearoff=0)
+        options_menu.add_cascade(label="MIDI Devices", menu=self.midi_device_menu)
+        self.update_midi_device_menu()
+
+        # MIDI Input Device Submenu
+        self.midi_input_menu = tk.Menu(options_menu, tearoff=0)
+        options_menu.add_cascade(label="MIDI Input Devices", menu=self.midi_input_menu,
+                                 postcommand=self.update_midi_input_menu)
+        self.update_midi_input_menu()
+
+        # MIDI Instrument Submenu
+        self.midi_instrument_menu = tk.Menu(options_menu, tearoff=0)
+        options_menu.add_cascade(label="MIDI Instruments", menu=self.midi_instrument_menu)
+        self.create_midi_instrument_menu()
+        self.update_midi_instrument_menu_state()
+
+        # PC Timbre Submenu
+        pc_timbre_menu = tk.Menu(options_menu, tearoff=0)
+        timbres = list(TIMBRES) + ([SAMPLED_PIANO_TIMBRE] if sample_library is not None else [])
+        for timbre in timbres:
+            pc_timbre_menu.add_radiobutton(label=timbre, variable=self.pc_timbre, value=timbre,
+                                           command=self.save_settings)
+        pc_timbre_menu.add_separator()
+        pc_timbre_menu.add_command(label="Load Sample Library...", command=self.select_sample_library)
+        options_menu.add_cascade(label="PC Timbres", menu=pc_timbre_menu)
+
+        # PC Effects Submenu
+        effects_menu = tk.Menu(options_menu, tearoff=0)
+        effects_menu.add_checkbutton(label="Reverb", variable=self.reverb_enabled, command=self.change_effects)
+        effects_menu.add_command(label="Load Impulse Response...", command=self.select_impulse_response)
+        effects_menu.add_separator()
+        for preset in EQ_PRESETS:
+            effects_menu.add_radiobutton(label=f"EQ: {preset}", variable=self.eq_preset, value=preset,
+                                         command=self.change_effects)
+        effects_menu.add_separator()
+        effects_menu.add_command(label="Effects CPU Usage", command=self.show_effects_cpu_usage)
+        options_menu.add_cascade(label="PC Effects", menu=effects_menu)
+
+        options_menu.add_checkbutton(label="Reload Song When Changed on Disk", variable=self.watch_song_file,
+                                     command=self.toggle_song_watcher)
+
+        # Performance Submenu
+        performance_menu = tk.Menu(options_menu, tearoff=0)
+        performance_menu.add_checkbutton(label="Trace Latency", variable=self.latency_tracing,
+                                         command=self.update_latency_tracing)
+        performance_menu.add_checkbutton(label="Show Performance HUD", variable=self.show_hud,
+                                         command=self.update_latency_tracing)
+        performance_menu.add_command(label="Export Trace...", command=self.export_trace)
+        performance_menu.add_separator()
+        performance_menu.add_checkbutton(label="Count Subsystem Activity", variable=self.profiling_counters,
+                                         command=self.update_profiling)
+        profiler_menu = tk.Menu(performance_menu, tearoff=0)
+        for mode in ('Off', 'cProfile', 'Sampling'):
+            profiler_menu.add_radiobutton(label=mode, value=mode, variable=self.profiler_mode,
+                                          command=self.update_profiling)
+        performance_menu.add_cascade(label="Profile Load/Export/Play", menu=profiler_menu)
+        performance_menu.add_command(label="Show Counters...", command=self.show_counters)
+        performance_menu.add_command(label="Dump Counters...", command=self.dump_counters)
+        performance_menu.add_command(label="Reset Counters", command=counters.reset)
+        options_menu.add_cascade(label="Performance", menu=performance_menu)
+
+        # Starting Octave Menu
+        starting_octave_menu = tk.Menu(options_menu, tearoff=0)
+        for i in range(-4, 5):
+            starting_octave_menu.add_radiobutton(label=str(i), command=lambda i=i: self.set_playback_octave(i),
+                                                 value=i, variable=self.playback_octave)
+        options_menu.add_cascade(label="Starting Octave", menu=starting_octave_menu)
+
+        # Octave Selection
+        octave_menu = tk.Menu(options_menu, tearoff=0)
+        for i in range(1, 5):
+            octave_menu.add_radiobutton(label=str(i), command=lambda i=i: self.set_octaves(i),
+                                        value=i, variable=tk.IntVar(value=self.octaves))
+        options_menu.add_cascade(label=self.translations[lang]['number_of_octaves'], menu=octave_menu)
+
+        # Language Selection Submenu
+        language_menu = tk.Menu(options_menu, tearoff=0)
+        options_menu.add_cascade(label=self.translations[lang]['language_menu'], menu=language_menu)
+
+        language_menu.add_radiobutton(label="English / Engels", variable=self.language_var, value="en", command=self.change_language)
+        language_menu.add_radiobutton(label="Dutch / Nederlands", variable=self.language_var, value="nl", command=self.change_language)
+
+        menubar.add_cascade(label=self.translations[lang]['options_menu'], menu=options_menu)
+
+        # Help Menu
+        help_menu = tk.Menu(menubar, tearoff=0)
+        help_menu.add_command(label=self.translations[lang]['help'], command=self.show_help)
+        menubar.add_cascade(label=self.translations[lang]['help'], menu=help_menu)
+
+        self.root.config(menu=menubar)
+
+    def update_midi_instrument_menu_state(self, *args):
+        if self.output_method.get() == "MIDI Output":
+            self.midi_instrument_menu.entryconfig("Instrument Groups", state="normal")
+        else:
+            self.midi_instrument_menu.entryconfig("Instrument Groups", state="disabled")
+
+    def create_midi_instrument_menu(self):
+        # General MIDI Instrument Families and Instruments
+        self.instrument_families = [
+            ("Piano", ["Acoustic Grand Piano", "Bright Acoustic Piano", "Electric Grand Piano",
+                       "Honky-tonk Piano", "Electric Piano 1", "Electric Piano 2",
+                       "Harpsichord", "Clavinet"]),
+            ("Chromatic Percussion", ["Celesta", "Glockenspiel", "Music Box", "Vibraphone",
+                                      "Marimba", "Xylophone", "Tubular Bells", "Dulcimer"]),
+            ("Organ", ["Drawbar Organ", "Percussive Organ", "Rock Organ", "Church Organ",
+                       "Reed Organ", "Accordion", "Harmonica", "Tango Accordion"]),
+            ("Guitar", ["Acoustic Guitar (nylon)", "Acoustic Guitar (steel)", "Electric Guitar (jazz)",
+                        "Electric Guitar (clean)", "Electric Guitar (muted)", "Overdriven Guitar",
+                        "Distortion Guitar", "Guitar harmonics"]),
+            ("Bass", ["Acoustic Bass", "Electric Bass (finger)", "Electric Bass (pick)", "Fretless Bass",
+                      "Slap Bass 1", "Slap Bass 2", "Synth Bass 1", "Synth Bass 2"]),
+            ("Strings", ["Violin", "Viola", "Cello", "Contrabass", "Tremolo Strings",
+                         "Pizzicato Strings", "Orchestral Harp", "Timpani"]),
+            ("Ensemble", ["String Ensemble 1", "String Ensemble 2", "SynthStrings 1", "SynthStrings 2",
+                          "Choir Aahs", "Voice Oohs", "Synth Choir", "Orchestra Hit"]),
+            ("Brass", ["Trumpet", "Trombone", "Tuba", "Muted Trumpet", "French Horn",
+                       "Brass Section", "SynthBrass 1", "SynthBrass 2"]),
+            ("Reed", ["Soprano Sax", "Alto Sax", "Tenor Sax", "Baritone Sax",
+                      "Oboe", "English Horn", "Bassoon", "Clarinet"]),
+            ("Pipe", ["Piccolo", "Flute", "Recorder", "Pan Flute", "Blown Bottle",
+                      "Shakuhachi", "Whistle", "Ocarina"]),
+            ("Synth Lead", ["Lead 1 (square)", "Lead 2 (sawtooth)", "Lead 3 (calliope)",
+                            "Lead 4 (chiff)", "Lead 5 (charang)", "Lead 6 (voice)",
+                            "Lead 7 (fifths)", "Lead 8 (bass + lead)"]),
+            ("Synth Pad", ["Pad 1 (new age)", "Pad 2 (warm)", "Pad 3 (polysynth)",
+                           "Pad 4 (choir)", "Pad 5 (bowed)", "Pad 6 (metallic)",
+                           "Pad 7 (halo)", "Pad 8 (sweep)"]),
+            ("Synth Effects", ["FX 1 (rain)", "FX 2 (soundtrack)", "FX 3 (crystal)",
+                               "FX 4 (atmosphere)", "FX 5 (brightness)", "FX 6 (goblins)",
+                               "FX 7 (echoes)", "FX 8 (sci-fi)"]),
+            ("Ethnic", ["Sitar", "Banjo", "Shamisen", "Koto", "Kalimba",
+                        "Bag pipe", "Fiddle", "Shanai"]),
+            ("Percussive", ["Tinkle Bell", "Agogo", "Steel Drums", "Woodblock",
+                            "Taiko Drum", "Melodic Tom", "Synth Drum", "Reverse Cymbal"]),
+            ("Sound Effects", ["Guitar Fret Noise", "Breath Noise", "Seashore", "Bird Tweet",
+                               "Telephone Ring", "Helicopter", "Applause", "Gunshot"])
+        ]
+
+        self.midi_instrument_menu.add_command(label="Instrument Groups", state="normal")  # Dummy entry
+
+        # Create submenus for instrument families
+        for family_index, (family_name, instruments) in enumerate(self.instrument_families):
+            family_menu = tk.Menu(self.midi_instrument_menu, tearoff=0)
+            for instrument_index, instrument_name in enumerate(instruments):
+                program_number = family_index * 8 + instrument_index
+                family_menu.add_radiobutton(
+                    label=instrument_name,
+                    command=lambda p=program_number, n=instrument_name: self.select_midi_instrument(p, n),
+                    variable=tk.IntVar(value=self.midi_instrument),
+                    value=program_number
+                )
+            self.midi_instrument_menu.add_cascade(label=family_name, menu=family_menu)
+
+    def select_midi_instrument(self, program_number, instrument_name, show_message=True):
+        self.midi_instrument = program_number
+        self.midi_instrument_name = instrument_name
+        if self.midi_output:
+            try:
+                msg = mido.Message('program_change', program=program_number)
+                self.midi_output.send(msg)
+                if show_message:
+                    messagebox.showinfo("MIDI Instrument", f"Instrument set to '{instrument_name}'.")
+                self.save_settings()
+            except Exception as e:
+                messagebox.showerror("Error", f"An error occurred while setting the MIDI instrument:\n{e}")
+
+    def select_sample_library(self):
+        directory = filedialog.askdirectory(initialdir=self.sample_library_path or None)
+        if not directory:
+            return  # User canceled
+        try:
+            library = load_sample_library(directory)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"An error occurred while loading the sample library:\n{e}")
+            return
+        self.sample_library_path = directory
+        self.pc_timbre.set(SAMPLED_PIANO_TIMBRE)
+        self.save_settings()
+        # Recreate the menu so the sampled timbre can be selected
+        self.create_menu()
+        messagebox.showinfo("Sample Library", f"Loaded {len(library.samples)} samples from '{directory}'.")
+
+    def update_effects_chain(self):
+        # Rebuild the effects applied to PC audio from the current effect settings
+        global effects_chain
+        impulse_response = self.impulse_response if self.reverb_enabled.get() else None
+        eq_gains = EQ_PRESETS.get(self.eq_preset.get(), EQ_PRESETS["Flat"])
+        if impulse_response is None and not any(eq_gains):
+            effects_chain = None
+        else:
+            effects_chain = EffectsChain(impulse_response, self.reverb_mix, eq_gains)
+
+    def change_effects(self):
+        if self.reverb_enabled.get() and self.impulse_response is None:
+            # Reverb needs an impulse response first
+            self.select_impulse_response()
+            if self.impulse_response is None:
+                self.reverb_enabled.set(False)
+        self.update_effects_chain()
+        self.save_settings()
+
+    def select_impulse_response(self):
+        file_path = filedialog.askopenfilename(filetypes=[("WAV files", "*.wav")],
+                                               initialdir=os.path.dirname(self.impulse_response_path) or None)
+        if not file_path:
+            return  # User canceled
+        try:
+            self.impulse_response = load_wav_mono(file_path)
+        except (OSError, ValueError, struct.error) as e:
+            messagebox.showerror("Error", f"An error occurred while loading the impulse response:\n{e}")
+            return
+        self.impulse_response_path = file_path
+        self.reverb_enabled.set(True)
+        self.update_effects_chain()
+        self.save_settings()
+
+    def update_latency_tracing(self):
+        # The HUD needs the tracer, so showing it turns tracing on as well
+        if self.show_hud.get():
+            self.latency_tracing.set(True)
+        tracer.enabled = self.latency_tracing.get() or tracer_forced
+        if self.show_hud.get() and self.hud_label is None:
+            self.hud_label = tk.Label(self.root, textvariable=self.hud_var, font=("Courier", 9), justify='left',
+                                      bg='black', fg='lime', anchor='nw')
+            self.hud_label.place(relx=1.0, y=0, anchor='ne')
+            self.update_hud()
+        elif not self.show_hud.get() and self.hud_label is not None:
+            self.root.after_cancel(self.hud_update_id)
+            self.hud_label.destroy()
+            self.hud_label = None
+        self.save_settings()
+
+    def update_hud(self):
+        lines = []
+        for kind, (p50, p99, count) in sorted(tracer.percentiles().items()):
+            lines.append(f"{kind:<9} p50 {p50 * 1000:6.1f} ms  p99 {p99 * 1000:6.1f} ms  n={count}")
+        lines.append(f"voices {tracer.active_voices():<3} threads {threading.active_count()}")
+        self.hud_var.set("\n".join(lines))
+        self.hud_label.lift()
+        self.hud_update_id = self.root.after(250, self.update_hud)
+
+    def export_trace(self):
+        file_path = filedialog.asksaveasfilename(defaultextension=".json", initialfile="pianoman-trace.json",
+                                                 filetypes=[("Chrome trace", "*.json")])
+        if not file_path:
+            return  # User canceled
+        try:
+            tracer.export_chrome_trace(file_path)
+            messagebox.showinfo("Export Trace", f"The trace has been saved to '{file_path}'.\n"
+                                                "Open it in chrome://tracing or Perfetto.")
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred while exporting the trace:\n{e}")
+
+    def update_profiling(self, save=True):
+        global profiler_mode
+        # --profile turns profiling on for the whole session
+        if not profiling_forced:
+            counters.enabled = self.profiling_counters.get()
+            profiler_mode = self.profiler_mode.get()
+        if save:
+            self.save_settings()
+
+    def show_counters(self):
+        values = counters.snapshot()
+        if not values:
+            messagebox.showinfo("Counters", "Nothing has been counted yet.\n"
+                                            "Turn on Options > Performance > Count Subsystem Activity.")
+            return
+        lines = [f"{name}: {value:.3f}" if isinstance(value, float) else f"{name}: {value}"
+                 for name, value in values.items()]
+        messagebox.showinfo("Counters", "\n".join(lines))
+
+    def dump_counters(self):
+        file_path = filedialog.asksaveasfilename(defaultextension=".json", initialfile="pianoman-counters.json",
+                                                 filetypes=[("JSON files", "*.json")])
+        if not file_path:
+            return  # User canceled
+        try:
+            counters.dump(file_path)
+            messagebox.showinfo("Dump Counters", f"The counters have been saved to '{file_path}'.")
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred while saving the counters:\n{e}")
+
+    def show_effects_cpu_usage(self):
+        if effects_chain is None:
+            messagebox.showinfo("Effects CPU Usage", "No effects are active.")
+            return
+        report = effects_chain.cpu_report()
+        messagebox.showinfo("Effects CPU Usage",
+                            f"Blocks processed: {report['blocks']} ({report['partitions']} partitions)\n"
+                            f"Average per block: {report['mean_ms']:.3f} ms\n"
+                            f"Worst block: {report['max_ms']:.3f} ms\n"
+                            f"Real-time load: {report['realtime_load'] * 100:.1f}%")
+
+    def update_midi_device_menu(self):
+        self.midi_device_menu.delete(0, tk.END)
+        available_ports = midi_backend.get_output_names()
+        if not available_ports:
+            self.midi_device_menu.add_command(label="No MIDI devices available", state=tk.DISABLED)
+        else:
+            for port in available_ports:
+                self.midi_device_menu.add_radiobutton(label=port, command=lambda p=port: self.select_midi_port(p),
+                                                      value=port, variable=tk.StringVar(value=self.selected_midi_port))
+
+    def update_midi_input_menu(self):
+        self.midi_input_menu.delete(0, tk.END)
+        selected_port = tk.StringVar(value=self.selected_midi_input_port if self.midi_input else '')
+        self.midi_input_menu.add_radiobutton(label="None", value='', variable=selected_port,
+                                             command=lambda: self.select_midi_input_port(''))
+        for port in midi_input_names():
+            self.midi_input_menu.add_radiobutton(label=port, value=port, variable=selected_port,
+                                                 command=lambda p=port: self.select_midi_input_port(p))
+        self.midi_input_menu.add_separator()
+        self.midi_input_menu.add_command(label="Create Virtual Input Port", command=self.open_virtual_midi_input)
+
+    def select_midi_input_port(self, port_name, show_message=True):
+        self.close_midi_input()
+        self.selected_midi_input_port = port_name
+        if port_name:
+            try:
+                self.midi_input = mido.open_input(port_name, callback=self.on_midi_input)
+            except Exception as e:
+                messagebox.showerror("Error", f"An error occurred while opening the MIDI input:\n{e}")
+                self.selected_midi_input_port = ''
+            else:
+                self.poll_midi_input()
+                if show_message:
+                    messagebox.showinfo("MIDI Input", f"MIDI input set to '{port_name}'.")
+        self.save_settings()
+
+    def open_virtual_midi_input(self):
+        # A virtual port other programs can send to (ALSA / CoreMIDI only), e.g. for testing
+        self.close_midi_input()
+        try:
+            self.midi_input = mido.open_input("Pianoman Input", virtual=True, callback=self.on_midi_input)
+        except Exception as e:
+            messagebox.showerror("Error", f"Virtual MIDI ports are not supported here:\n{e}")
+            return
+        self.poll_midi_input()
+        messagebox.showinfo("MIDI Input", "Virtual MIDI input 'Pianoman Input' created.")
+
+    def close_midi_input(self):
+        if self.midi_input_poll_id:
+            self.root.after_cancel(self.midi_input_poll_id)
+            self.midi_input_poll_id = None
+        if self.midi_input:
+            self.midi_input.close()
+            self.midi_input = None
+        self.held_midi_notes.clear()
+        self.midi_chord_notes.clear()
+
+    def on_midi_input(self, msg):
+        # Runs on the rtmidi thread: clock messages are timestamped here, everything else goes to Tk
+        if msg.type in ('clock', 'start', 'stop', 'continue'):
+            self.clock_follower.handle(msg, time.perf_counter())
+        else:
+            self.midi_input_queue.put(msg)
+
+    def poll_midi_input(self):
+        # Drain the input queue well within one frame (60 Hz) of the message arriving
+        # (rtmidi calls the callback on its own thread; messages are handed to Tk through a queue)
+        while True:
+            try:
+                msg = self.midi_input_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.handle_midi_input(msg)
+        self.midi_input_poll_id = self.root.after(5, self.poll_midi_input)
+
+    def handle_midi_input(self, msg):
+        if msg.type == 'note_on' and msg.velocity > 0:
+            key = self.key_for_midi_note(msg.note)
+            self.held_midi_notes.add(msg.note)
+            self.midi_chord_notes.add(msg.note)
+            if not key.selected:
+                key.selected = True
+                self.input_canvas.itemconfig(key.rect, fill="blue")
+                self.update_button_states()
+        elif msg.type in ('note_off', 'note_on'):
+            self.held_midi_notes.discard(msg.note)
+            # The chord is complete once every key has been released
+            if not self.held_midi_notes and self.midi_chord_notes:
+                self.commit_midi_chord()
+        elif msg.type == 'control_change' and msg.control == 64 and msg.value >= 64:
+            # Sustain pedal commits the chord right away
+            if self.midi_chord_notes:
+                self.commit_midi_chord()
+
+    def key_for_midi_note(self, midi_note):
+        # Fold notes outside the input keyboard into its range by octaves
+        lowest = 48
+        highest = lowest + self.octaves * 12 - 1
+        while midi_note < lowest:
+            midi_note += 12
+        while midi_note > highest:
+            midi_note -= 12
+        return self.keys_by_midi_note[midi_note]
+
+    def commit_midi_chord(self):
+        self.midi_chord_notes.clear()
+        # Name the chord automatically unless a name was typed
+        if not self.chord_name_var.get():
+            self.chord_name_var.set(recognize_chord_name(
+                [key.midi_note for key in self.white_keys + self.black_keys if key.selected]) or "")
+        self.save_and_reset_keyboard()
+
+    def select_midi_port(self, port_name):
+        self.selected_midi_port = port_name
+        if self.midi_output:
+            self.midi_output.close()
+        self.midi_output = CountingMidiOutput(midi_backend.open_output(port_name))
+        # Send program change message to set the instrument
+        self.select_midi_instrument(self.midi_instrument, self.midi_instrument_name, show_message=False)  # Suppress message
+        messagebox.showinfo("MIDI Output", f"MIDI output set to '{port_name}'.")
+        self.save_settings()
+
+    def set_octaves(self, num_octaves):
+        self.octaves = num_octaves
+        # Redraw the keyboard
+        self.draw_piano()
+        # Update the label
+        lang = self.language_var.get()
+        self.octave_label.config(text=f"{self.translations[lang]['number_of_octaves']}: {self.octaves}")
+        self.save_settings()
+
+    def set_playback_octave(self, octave):
+        self.playback_octave.set(octave)
+        self.save_settings()
+
+    def change_output_method(self):
+        method = self.output_method.get()
+        if method == "MIDI Output":
+            # Open MIDI output port
+            self.load_midi_output()
+        else:
+            # Close MIDI output port if open
+            if self.midi_output:
+                self.midi_output.close()
+                self.midi_output = None
+        self.save_settings()
+        self.update_midi_instrument_menu_state()
+
+    def load_midi_output(self):
+        available_ports = midi_backend.get_output_names()
+        if not available_ports:
+            messagebox.showwarning("MIDI Output", "No MIDI output ports available.")
+            self.output_method.set("PC Audio")
+            return
+        if self.selected_midi_port not in available_ports:
+            self.selected_midi_port = available_ports[0]
+        self.midi_output = CountingMidiOutput(midi_backend.open_output(self.selected_midi_port))
+        # Send program change message to set the instrument
+        self.select_midi_instrument(self.midi_instrument, self.midi_instrument_name, show_message=False)  # Suppress message on startup
+        self.save_settings()
+
+    def mark_unsaved(self, *args):
+        self.unsaved_changes = True
+
+    def update_button_states(self):
+        # Check if any keys are selected
+        selected_keys = any(key.selected for key in self.white_keys + self.black_keys)
+        if selected_keys:
+            self.play_chord_button.config(state=tk.NORMAL)
+            self.clear_chord_button.config(state=tk.NORMAL)
+        else:
+            self.play_chord_button.config(state=tk.DISABLED)
+            self.clear_chord_button.config(state=tk.DISABLED)
+
+        # Enable or disable the 'Delete Chord' button based on edit mode
+        if self.currently_editing_keyboard:
+            self.delete_chord_button.config(state=tk.NORMAL)
+        else:
+            self.delete_chord_button.config(state=tk.DISABLED)
+
+    def save_and_reset_keyboard(self):
+        # Calculate the width of the saved canvas
+        canvas_width = self.input_canvas.winfo_width()
+        canvas_height = self.input_canvas.winfo_height()
+
+        # Save the keyboard state
+        key_states = [key.selected for key in self.white_keys + self.black_keys]
+        chord_name = self.chord_name_var.get()
+
+        if self.currently_editing_keyboard:
+            # Update the existing saved keyboard
+            saved_keyboard = self.currently_editing_keyboard
+            self.history.record(self.edit_operations(saved_keyboard, key_states, chord_name))
+            saved_keyboard.key_states = key_states
+            saved_keyboard.chord_name = chord_name
+            self.update_saved_canvas(saved_keyboard)
+            # Reset the currently editing keyboard
+            self.currently_editing_keyboard = None
+            # Clear the message label
+            self.message_label_var.set("")
+            # Reset the button text back to "Next Chord"
+            lang = self.language_var.get()
+            self.next_chord_button.config(text=self.translations[lang]['next_chord'])
+        else:
+            # Create a new saved keyboard at the end of the song
+            self.history.record([(EditHistory.INSERT, len(self.saved_keyboards), EditHistory.mask(key_states),
+                                  len(key_states), chord_name, '')])
+            self.add_saved_keyboard(chord_name, key_states)
+
+            # Clear the message label
+            self.message_label_var.set("")
+
+        # Reset the input keyboard
+        self.clear_keyboard()
+
+        # Update the scroll region
+        self.saved_keyboards_frame.canvas.update_idletasks()
+        self.saved_keyboards_frame.canvas.configure(scrollregion=self.saved_keyboards_frame.canvas.bbox('all'))
+
+        # Scroll to the bottom to show the latest keyboard
+        self.saved_keyboards_frame.canvas.yview_moveto(1.0)
+
+        # Mark as having unsaved changes
+        self.unsaved_changes = True
+
+    def add_saved_keyboard(self, chord_name, key_states, index=None):
+        # Create a canvas that displays a saved keyboard and add it to the song (at the end by default)
+        canvas_width = self.input_canvas.winfo_width()
+        canvas_height = self.input_canvas.winfo_height()
+        saved_canvas = tk.Canvas(self.saved_keyboards_frame.scrollable_frame, width=canvas_width,
+                                 height=canvas_height + 20,  # Extra height for chord name
+                                 bg='lightgray', bd=0, highlightthickness=0)
+
+        # Draw the keys on the saved canvas
+        self.draw_saved_canvas(saved_canvas, key_states)
+
+        # Add the chord name above the saved keyboard
+        saved_canvas.create_text(canvas_width / 2, canvas_height + 10, text=chord_name, font=("Arial", 10))
+        counters.count('canvas.items')
+
+        # Create a SavedKeyboard object and add it to the list
+        saved_keyboard = SavedKeyboard(saved_canvas, chord_name, key_states)
+        if index is None:
+            index = len(self.saved_keyboards)
+        self.saved_keyboards.insert(index, saved_keyboard)
+
+        # Bind click event to load the saved keyboard for editing
+        saved_canvas.bind("<Button-1>", lambda event, sk=saved_keyboard: self.load_keyboard(sk))
+        # Bind right-click to set the A-B loop points
+        saved_canvas.bind("<Button-3>", lambda event, sk=saved_keyboard: self.set_loop_point(sk))
+
+        # Only this keyboard and the ones after it move in the grid
+        self.place_saved_keyboards(index)
+        return saved_keyboard
+
+    def remove_saved_keyboard(self, index):
+        saved_keyboard = self.saved_keyboards.pop(index)
+        # A deleted chord can no longer be a loop point
+        if saved_keyboard in (self.loop_start_keyboard, self.loop_end_keyboard):
+            self.clear_loop_points()
+        saved_keyboard.canvas.destroy()
+        self.place_saved_keyboards(index)
+        return saved_keyboard
+
+    def place_saved_keyboards(self, start=0):
+        # Put the saved keyboards from 'start' onwards in their grid cells, without redrawing them
+        for index in range(start, len(self.saved_keyboards)):
+            row, column = divmod(index, self.max_keyboards_per_row)
+            self.saved_keyboards[index].canvas.grid(row=row, column=column, padx=5, pady=5, sticky='w')
+
+    def draw_piano(self):
+        # Clear existing keys if any
+        self.input_canvas.delete("all")
+
+        starting_midi_note = 48  # C3
+        starting_octave = 3
+
+        white_notes = ['C', 'D', 'E', 'F', 'G', 'A', 'B']
+        white_key_offsets = [0, 2, 4, 5, 7, 9, 11]
+
+        black_notes = ['C#', 'D#', '', 'F#', 'G#', 'A#', '']
+        black_key_offsets = [1, 3, None, 6, 8, 10, None]
+
+        x = 10
+        y = 10
+
+        self.white_keys = []
+        self.black_keys = []
+
+        total_white_keys = self.octaves * 7
+        keyboard_width = total_white_keys * self.white_key_width + 20  # Extra 20 pixels for margin
+        self.input_canvas.config(width=keyboard_width)
+
+        for octave in range(self.octaves):
+            # Draw white keys
+            for i in range(len(white_notes)):
+                note_name = white_notes[i] + str(starting_octave + octave)
+                semitone_offset = white_key_offsets[i] + octave * 12
+                midi_number = starting_midi_note + semitone_offset
+                frequency = 440 * 2 ** ((midi_number - 69) / 12)
+                key = PianoKey(
+                    self.input_canvas,
+                    x + (octave * 7 + i) * self.white_key_width,
+                    y,
+                    self.white_key_width,
+                    self.white_key_height,
+                    "white",
+                    is_black=False,
+                    note_name=note_name,
+                    frequency=frequency,
+                    midi_note=midi_number,
+                    app=self  # Reference to main application
+                )
+                self.white_keys.append(key)
+
+            # Draw black keys
+            for i in range(len(black_notes)):
+                if black_notes[i] != '':
+                    note_name = black_notes[i] + str(starting_octave + octave)
+                    semitone_offset = black_key_offsets[i] + octave * 12
+                    midi_number = starting_midi_note + semitone_offset
+                    frequency = 440 * 2 ** ((midi_number - 69) / 12)
+                    key = PianoKey(
+                        self.input_canvas,
+                        x + (octave * 7 + i) * self.white_key_width + self.white_key_width - self.black_key_width / 2,
+                        y,
+                        self.black_key_width,
+                        self.black_key_height,
+                        "black",
+                        is_black=True,
+                        note_name=note_name,
+                        frequency=frequency,
+                        midi_note=midi_number,
+                        app=self  # Reference to main application
+                    )
+                    self.black_keys.append(key)
+
+        # Look up keys by MIDI note for MIDI input
+        self.keys_by_midi_note = {key.midi_note: key for key in self.white_keys + self.black_keys}
+
+        # Update button states
+        self.update_button_states()
+
+    def draw_saved_canvas(self, saved_canvas, key_states):
+        all_keys = self.white_keys + self.black_keys
+        for key, selected in zip(all_keys, key_states):
+            fill_color = "blue" if selected else key.original_color
+            coords = self.input_canvas.coords(key.rect)
+            x1, y1, x2, y2 = coords
+            tags = ('white_key',) if not key.is_black else ('black_key',)
+            counters.count('canvas.items')
+            saved_canvas.create_rectangle(
+                x1, y1, x2, y2,
+                fill=fill_color,
+                outline="black",
+                width=1,
+                tags=tags
+            )
+
+    def update_saved_canvas(self, saved_keyboard):
+        saved_canvas = saved_keyboard.canvas
+        saved_canvas.delete("all")
+        canvas_width = saved_canvas.winfo_width()
+        canvas_height = saved_canvas.winfo_height() - 20  # 20 pixels for chord name
+
+        # Draw the keys on the saved canvas
+        self.draw_saved_canvas(saved_canvas, saved_keyboard.key_states)
+
+        # Add the chord name above the saved keyboard
+        chord_name = saved_keyboard.chord_name
+        saved_canvas.create_text(canvas_width / 2, canvas_height + 10, text=chord_name, font=("Arial", 10))
+        counters.count('canvas.items')
+
+        # Restore the loop marker if this chord is a loop point
+        for label, loop_keyboard in (("A", self.loop_start_keyboard), ("B", self.loop_end_keyboard)):
+            if loop_keyboard is saved_keyboard:
+                self.draw_loop_marker(saved_keyboard, label)
+
+    def load_keyboard(self, saved_keyboard):
+        # Set the currently editing keyboard
+        self.currently_editing_keyboard = saved_keyboard
+        # Load the saved keys into the input keyboard
+        key_states = saved_keyboard.key_states
+        all_keys = self.white_keys + self.black_keys
+
+        for key, selected in zip(all_keys, key_states):
+            key.selected = selected
+            fill_color = "blue" if selected else key.original_color
+            self.input_canvas.itemconfig(key.rect, fill=fill_color)
+
+        # Set the chord name
+        self.chord_name_var.set(saved_keyboard.chord_name)
+
+        # Show the message above the input keyboard
+        lang = self.language_var.get()
+        self.message_label_var.set(self.translations[lang]['edit_keys_message'])
+
+        # Change the button text to "Save Chord"
+        self.next_chord_button.config(text=self.translations[lang]['save_chord'])
+
+        # Update button states
+        self.update_button_states()
+
+    def clear_keyboard(self):
+        # Deselect all keys and reset colors
+        for key in self.white_keys + self.black_keys:
+            key.selected = False
+            self.input_canvas.itemconfig(key.rect, fill=key.original_color)
+
+        # Reset the chord name input field
+        self.chord_name_var.set("")
+        # Reset the currently editing keyboard
+        self.currently_editing_keyboard = None
+        # Clear the message label
+        self.message_label_var.set("")
+
+        # Reset the button text to "Next Chord"
+        lang = self.language_var.get()
+        self.next_chord_button.config(text=self.translations[lang]['next_chord'])
+
+        # Update button states
+        self.update_button_states()
+
+    def smooth_song_voicings(self):
+        if not self.saved_keyboards:
+            messagebox.showwarning("Smooth Voicings", "No chords have been saved yet.")
+            return
+        all_notes = keyboard_midi_notes(self.octaves)
+        chords = [[note for note, selected in zip(all_notes, saved_keyboard.key_states) if selected]
+                  for saved_keyboard in self.saved_keyboards]
+        voiced = smooth_voicings(chords, 48, 48 + self.octaves * 12 - 1)
+        operations = []
+        for saved_keyboard, notes in zip(self.saved_keyboards, voiced):
+            key_states = [note in notes for note in all_notes]
+            if key_states != saved_keyboard.key_states:
+                operations += self.edit_operations(saved_keyboard, key_states, saved_keyboard.chord_name)
+                saved_keyboard.key_states = key_states
+                # Only the chords that were re-voiced are redrawn
+                self.update_saved_canvas(saved_keyboard)
+        if not operations:
+            return
+        self.history.record(operations)
+        self.unsaved_changes = True
+
+    def edit_operations(self, saved_keyboard, key_states, chord_name):
+        # History operations for changing a saved keyboard; empty if nothing changes
+        index = self.saved_keyboards.index(saved_keyboard)
+        old_mask = EditHistory.mask(saved_keyboard.key_states)
+        new_mask = EditHistory.mask(key_states)
+        if len(key_states) != len(saved_keyboard.key_states):
+            # A different keyboard size cannot be expressed as a diff
+            return [(EditHistory.DELETE, index, old_mask, len(saved_keyboard.key_states), saved_keyboard.chord_name, ''),
+                    (EditHistory.INSERT, index, new_mask, len(key_states), chord_name, '')]
+        if old_mask == new_mask and chord_name == saved_keyboard.chord_name:
+            return []
+        return [(EditHistory.EDIT, index, old_mask ^ new_mask, len(key_states), saved_keyboard.chord_name, chord_name)]
+
+    def undo(self):
+        operations = self.history.undo()
+        if operations is not None:
+            self.apply_history(reversed(operations), undo=True)
+
+    def redo(self):
+        operations = self.history.redo()
+        if operations is not None:
+            self.apply_history(operations, undo=False)
+
+    def apply_history(self, operations, undo):
+        # Replay history operations, touching only the chord views they affect
+        for kind, index, mask, key_count, old_name, new_name in operations:
+            if kind == EditHistory.EDIT:
+                saved_keyboard = self.saved_keyboards[index]
+                saved_keyboard.key_states = EditHistory.key_states(
+                    EditHistory.mask(saved_keyboard.key_states) ^ mask, key_count)
+                if old_name != new_name:
+                    saved_keyboard.chord_name = old_name if undo else new_name
+                self.update_saved_canvas(saved_keyboard)
+            elif kind in (EditHistory.INSERT, EditHistory.DELETE):
+                # Undoing an insert and redoing a delete both remove the chord
+                if (kind == EditHistory.INSERT) == undo:
+                    if self.saved_keyboards[index] is self.currently_editing_keyboard:
+                        self.clear_keyboard()
+                    self.remove_saved_keyboard(index)
+                else:
+                    self.add_saved_keyboard(old_name, EditHistory.key_states(mask, key_count), index)
+            elif undo:
+                # Bring back the cleared input keyboard, and edit mode if it was on
+                for key, selected in zip(self.white_keys + self.black_keys, EditHistory.key_states(mask, key_count)):
+                    key.selected = selected
+                    self.input_canvas.itemconfig(key.rect, fill="blue" if selected else key.original_color)
+                self.chord_name_var.set(old_name)
+                if index:
+                    self.currently_editing_keyboard = self.saved_keyboards[index - 1]
+                    lang = self.language_var.get()
+                    self.message_label_var.set(self.translations[lang]['edit_keys_message'])
+                    self.next_chord_button.config(text=self.translations[lang]['save_chord'])
+                self.update_button_states()
+            else:
+                self.clear_keyboard()
+        self.unsaved_changes = True
+
+    def clear_chord(self):
+        # Clearing the input keyboard from the button or menu can be undone
+        key_states = [key.selected for key in self.white_keys + self.black_keys]
+        editing_index = 0
+        if self.currently_editing_keyboard in self.saved_keyboards:
+            editing_index = self.saved_keyboards.index(self.currently_editing_keyboard) + 1
+        if any(key_states) or self.chord_name_var.get() or editing_index:
+            self.history.record([(EditHistory.INPUT, editing_index, EditHistory.mask(key_states), len(key_states),
+                                  self.chord_name_var.get(), '')])
+        self.clear_keyboard()
+
+    def delete_current_chord(self):
+        if self.currently_editing_keyboard:
+            saved_keyboard = self.currently_editing_keyboard
+            index = self.saved_keyboards.index(saved_keyboard)
+            self.history.record([(EditHistory.DELETE, index, EditHistory.mask(saved_keyboard.key_states),
+                                  len(saved_keyboard.key_states), saved_keyboard.chord_name, '')])
+            # Remove the keyboard; the keyboards after it shift up in the grid
+            self.remove_saved_keyboard(index)
+
+            # Reset the currently editing keyboard
+            self.currently_editing_keyboard = None
+            # Clear the message label
+            self.message_label_var.set("")
+            # Reset the button text to "Next Chord"
+            lang = self.language_var.get()
+            self.next_chord_button.config(text=self.translations[lang]['next_chord'])
+            # Reset the input keyboard
+            self.clear_keyboard()
+            # Mark as having unsaved changes
+            self.unsaved_changes = True
+            # Update button states
+            self.update_button_states()
+        else:
+            messagebox.showinfo(self.translations[self.language_var.get()]['delete_chord'], self.translations[self.language_var.get()]['delete_chord_message'])
+
+    def new_song(self):
+        if not self.song_saved:
+            response = messagebox.askyesnocancel(self.translations[self.language_var.get()]['save_song'],
+                                                 self.translations[self.language_var.get()]['save_song_prompt'])
+            if response:  # User chose 'Yes' to save
+                self.save_song()
+            elif response is False:  # User chose 'No'
+                pass
+            else:
+                return  # User chose 'Cancel' or closed the dialog
+
+        self.song_loader_stop.set()
+        self.song_name_var.set("")
+        self.chord_name_var.set("")
+        self.saved_keyboards.clear()
+        self.loop_start_keyboard = None
+        self.loop_end_keyboard = None
+        for widget in self.saved_keyboards_frame.scrollable_frame.winfo_children():
+            widget.destroy()
+        self.clear_keyboard()
+        self.history.clear()
+        self.unsaved_changes = False
+        self.song_saved = False
+        self.current_song_file = None
+        self.update_song_watcher()
+
+    def save_pdf(self):
+        if not self.saved_keyboards:
+            messagebox.showwarning("Save as PDF", "No chords have been saved yet.")
+            return
+
+        song_title = self.song_name_var.get() or "Untitled"
+        default_pdf_path = self.config.get('Settings', 'default_pdf_path', fallback='')
+        file_path = filedialog.asksaveasfilename(defaultextension=".pdf", initialfile=f"{song_title}.pdf",
+                                                 filetypes=[("PDF files", "*.pdf")],
+                                                 initialdir=default_pdf_path)
+        if not file_path:
+            return  # User canceled
+
+        # Save default PDF path
+        self.config.set('Settings', 'default_pdf_path', os.path.dirname(file_path))
+        self.save_settings()
+
+        try:
+            self.generate_pdf(file_path, song_title)
+            # Store the last saved PDF file path
+            self.last_pdf_file = file_path
+            messagebox.showinfo("PDF Saved", f"The file '{file_path}' has been saved.")
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred while saving the PDF:\n{e}")
+
+    def generate_pdf(self, file_path, song_title):
+        run_profiled('export_pdf', render_song_pdf, self.get_song_data(song_title), file_path, song_title)
+
+    def create_songbook(self):
+        default_song_path = self.config.get('Settings', 'default_song_path', fallback='')
+        song_files = filedialog.askopenfilenames(title="Songs for the songbook, in order",
+                                                 filetypes=[("JSON files", "*.json")], initialdir=default_song_path)
+        if not song_files:
+            return  # User canceled
+        songbook_path = filedialog.asksaveasfilename(defaultextension=".songbook", initialfile="Songbook.songbook",
+                                                     filetypes=[("Songbook files", "*.songbook")],
+                                                     initialdir=os.path.dirname(song_files[0]))
+        if not songbook_path:
+            return  # User canceled
+        try:
+            write_songbook(songbook_path, song_files)
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred while saving the songbook:\n{e}")
+            return
+        if messagebox.askyesno("Create Songbook", f"The songbook '{songbook_path}' has been saved with "
+                                                  f"{len(song_files)} songs.\nExport it as PDF now?"):
+            self.export_songbook_pdf(songbook_path)
+
+    def export_songbook_pdf(self, songbook_path=None):
+        if songbook_path is None:
+            songbook_path = filedialog.askopenfilename(filetypes=[("Songbook files", "*.songbook")],
+                                                       initialdir=self.config.get('Settings', 'default_song_path',
+                                                                                  fallback=''))
+            if not songbook_path:
+                return  # User canceled
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".pdf", filetypes=[("PDF files", "*.pdf")],
+            initialfile=os.path.splitext(os.path.basename(songbook_path))[0] + ".pdf",
+            initialdir=self.config.get('Settings', 'default_pdf_path', fallback=''))
+        if not file_path:
+            return  # User canceled
+
+        # Save default PDF path
+        self.config.set('Settings', 'default_pdf_path', os.path.dirname(file_path))
+        self.save_settings()
+
+        # The songs are drawn in worker processes; the window stays responsive meanwhile
+        result_queue = queue.Queue()
+
+        def build():
+            try:
+                result_queue.put(run_profiled('export_pdf', build_songbook_pdf, songbook_path, file_path))
+            except Exception as e:
+                result_queue.put(e)
+
+        def check_result():
+            try:
+                result = result_queue.get_nowait()
+            except queue.Empty:
+                self.root.after(100, check_result)
+                return
+            self.playback_status_var.set("")
+            if isinstance(result, Exception):
+                messagebox.showerror("Error", f"An error occurred while exporting the songbook:\n{result}")
+            else:
+                self.last_pdf_file = file_path
+                messagebox.showinfo("PDF Saved", f"The file '{file_path}' has been saved: {result['songs']} songs, "
+                                                 f"{result['pages']} pages ({result['cached']} songs unchanged).")
+
+        self.playback_status_var.set("Building the songbook PDF...")
+        threading.Thread(target=build, daemon=True).start()
+        self.root.after(100, check_result)
+
+    def print_pdf(self):
+        if not self.last_pdf_file:
+            messagebox.showwarning("Print PDF", "No PDF file has been saved yet.")
+            return
+        try:
+            if platform.system() == 'Windows':
+                # Use default PDF reader to print
+                os.startfile(self.last_pdf_file, "print")
+            elif platform.system() == 'Darwin':
+                # macOS
+                os.system(f'lpr \"{self.last_pdf_file}\"')
+            else:
+                # Linux and others
+                os.system(f'lpr \"{self.last_pdf_file}\"')
+            messagebox.showinfo("Print PDF", "PDF file sent to the printer.")
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred while printing the PDF:\n{e}")
+
+    def show_help(self):
+        # Create a custom help window
+        help_window = tk.Toplevel(self.root)
+        help_window.title(self.translations[self.language_var.get()]['help'])
+
+        # Set the help window position if previously saved
+        if self.help_window_rel_x is not None and self.help_window_rel_y is not None:
+            # Position relative to the main window
+            main_x = self.root.winfo_x()
+            main_y = self.root.winfo_y()
+            help_window.geometry(f"+{main_x + self.help_window_rel_x}+{main_y + self.help_window_rel_y}")
+        else:
+            help_window.geometry("600x600")
+
+        # Use ScrollFrame for the help window
+        help_frame = ScrollFrame(help_window)
+        help_frame.pack(fill=tk.BOTH, expand=True)
+
+        scrollable_frame = help_frame.scrollable_frame
+
+        # Help message with explanations of all functionalities
+        help_text_en = (
+            "Welcome to Pianoman!\n\n"
+            "With this application, you can visualize piano chords, hear the notes, and save them as a PDF.\n\n"
+            "Features:\n"
+            "- **Song Name:** Enter and translate the song name dynamically.\n"
+            "- **Number of Octaves:** Select the number of octaves for your keyboard.\n"
+            "- **Chords:** Select keys to form chords, play them, save, edit, and delete.\n"
+            "- **Playback:** Play individual chords or the entire song with adjustable speed.\n"
+            "- **Volume Controls:** Adjust PC audio and MIDI volumes.\n"
+            "- **MIDI Integration:** Choose MIDI output devices and instruments.\n"
+            "- **Translations:** Switch between English and Dutch languages seamlessly.\n\n"
+            "How to Use:\n"
+            "1. **Select Keys:** Click on the piano keys to select/deselect them.\n"
+            "2. **Name Chord:** Enter a name for your chord.\n"
+            "3. **Save Chord:** Click 'Next Chord' to save the current chord.\n"
+            "4. **Edit Chord:** Click on a saved chord to edit it. The 'Next Chord' button will change to 'Save Chord'.\n"
+            "5. **Play Chord:** Play the selected chord.\n"
+            "6. **Play Song:** Play all saved chords in sequence.\n\n"
+            "For more detailed instructions, refer to the documentation or contact support."
+        )
+
+        help_text_nl = (
+            "Welkom bij Pianoman!\n\n"
+            "Met deze applicatie kun je piano-akkoorden visualiseren, de noten horen en ze opslaan als een PDF.\n\n"
+            "Functies:\n"
+            "- **Liednaam:** Voer de liednaam in en vertaal deze dynamisch.\n"
+            "- **Aantal Octaven:** Selecteer het aantal octaven voor je keyboard.\n"
+            "- **Akkoorden:** Selecteer toetsen om akkoorden te vormen, speel ze af, sla ze op, bewerk en verwijder ze.\n"
+            "- **Afspelen:** Speel individuele akkoorden of het hele lied af met aanpasbare snelheid.\n"
+            "- **Volumecontrole:** Pas het PC-audio- en MIDI-volume aan.\n"
+            "- **MIDI-integratie:** Kies MIDI-uitvoerapparaten en instrumenten.\n"
+            "- **Vertalingen:** Wissel naadloos tussen Engels en Nederlands.\n\n"
+            "Hoe te gebruiken:\n"
+            "1. **Selecteer Toetsen:** Klik op de piano toetsen om ze te selecteren/deselecteren.\n"
+            "2. **Naam Akkoord:** Voer een naam in voor je akkoord.\n"
+            "3. **Opslaan Akkoord:** Klik op 'Volgend Akkoord' om het huidige akkoord op te slaan.\n"
+            "4. **Bewerken Akkoord:** Klik op een opgeslagen akkoord om het te bewerken. De knop 'Volgend Akkoord' verandert naar 'Akkoord Opslaan'.\n"
+            "5. **Speel Akkoord:** Speel het geselecteerde akkoord af.\n"
+            "6. **Speel Lied:** Speel alle opgeslagen akkoorden in volgorde af.\n\n"
+            "Voor meer gedetailleerde instructies, raadpleeg de documentatie of neem contact op met ondersteuning."
+        )
+
+        lang = self.language_var.get()
+        help_text = help_text_en if lang == 'en' else help_text_nl
+
+        tk.Label(scrollable_frame, text=help_text, justify="left", font=("Arial", 12, "bold")).pack(anchor="w", pady=(10, 0))
+
+        # Add an Exit button at the bottom
+        exit_button = tk.Button(scrollable_frame, text="Close Help" if lang == 'en' else "Sluit Help", command=help_window.destroy)
+        exit_button.pack(pady=10)
+
+        # Save help window position on close
+        def save_help_window_position():
+            # Get positions relative to the main window
+            self.help_window_rel_x = help_window.winfo_x() - self.root.winfo_x()
+            self.help_window_rel_y = help_window.winfo_y() - self.root.winfo_y()
+            self.save_settings()
+            help_window.destroy()
+
+        help_window.protocol("WM_DELETE_WINDOW", save_help_window_position)
+
+    def get_song_data(self, song_name=None):
+        # The song model as written to the song JSON file
+        song_data = {
+            "song_name": self.song_name_var.get() if song_name is None else song_name,
+            "saved_keyboards": [],
+            "number_of_octaves": self.octaves
+        }
+        for saved_keyboard in self.saved_keyboards:
+            song_data["saved_keyboards"].append({
+                "chord_name": saved_keyboard.chord_name,
+                "key_states": saved_keyboard.key_states
+            })
+        return song_data
+
+    def export_midi(self):
+        if not self.saved_keyboards:
+            messagebox.showwarning("Export MIDI", "No chords have been saved yet.")
+            return
+
+        song_title = self.song_name_var.get() or "Untitled"
+        default_midi_path = self.config.get('Settings', 'default_midi_path', fallback='')
+        file_path = filedialog.asksaveasfilename(defaultextension=".mid", initialfile=f"{song_title}.mid",
+                                                 filetypes=[("MIDI files", "*.mid")],
+                                                 initialdir=default_midi_path)
+        if not file_path:
+            return  # User canceled
+
+        # Save default MIDI path
+        self.config.set('Settings', 'default_midi_path', os.path.dirname(file_path))
+        self.save_settings()
+
+        try:
+            export_song_midi(self.get_song_data(song_title), file_path, **self.midi_export_settings())
+            messagebox.showinfo("Export MIDI", f"The file '{file_path}' has been saved.")
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred while exporting the MIDI file:\n{e}")
+
+    def import_midi(self):
+        default_midi_path = self.config.get('Settings', 'default_midi_path', fallback='')
+        file_path = filedialog.askopenfilename(filetypes=[("MIDI files", "*.mid *.midi")],
+                                               initialdir=default_midi_path)
+        if not file_path:
+            return  # User canceled
+
+        # Save default MIDI path
+        self.config.set('Settings', 'default_midi_path', os.path.dirname(file_path))
+        self.save_settings()
+
+        # Start a new song named after the file
+        self.new_song()
+        self.song_name_var.set(os.path.splitext(os.path.basename(file_path))[0])
+
+        # Parse in the background; the chords are added to the view in small batches
+        chord_queue = queue.Queue()
+
+        def parse():
+            try:
+                for chord in import_midi_chords(file_path, self.octaves):
+                    chord_queue.put(chord)
+                chord_queue.put(None)
+            except Exception as e:
+                chord_queue.put(e)
+
+        threading.Thread(target=parse, daemon=True).start()
+        self.root.after(10, self._add_imported_chords, chord_queue)
+
+    def import_audio(self):
+        default_audio_path = self.config.get('Settings', 'default_audio_path', fallback='')
+        file_paths = filedialog.askopenfilenames(filetypes=[("WAV files", "*.wav")], initialdir=default_audio_path)
+        if not file_paths:
+            return  # User canceled
+
+        # Save default audio path
+        self.config.set('Settings', 'default_audio_path', os.path.dirname(file_paths[0]))
+        self.save_settings()
+
+        if len(file_paths) == 1:
+            # One recording becomes the current song, its chords added as they are detected
+            file_path = file_paths[0]
+            self.new_song()
+            self.song_name_var.set(os.path.splitext(os.path.basename(file_path))[0])
+            chord_queue = queue.Queue()
+
+            def analyse():
+                try:
+                    for chord in import_wav_chords(file_path, self.octaves):
+                        chord_queue.put(chord)
+                    chord_queue.put(None)
+                except Exception as e:
+                    chord_queue.put(e)
+
+            threading.Thread(target=analyse, daemon=True).start()
+            self.root.after(10, self._add_imported_chords, chord_queue)
+            return
+
+        # Several recordings are analysed in parallel and saved as song files
+        output_directory = filedialog.askdirectory(title="Save the detected songs in",
+                                                   initialdir=self.config.get('Settings', 'default_song_path',
+                                                                              fallback='') or None)
+        if not output_directory:
+            return
+        result_queue = queue.Queue()
+
+        def analyse_all():
+            try:
+                result_queue.put(import_wav_songs(file_paths, output_directory, self.octaves))
+            except Exception as e:
+                result_queue.put(e)
+
+        def check_result():
+            try:
+                result = result_queue.get_nowait()
+            except queue.Empty:
+                self.root.after(100, check_result)
+                return
+            self.playback_status_var.set("")
+            if isinstance(result, Exception):
+                messagebox.showerror("Error", f"An error occurred while detecting chords:\n{result}")
+            else:
+                messagebox.showinfo("Import Audio", f"{len(result)} songs have been saved in '{output_directory}'.")
+
+        self.playback_status_var.set(f"Detecting chords in {len(file_paths)} recordings...")
+        threading.Thread(target=analyse_all, daemon=True).start()
+        self.root.after(100, check_result)
+
+    def _add_imported_chords(self, chord_queue, batch_size=16):
+        for _ in range(batch_size):
+            try:
+                item = chord_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None or isinstance(item, Exception):
+                if isinstance(item, Exception):
+                    messagebox.showerror("Error", f"An error occurred while importing the file:\n{item}")
+                self.saved_keyboards_frame.canvas.configure(scrollregion=self.saved_keyboards_frame.canvas.bbox('all'))
+                self.unsaved_changes = True
+                return
+            self.add_saved_keyboard(*item)
+        # Keep the UI responsive between batches
+        self.root.after(1, self._add_imported_chords, chord_queue, batch_size)
+
+    def show_song_library(self):
+        if self.library_window and self.library_window.winfo_exists():
+            self.library_window.lift()
+            return
+        lang = self.language_var.get()
+        window = tk.Toplevel(self.root)
+        window.title(self.translations[lang]['song_library'])
+        window.geometry("640x420")
+        self.library_window = window
+
+        top_frame = tk.Frame(window)
+        top_frame.pack(fill='x', padx=5, pady=5)
+        folder_var = tk.StringVar(value=self.library_path)
+        tk.Label(top_frame, textvariable=folder_var, anchor='w').pack(side='left', fill='x', expand=True)
+        tk.Button(top_frame, text="Rescan", command=lambda: self.rescan_song_library(tree, status_var)).pack(side='right')
+        tk.Button(top_frame, text="Choose Folder...",
+                  command=lambda: self.select_library_folder(folder_var, tree, status_var)).pack(side='right')
+
+        search_frame = tk.Frame(window)
+        search_frame.pack(fill='x', padx=5)
+        search_mode = tk.StringVar(value="Chord Name")
+        ttk.Combobox(search_frame, textvariable=search_mode, state='readonly', width=14,
+                     values=["Chord Name", "Pitch Set", "Contains Pitches", "Progression", "Key",
+                             "Roman Numerals"]).pack(side='left')
+        search_var = tk.StringVar()
+        search_entry = tk.Entry(search_frame, textvariable=search_var)
+        search_entry.pack(side='left', fill='x', expand=True, padx=5)
+        search_entry.bind('<Return>', lambda event: self.search_song_library(tree, status_var, search_mode.get(),
+                                                                             search_var.get()))
+        tk.Button(search_frame, text="Search", command=lambda: self.search_song_library(
+            tree, status_var, search_mode.get(), search_var.get())).pack(side='left')
+
+        # The analysed Roman-numeral progression is a hidden column, shown below the list for the selected song
+        tree = ttk.Treeview(window, columns=('song_name', 'chords', 'key', 'score', 'path', 'progression'),
+                            displaycolumns=('song_name', 'chords', 'key', 'score', 'path'), show='headings')
+        for column, heading in (('song_name', "Song"), ('chords', "Chords"), ('key', "Key"), ('score', "Fit"),
+                                ('path', "File")):
+            tree.heading(column, text=heading, command=lambda c=column: self.sort_library_results(tree, c))
+        tree.column('chords', width=60, anchor='e', stretch=False)
+        tree.column('key', width=90, stretch=False)
+        tree.column('score', width=50, anchor='e', stretch=False)
+        tree.pack(fill='both', expand=True, padx=5, pady=5)
+        tree.bind('<Double-1>', lambda event: self.open_library_song(tree))
+        tree.bind('<<TreeviewSelect>>', lambda event: status_var.set(
+            tree.set(tree.selection()[0], 'progression') if tree.selection() else ''))
+
+        status_var = tk.StringVar()
+        tk.Label(window, textvariable=status_var, anchor='w').pack(fill='x', padx=5, pady=(0, 5))
+
+        if self.library_path:
+            self.rescan_song_library(tree, status_var)
+
+    def select_library_folder(self, folder_var, tree, status_var):
+        folder = filedialog.askdirectory(initialdir=self.library_path or None)
+        if folder:
+            self.library_path = folder
+            folder_var.set(folder)
+            self.save_settings()
+            self.rescan_song_library(tree, status_var)
+
+    def rescan_song_library(self, tree, status_var):
+        if not self.library_path:
+            return
+        status_var.set("Scanning...")
+        result_queue = queue.Queue()
+
+        def scan():
+            # sqlite connections belong to one thread, so the scan opens its own
+            try:
+                library = SongLibrary(self.library_database)
+                try:
+                    result_queue.put(library.rescan(self.library_path))
+                finally:
+                    library.close()
+            except Exception as e:
+                result_queue.put(e)
+
+        def check_scan():
+            try:
+                result = result_queue.get_nowait()
+            except queue.Empty:
+                self.root.after(50, check_scan)
+                return
+            if isinstance(result, Exception):
+                status_var.set("")
+                messagebox.showerror("Error", f"An error occurred while scanning the song library:\n{result}")
+                return
+            songs = self.song_library.songs()
+            self.show_library_results(tree, songs)
+            status_var.set(f"{len(songs)} songs ({result[0]} updated, {result[1]} removed)")
+
+        threading.Thread(target=scan, daemon=True).start()
+        self.root.after(50, check_scan)
+
+    def search_song_library(self, tree, status_var, mode, text):
+        try:
+            if not text.strip():
+                results = self.song_library.songs()
+            elif mode == "Chord Name":
+                results = self.song_library.search_chord_name(text)
+            elif mode in ("Pitch Set", "Contains Pitches"):
+                results = self.song_library.search_pitch_set(parse_pitch_set(text), contains=mode == "Contains Pitches")
+            elif mode == "Key":
+                results = self.song_library.search_key(parse_key_name(text))
+            elif mode == "Roman Numerals":
+                results = self.song_library.search_numerals(text)
+            else:
+                # Chord names separated by spaces, or pitch sets in brackets, e.g. "Dm7 G7 [C E G]"
+                chords = [parse_pitch_set(token[1:-1]) if token.startswith('[') else token
+                          for token in re.findall(r'\[[^\]]*\]|\S+', text)]
+                results = self.song_library.search_progression(chords)
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid search:\n{e}")
+            return
+        self.show_library_results(tree, results)
+        status_var.set(f"{len(results)} songs found")
+
+    @staticmethod
+    def show_library_results(tree, results):
+        tree.delete(*tree.get_children())
+        for path, song_name, chord_count, key_name, key_score, progression in results:
+            tree.insert('', 'end', values=(song_name, chord_count, key_name or '',
+                                           f"{key_score:.2f}" if key_name else '', path, progression or ''))
+
+    def sort_library_results(self, tree, column):
+        # Sort on the values already in the view; a second click on the same column reverses the order
+        rows = [(tree.set(item, column), item) for item in tree.get_children()]
+        numeric = column in ('chords', 'score')
+        reverse = self.library_sort == (column, False)
+        rows.sort(key=lambda row: (float(row[0]) if row[0] else -1.0) if numeric else row[0].lower(), reverse=reverse)
+        for index, (_, item) in enumerate(rows):
+            tree.move(item, '', index)
+        self.library_sort = (column, reverse)
+
+    def open_library_song(self, tree):
+        selection = tree.selection()
+        if selection:
+            self.load_song_file(tree.item(selection[0], 'values')[4], show_message=False)
+
+    def analyze_key(self):
+        lang = self.language_var.get()
+        if not self.saved_keyboards:
+            messagebox.showwarning(self.translations[lang]['analyze_key'], "No chords have been saved yet.")
+            return
+        key_name, key_score, progression = analyze_song(self.get_song_data())
+        if not key_name:
+            messagebox.showinfo(self.translations[lang]['analyze_key'], "The song has no notes.")
+            return
+        messagebox.showinfo(self.translations[lang]['analyze_key'],
+                            f"Key: {key_name} (fit {key_score:.2f})\n\n{progression}")
+
+    def midi_export_settings(self):
+        # Playback settings that are carried into exported MIDI files
+        return {
+            'song_speed': self.song_speed.get(),
+            'chord_speed': self.chord_speed.get(),
+            'playback_octave': self.playback_octave.get(),
+            'velocity': self.midi_volume.get(),
+            'program': self.midi_instrument,
+        }
+
+    def save_song(self):
+        if self.current_song_file:
+            file_path = self.current_song_file
+        else:
+            result = self.save_song_as()  # Prompt for file name if not already saved
+            if not result:
+                return
+            else:
+                file_path = self.current_song_file
+        try:
+            # Prepare data to save
+            song_data = self.get_song_data()
+            # Write data to file, with repeated chords stored once
+            write_song_file(song_data, file_path)
+            # Update song name
+            self.song_name_var.set(song_data["song_name"])
+            self.song_name_entry.delete(0, tk.END)
+            self.song_name_entry.insert(0, song_data["song_name"])
+            messagebox.showinfo("Save Song", f"Song saved successfully to '{file_path}'.")
+            self.unsaved_changes = False
+            self.song_saved = True
+            self.current_song_file = file_path
+            self.update_song_watcher()
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred while saving the song:\n{e}")
+
+    def save_song_as(self):
+        try:
+            song_title = self.song_name_var.get() or "Untitled"
+            default_song_path = self.config.get('Settings', 'default_song_path', fallback='')
+            # Ask the user for a file name to save the song
+            file_path = filedialog.asksaveasfilename(defaultextension=".json", initialfile=f"{song_title}.json",
+                                                     filetypes=[("JSON files", "*.json")],
+                                                     initialdir=default_song_path)
+            if file_path:
+                # Save default song path
+                self.config.set('Settings', 'default_song_path', os.path.dirname(file_path))
+                self.save_settings()
+                # Prepare data to save
+                song_data = self.get_song_data(os.path.splitext(os.path.basename(file_path))[0])
+                # Write data to file, with repeated chords stored once
+                write_song_file(song_data, file_path)
+                # Update song name
+                self.song_name_var.set(song_data["song_name"])
+                self.song_name_entry.delete(0, tk.END)
+                self.song_name_entry.insert(0, song_data["song_name"])
+                messagebox.showinfo("Save Song", f"Song saved successfully to '{file_path}'.")
+                self.unsaved_changes = False
+                self.song_saved = True
+                self.current_song_file = file_path
+                self.update_song_watcher()
+                return True
+            else:
+                return False  # User canceled
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred while saving the song:\n{e}")
+            return False
+
+    def load_song(self):
+        # Ask the user to select a song file to load
+        default_song_path = self.config.get('Settings', 'default_song_path', fallback='')
+        file_path = filedialog.askopenfilename(filetypes=[("JSON files", "*.json")],
+                                               initialdir=default_song_path)
+        if file_path:
+            # Save default song path
+            self.config.set('Settings', 'default_song_path', os.path.dirname(file_path))
+            self.save_settings()
+            self.load_song_file(file_path)
+
+    def load_song_file(self, file_path, show_message=True):
+        if not file_path:
+            return
+        # The current song is put back if the file turns out to be unreadable halfway
+        previous_song = (self.get_song_data(), self.current_song_file, self.song_saved, self.unsaved_changes,
+                         self.history)
+        self.history = EditHistory()
+        # Clear current song
+        self.new_song()
+        self.song_name_var.set(os.path.splitext(os.path.basename(file_path))[0])
+        self.song_name_entry.delete(0, tk.END)
+        self.song_name_entry.insert(0, self.song_name_var.get())
+        # From here on only edits made while the song is loading count as unsaved changes
+        self.unsaved_changes = False
+
+        # The file is parsed on a background thread and the chords are added as they are read, so the
+        # first chords can be seen and played before a large file is finished. The bounded queue keeps
+        # the reader at most a window ahead of the view.
+        chord_queue = queue.Queue(maxsize=256)
+        stop_event = threading.Event()
+        self.song_loader_stop = stop_event
+
+        def read():
+            shared_key_states = {}  # Repeated chords share one key_states list
+            try:
+                for item in iter_song_file(file_path):
+                    if item[0] == 'chord':
+                        key_states = item[1]["key_states"]
+                        item = ('chord', item[1]["chord_name"],
+                                shared_key_states.setdefault(tuple(key_states), key_states))
+                    while not stop_event.is_set():
+                        try:
+                            chord_queue.put(item, timeout=0.1)
+                            break
+                        except queue.Full:
+                            pass
+                    if stop_event.is_set():
+                        return
+                chord_queue.put(None)
+            except Exception as e:
+                chord_queue.put(e)
+
+        threading.Thread(target=run_profiled, args=('load_song', read), daemon=True).start()
+        self.root.after(1, self._add_loaded_chords, chord_queue, stop_event, file_path, show_message, previous_song)
+
+    def _add_loaded_chords(self, chord_queue, stop_event, file_path, show_message, previous_song, batch_size=32):
+        if stop_event.is_set():
+            return  # Another song was started or loaded meanwhile
+        for _ in range(batch_size):
+            try:
+                item = chord_queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, Exception):
+                self.restore_song(*previous_song)
+                messagebox.showerror("Error", f"An error occurred while loading the song:\n{item}")
+                return
+            if item is None:
+                # Update the scroll region
+                self.saved_keyboards_frame.canvas.update_idletasks()
+                self.saved_keyboards_frame.canvas.configure(scrollregion=self.saved_keyboards_frame.canvas.bbox('all'))
+
+                # Scroll to the bottom to show the latest keyboard
+                self.saved_keyboards_frame.canvas.yview_moveto(1.0)
+
+                # unsaved_changes stays set if the song was edited while it was loading
+                self.song_saved = True
+                self.current_song_file = file_path
+                self.update_song_watcher()
+
+                if show_message:
+                    messagebox.showinfo("Load Song", f"Song loaded successfully from '{file_path}'.")
+                return
+            if item[0] == 'field':
+                _, name, value = item
+                if name == "song_name":
+                    # Set song name, which is not an edit of the song
+                    unsaved_changes = self.unsaved_changes
+                    self.song_name_var.set(value)
+                    self.song_name_entry.delete(0, tk.END)
+                    self.song_name_entry.insert(0, value)
+                    self.unsaved_changes = unsaved_changes
+                elif name == "number_of_octaves" and not self.saved_keyboards and value != self.octaves:
+                    self.set_octaves(value)
+            else:
+                _, chord_name, key_states = item
+                # Older files list the number of octaves after the chords, so the first chord sets it
+                if not self.saved_keyboards and len(key_states) // 12 != self.octaves:
+                    self.set_octaves(len(key_states) // 12)
+                # Recreate the saved keyboard
+                self.add_saved_keyboard(chord_name, key_states)
+        self.root.after(1, self._add_loaded_chords, chord_queue, stop_event, file_path, show_message, previous_song)
+
+    def restore_song(self, song_data, song_file, song_saved, unsaved_changes, history):
+        # Put back a song that was replaced by a load that failed
+        self.song_saved = True  # Skip the save prompt of new_song
+        self.new_song()
+        self.song_name_var.set(song_data["song_name"])
+        self.song_name_entry.delete(0, tk.END)
+        self.song_name_entry.insert(0, song_data["song_name"])
+        if song_data["number_of_octaves"] != self.octaves:
+            self.set_octaves(song_data["number_of_octaves"])
+        for keyboard_data in song_data["saved_keyboards"]:
+            self.add_saved_keyboard(keyboard_data["chord_name"], keyboard_data["key_states"])
+        self.saved_keyboards_frame.canvas.update_idletasks()
+        self.saved_keyboards_frame.canvas.configure(scrollregion=self.saved_keyboards_frame.canvas.bbox('all'))
+        self.history = history
+        self.unsaved_changes = unsaved_changes
+        self.song_saved = song_saved
+        self.current_song_file = song_file
+        self.update_song_watcher()
+
+    def toggle_song_watcher(self):
+        self.update_song_watcher()
+        self.save_settings()
+
+    def update_song_watcher(self):
+        # Watch the current song file while watching is on; called whenever the current file changes
+        file_path = self.current_song_file if self.watch_song_file.get() else None
+        if self.song_watcher and self.song_watcher.file_path == file_path:
+            self.song_watcher.mark_seen()
+            return
+        if self.song_watcher:
+            self.song_watcher.stop()
+            self.root.after_cancel(self.song_watch_poll_id)
+            self.song_watcher = None
+        if file_path:
+            self.song_watcher = SongFileWatcher(file_path)
+            self.song_watcher.start()
+            self.poll_song_watcher()
+
+    def poll_song_watcher(self):
+        # Only the newest version matters when the file changed several times
+        change = None
+        while True:
+            try:
+                change = self.song_watcher.changes.get_nowait()
+            except queue.Empty:
+                break
+        if change:
+            self.apply_song_changes(*change)
+        self.song_watch_poll_id = self.root.after(200, self.poll_song_watcher)
+
+    def apply_song_changes(self, song_name, octaves, chords):
+        # Bring the song in line with the file on disk, changing only the chords that differ
+        if (chords and len(chords[0][1]) != self.octaves * 12) or octaves not in (None, self.octaves):
+            # Another keyboard size changes every view; load the file again
+            self.load_song_file(self.current_song_file, show_message=False)
+            return
+        old = [(saved_keyboard.chord_name, tuple(saved_keyboard.key_states)) for saved_keyboard in self.saved_keyboards]
+        new = [(chord_name, tuple(key_states)) for chord_name, key_states in chords]
+        opcodes = [opcode for opcode in difflib.SequenceMatcher(None, old, new, autojunk=False).get_opcodes()
+                   if opcode[0] != 'equal']
+        renamed = song_name is not None and song_name != self.song_name_var.get()
+        if not opcodes and not renamed:
+            return
+        if self.unsaved_changes and not messagebox.askyesno(
+                "Song Changed on Disk", f"'{self.current_song_file}' was changed by another program.\n"
+                                        "Load the changes? They can be undone with Ctrl+Z."):
+            return
+
+        # Keep the view where it is
+        view_top = self.saved_keyboards_frame.canvas.yview()[0]
+        operations = []
+        # From the end backwards, so the indices of the earlier changes stay valid
+        for _, i1, i2, j1, j2 in reversed(opcodes):
+            # Changed chords are edited in place; the rest are removed or added
+            common = min(i2 - i1, j2 - j1)
+            for offset in range(common):
+                saved_keyboard = self.saved_keyboards[i1 + offset]
+                chord_name, key_states = new[j1 + offset]
+                operations += self.edit_operations(saved_keyboard, list(key_states), chord_name)
+                saved_keyboard.key_states = list(key_states)
+                saved_keyboard.chord_name = chord_name
+                self.update_saved_canvas(saved_keyboard)
+            for index in range(i2 - 1, i1 + common - 1, -1):
+                saved_keyboard = self.saved_keyboards[index]
+                if saved_keyboard is self.currently_editing_keyboard:
+                    self.clear_keyboard()
+                operations.append((EditHistory.DELETE, index, EditHistory.mask(saved_keyboard.key_states),
+                                   len(saved_keyboard.key_states), saved_keyboard.chord_name, ''))
+                self.remove_saved_keyboard(index)
+            for offset, (chord_name, key_states) in enumerate(new[j1 + common:j2]):
+                index = i1 + common + offset
+                operations.append((EditHistory.INSERT, index, EditHistory.mask(key_states), len(key_states),
+                                   chord_name, ''))
+                self.add_saved_keyboard(chord_name, list(key_states), index)
+        self.history.record(operations)
+        if renamed:
+            self.song_name_var.set(song_name)
+            self.song_name_entry.delete(0, tk.END)
+            self.song_name_entry.insert(0, song_name)
+
+        self.saved_keyboards_frame.canvas.update_idletasks()
+        self.saved_keyboards_frame.canvas.configure(scrollregion=self.saved_keyboards_frame.canvas.bbox('all'))
+        self.saved_keyboards_frame.canvas.yview_moveto(view_top)
+        # The song matches the file again
+        self.unsaved_changes = False
+        self.playback_status_var.set(f"Reloaded '{os.path.basename(self.current_song_file)}' from disk "
+                                     f"({len(operations)} changes).")
+
+    def on_closing(self):
+        try:
+            lang = self.language_var.get()
+            if not self.song_saved:
+                response = messagebox.askyesnocancel(self.translations[lang]['save_song'],
+                                                     self.translations[lang]['save_song_prompt'])
+                if response:  # User chose 'Yes' to save
+                    self.save_song()
+                elif response is False:  # User chose 'No'
+                    pass
+                else:
+                    return  # User chose 'Cancel' or closed the dialog
+            elif self.unsaved_changes:
+                response = messagebox.askyesnocancel(self.translations[lang]['save_song'],
+                                                     self.translations[lang]['unsaved_changes_message'])
+                if response:  # User chose 'Yes' to save
+                    self.save_song()
+                    self.root.destroy()
+                elif response is False:  # User chose 'No'
+                    self.root.destroy()
+                else:
+                    pass  # User chose 'Cancel' or closed the dialog
+            else:
+                self.root.destroy()
+            # Save settings on exit
+            self.save_settings()
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred while exiting:\n{e}")
+
+    def play_note_wrapper(self, key, trace_id=None):
+        if trace_id is None:
+            trace_id = tracer.begin('note', key.note_name)
+        # Adjust the note according to playback octave
+        octave_shift = self.playback_octave.get() * 12
+        if self.output_method.get() == "MIDI Output" and self.midi_output:
+            # Adjust MIDI note
+            midi_note = key.midi_note + octave_shift
+            if 0 <= midi_note <= 127:
+                tracer.stage(trace_id, 'tk_dispatch')
+                threading.Thread(target=self.play_midi_note, args=(midi_note,), kwargs={'trace_id': trace_id},
+                                 daemon=True).start()
+            else:
+                lang = self.language_var.get()
+                messagebox.showwarning(self.translations[lang]['invalid_note_title'], self.translations[lang]['invalid_note'])
+        else:
+            # Adjust frequency
+            frequency = key.frequency * (2 ** self.playback_octave.get())
+            tracer.stage(trace_id, 'tk_dispatch')
+            threading.Thread(target=play_note_pc, args=(frequency,),
+                             kwargs={'volume': self.pc_volume.get(), 'timbre': self.pc_timbre.get(),
+                                     'trace_id': trace_id}, daemon=True).start()
+
+    def play_midi_note(self, midi_note, duration=0.5, trace_id=None):
+        tracer.stage(trace_id, 'thread_start')
+        velocity = self.midi_volume.get()
+        msg_on = mido.Message('note_on', note=midi_note, velocity=velocity)
+        msg_off = mido.Message('note_off', note=midi_note, velocity=velocity)
+        self.midi_output.send(msg_on)
+        tracer.stage(trace_id, 'midi_send')
+        tracer.finish(trace_id)
+        time.sleep(duration)
+        self.midi_output.send(msg_off)
+
+    def play_chord(self):
+        # Collect selected keys
+        selected_keys = [key for key in self.white_keys + self.black_keys if key.selected]
+        if not selected_keys:
+            # Should not happen since button is disabled when no keys are selected
+            return
+        # Sort keys from lowest to highest frequency
+        selected_keys.sort(key=lambda k: k.frequency)
+        if self.chord_speed.get() == 0:
+            trace_id = tracer.begin('chord', self.chord_name_var.get())
+            # Play all notes at once
+            if self.output_method.get() == "MIDI Output" and self.midi_output:
+                midi_notes = []
+                octave_shift = self.playback_octave.get() * 12
+                for key in selected_keys:
+                    midi_note = key.midi_note + octave_shift
+                    if 0 <= midi_note <= 127:
+                        midi_notes.append(midi_note)
+                    else:
+                        lang = self.language_var.get()
+                        messagebox.showwarning(self.translations[lang]['invalid_note_title'], self.translations[lang]['invalid_note'])
+                        return
+                tracer.stage(trace_id, 'tk_dispatch')
+                threading.Thread(target=self.play_midi_chord, args=(midi_notes,), kwargs={'trace_id': trace_id},
+                                 daemon=True).start()
+            else:
+                frequencies = [key.frequency * (2 ** self.playback_octave.get()) for key in selected_keys]
+                # Generate and play chord
+                tracer.stage(trace_id, 'tk_dispatch')
+                threading.Thread(target=play_chord_pc, args=(frequencies,),
+                                 kwargs={'volume': self.pc_volume.get(), 'timbre': self.pc_timbre.get(),
+                                         'trace_id': trace_id}, daemon=True).start()
+        else:
+            # Play notes one by one based on chord speed
+            threading.Thread(target=self.play_arpeggiated_chord, args=(selected_keys,), daemon=True).start()
+
+    def play_arpeggiated_chord(self, selected_keys):
+        while selected_keys:
+            speed = self.chord_speed.get()
+            if speed == 0:
+                delay = 0.1
+            else:
+                delay = 2.0 / speed  # Inverse relationship: higher speed = shorter delay
+            key = selected_keys.pop(0)
+            self.play_note_wrapper(key)
+            start_time = time.time()
+            while time.time() - start_time < delay:
+                time.sleep(0.01)
+
+    def play_midi_chord(self, midi_notes, duration=0.5, trace_id=None):
+        tracer.stage(trace_id, 'thread_start')
+        velocity = self.midi_volume.get()
+        msgs_on = [mido.Message('note_on', note=note, velocity=velocity) for note in midi_notes]
+        msgs_off = [mido.Message('note_off', note=note, velocity=velocity) for note in midi_notes]
+        for msg in msgs_on:
+            self.midi_output.send(msg)
+        tracer.stage(trace_id, 'midi_send')
+        tracer.finish(trace_id)
+        time.sleep(duration)
+        for msg in msgs_off:
+            self.midi_output.send(msg)
+
+    def toggle_mute(self):
+        self.is_muted = not self.is_muted
+        self.is_muted_var.set(self.is_muted)
+        lang = self.language_var.get()
+        if self.is_muted:
+            self.mute_button.config(text=self.translations[lang]['unmute_input'])
+        else:
+            self.mute_button.config(text=self.translations[lang]['mute_input'])
+
+    def play_or_stop_song(self):
+        lang = self.language_var.get()
+        if self.is_playing_song:
+            # Stop song playback
+            self.is_playing_song = False
+            self.play_song_button.config(text=self.translations[lang]['play_song'])
+            self.playback_status_var.set(self.translations[lang]['playback_stopped'])
+        else:
+            # Start song playback
+            self.is_playing_song = True
+            self.play_song_button.config(text=self.translations[lang]['stop_song'])
+            # Loop the A-B section when both loop points are set, otherwise play the whole song
+            target = self._play_loop_thread if self.loop_section() else self._play_song_thread
+            threading.Thread(target=run_profiled, args=('play_song', target), daemon=True).start()
+
+    def _song_chord_events(self, saved_keyboards=None):
+        # Collect the playable chords of the song, with keys sorted from lowest to highest frequency
+        if saved_keyboards is None:
+            saved_keyboards = self.saved_keyboards
+        events = []
+        all_keys = self.white_keys + self.black_keys
+        for saved_keyboard in saved_keyboards:
+            selected_keys = [key for key, selected in zip(all_keys, saved_keyboard.key_states) if selected]
+            if selected_keys:
+                selected_keys.sort(key=lambda k: k.frequency)
+                events.append((saved_keyboard, selected_keys))
+        return events
+
+    def render_song_chord(self, selected_keys):
+        # Render one song chord (all notes at once or arpeggiated) into a PC audio buffer
+        frequencies = [key.frequency * (2 ** self.playback_octave.get()) for key in selected_keys]
+        speed = self.chord_speed.get()
+        if speed == 0:
+            return render_chord_pc(frequencies, duration=0.5, volume=self.pc_volume.get(), timbre=self.pc_timbre.get())
+        return render_arpeggio_pc(frequencies, 2.0 / speed, duration=0.5, volume=self.pc_volume.get(),
+                                  timbre=self.pc_timbre.get())
+
+    def _wait_until(self, deadline):
+        # Sleep until the deadline; returns False if playback was stopped in the meantime
+        while self.is_playing_song:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return True
+            time.sleep(min(remaining, 0.01))
+        return False
+
+    def _play_song_thread(self):
+        events = self._song_chord_events()
+        use_midi = self.output_method.get() == "MIDI Output" and self.midi_output
+
+        # Render the next chords in the background so playback never waits for synthesis
+        prerenderer = None
+        if not use_midi:
+            prerenderer = ChordPrerenderer(self.render_song_chord, [keys for _, keys in events],
+                                           lookahead=self.prerender_lookahead)
+            prerenderer.start()
+
+        # Send our own clock at one beat per chord
+        clock_sender = None
+        if self.send_midi_clock.get() and self.midi_output:
+            clock_sender = MidiClockSender(self.midi_output.send, lambda: 30.0 * self.song_speed.get())
+            clock_sender.start()
+
+        # With clock sync, chords follow the beats of the incoming MIDI clock after its start message
+        clock_generation = None
+        if self.clock_sync_enabled.get():
+            lang = self.language_var.get()
+            self.playback_status_var.set(self.translations[lang]['waiting_for_clock'])
+            clock_generation = self.clock_follower.wait_for_start(lambda: self.is_playing_song)
+
+        self.playback_late_chords = 0
+        self.playback_underruns = 0
+        highlighted_keyboard = None
+        next_due = time.perf_counter()
+        for chord_number, (saved_keyboard, selected_keys) in enumerate(events):
+            if clock_generation is not None:
+                tick = chord_number * self.clock_beats_per_chord * MidiClockFollower.TICKS_PER_BEAT
+                next_due = self.clock_follower.wait_for_tick(tick, clock_generation, lambda: self.is_playing_song)
+                if next_due is None:
+                    break
+            if not self._wait_until(next_due):
+                break
+
+            # Remove highlight of the previous chord
+            if highlighted_keyboard:
+                self.unhighlight_saved_keyboard(highlighted_keyboard)
+                highlighted_keyboard = None
+
+            # A playback trace runs from the chord's due time until its audio or MIDI has been handed over
+            trace_id = tracer.begin('playback', saved_keyboard.chord_name, start=next_due)
+            tracer.stage(trace_id, 'schedule_wait')
+
+            audio = None
+            if prerenderer:
+                audio = prerenderer.get_nowait()
+                if audio is None:
+                    # The worker fell behind; wait for it and count the underrun
+                    self.playback_underruns += 1
+                    audio = prerenderer.get()
+                    if audio is None:
+                        break
+                tracer.stage(trace_id, 'prerender_get')
+
+            chord_start = time.perf_counter()
+            if chord_start - next_due > 0.02:
+                self.playback_late_chords += 1
+
+            # Update playback status
+            lang = self.language_var.get()
+            self.playback_status_var.set(f"{self.translations[lang]['playing']} {saved_keyboard.chord_name}")
+            self.root.after(0, self.root.update_idletasks)
+
+            # Highlight the saved keyboard
+            self.highlight_saved_keyboard(saved_keyboard)
+            highlighted_keyboard = saved_keyboard
+
+            speed = self.chord_speed.get()
+            if prerenderer:
+                tracer.stage(trace_id, 'ui_update')
+                tracer.track_playback(audio_backend.play_buffer(audio, 1, 2, 44100))
+                tracer.stage(trace_id, 'device')
+                tracer.finish(trace_id)
+                # An arpeggio keeps sounding its notes before the song delay starts
+                arpeggio_time = 0 if speed == 0 else len(selected_keys) * 2.0 / speed
+                next_due = chord_start + arpeggio_time + 2.0 / self.song_speed.get()
+            else:
+                if speed == 0:
+                    # Play all notes at once
+                    midi_notes = []
+                    octave_shift = self.playback_octave.get() * 12
+                    for key in selected_keys:
+                        midi_note = key.midi_note + octave_shift
+                        if 0 <= midi_note <= 127:
+                            midi_notes.append(midi_note)
+                        else:
+                            messagebox.showwarning(self.translations[lang]['invalid_note_title'], self.translations[lang]['invalid_note'])
+                            self.is_playing_song = False
+                            break
+                    if not self.is_playing_song:
+                        break
+                    tracer.stage(trace_id, 'ui_update')
+                    self.play_midi_chord(midi_notes, duration=0.5, trace_id=trace_id)
+                else:
+                    # Play notes one by one based on chord speed
+                    tracer.stage(trace_id, 'ui_update')
+                    tracer.finish(trace_id)
+                    self.play_arpeggiated_chord_during_song(list(selected_keys))
+                # Calculate delay based on song speed (inverse relationship)
+                next_due = time.perf_counter() + 2.0 / self.song_speed.get()
+
+        # Let the last chord ring for its full duration
+        if highlighted_keyboard:
+            self._wait_until(next_due)
+            self.unhighlight_saved_keyboard(highlighted_keyboard)
+        if prerenderer:
+            prerenderer.stop()
+        if clock_sender:
+            clock_sender.stop()
+
+        # Clear playback status after playback, keeping diagnostics if something was late
+        lang = self.language_var.get()
+        if self.playback_late_chords or self.playback_underruns:
+            self.playback_status_var.set(self.translations[lang]['playback_diagnostics'].format(
+                late=self.playback_late_chords, underruns=self.playback_underruns))
+        else:
+            self.playback_status_var.set("")
+        self.is_playing_song = False
+        self.play_song_button.config(text=self.translations[lang]['play_song'])
+
+    def set_loop_point(self, saved_keyboard):
+        # The first right-click sets the loop start (A), the second the loop end (B), a third starts over
+        if self.loop_start_keyboard is None or self.loop_end_keyboard is not None:
+            self.loop_start_keyboard = saved_keyboard
+            self.loop_end_keyboard = None
+        else:
+            self.loop_end_keyboard = saved_keyboard
+            # Keep A before B in song order
+            if self.saved_keyboards.index(self.loop_end_keyboard) < self.saved_keyboards.index(self.loop_start_keyboard):
+                self.loop_start_keyboard, self.loop_end_keyboard = self.loop_end_keyboard, self.loop_start_keyboard
+        self.draw_loop_markers()
+
+    def clear_loop_points(self):
+        self.loop_start_keyboard = None
+        self.loop_end_keyboard = None
+        self.draw_loop_markers()
+
+    def loop_section(self):
+        # Return (start index, end index) of the A-B section, or None if it is not complete
+        if self.loop_start_keyboard is None or self.loop_end_keyboard is None:
+            return None
+        return (self.saved_keyboards.index(self.loop_start_keyboard),
+                self.saved_keyboards.index(self.loop_end_keyboard))
+
+    def draw_loop_markers(self):
+        for saved_keyboard in self.saved_keyboards:
+            saved_keyboard.canvas.delete("loop_marker")
+        for label, saved_keyboard in (("A", self.loop_start_keyboard), ("B", self.loop_end_keyboard)):
+            if saved_keyboard is not None:
+                self.draw_loop_marker(saved_keyboard, label)
+
+    def draw_loop_marker(self, saved_keyboard, label):
+        counters.count('canvas.items')
+        saved_keyboard.canvas.create_text(2, 2, text=label, font=("Arial", 10, "bold"),
+                                          fill="green", anchor="nw", tags="loop_marker")
+
+    def _chord_period(self, number_of_keys):
+        # Time from the start of a song chord to the start of the next one
+        speed = self.chord_speed.get()
+        arpeggio_time = 0 if speed == 0 else number_of_keys * 2.0 / speed
+        return arpeggio_time + 2.0 / self.song_speed.get()
+
+    def _loop_parameters(self):
+        # Settings that require the loop section to be built again when they change
+        return (self.song_speed.get(), self.chord_speed.get(), self.pc_volume.get(),
+                self.playback_octave.get(), self.midi_volume.get(), self.pc_timbre.get(), effects_chain)
+
+    def _render_loop_section(self, events):
+        # Render the whole A-B section into a single buffer that can be replayed back to back
+        fs = 44100
+        offsets = []
+        chunks = []
+        rendered = {}  # Repeated chords in the section are rendered once
+        position = 0.0
+        for _, selected_keys in events:
+            offsets.append(position)
+            key = tuple(selected_keys)
+            if key not in rendered:
+                rendered[key] = self.render_song_chord(selected_keys)
+            chunks.append(rendered[key])
+            position += self._chord_period(len(selected_keys))
+        length = int(round(position * fs))
+        section = np.zeros(length, dtype=np.int32)
+        for offset, chunk in zip(offsets, chunks):
+            start = int(round(offset * fs))
+            head = min(len(chunk), length - start)
+            section[start:start + head] += chunk[:head]
+            # Notes ringing past the loop end wrap around to the start, so the loop point has no gap
+            tail = chunk[head:]
+            while len(tail):
+                count = min(len(tail), length)
+                section[:count] += tail[:count]
+                tail = tail[count:]
+        audio = np.clip(section, -(2 ** 15 - 1), 2 ** 15 - 1).astype(np.int16)
+        return audio, offsets, position
+
+    def _schedule_loop_section_midi(self, events):
+        # Build the MIDI events of the whole A-B section once, as (time, message type, note) tuples
+        octave_shift = self.playback_octave.get() * 12
+        speed = self.chord_speed.get()
+        offsets = []
+        schedule = []
+        position = 0.0
+        for _, selected_keys in events:
+            offsets.append(position)
+            for i, key in enumerate(selected_keys):
+                midi_note = key.midi_note + octave_shift
+                if not 0 <= midi_note <= 127:
+                    return None
+                note_time = position if speed == 0 else position + i * 2.0 / speed
+                schedule.append((note_time, 'note_on', midi_note))
+                schedule.append((note_time + 0.5, 'note_off', midi_note))
+            position += self._chord_period(len(selected_keys))
+        # Note-offs past the loop end wrap around to the start of the next repetition
+        schedule = sorted((event_time % position, kind, note) for event_time, kind, note in schedule)
+        return schedule, offsets, position
+
+    def _play_loop_thread(self):
+        start_index, end_index = self.loop_section()
+        events = self._song_chord_events(self.saved_keyboards[start_index:end_index + 1])
+        use_midi = self.output_method.get() == "MIDI Output" and self.midi_output
+        build_section = self._schedule_loop_section_midi if use_midi else self._render_loop_section
+
+        # The section is rendered (or scheduled) once and replayed until playback is stopped
+        section = build_section(events) if events else None
+        if section is None:
+            if events:
+                lang = self.language_var.get()
+                messagebox.showwarning(self.translations[lang]['invalid_note_title'], self.translations[lang]['invalid_note'])
+            self.is_playing_song = False
+
+        built_parameters = self._loop_parameters()
+        next_section = {}
+        highlighted_keyboard = None
+        loop_start = time.perf_counter()
+        while self.is_playing_song:
+            content, offsets, length = section
+            if not use_midi:
+                audio_backend.play_buffer(content, 1, 2, 44100)
+            event_index = 0
+            chord_index = -1
+            while self.is_playing_song:
+                elapsed = time.perf_counter() - loop_start
+                if elapsed >= length:
+                    break
+                if use_midi:
+                    velocity = self.midi_volume.get()
+                    while event_index < len(content) and content[event_index][0] <= elapsed:
+                        _, kind, note = content[event_index]
+                        self.midi_output.send(mido.Message(kind, note=note, velocity=velocity))
+                        event_index += 1
+
+                # Follow the section with the status line and highlight
+                while chord_index + 1 < len(offsets) and offsets[chord_index + 1] <= elapsed:
+                    chord_index += 1
+                    if highlighted_keyboard:
+                        self.unhighlight_saved_keyboard(highlighted_keyboard)
+                    highlighted_keyboard = events[chord_index][0]
+                    self.highlight_saved_keyboard(highlighted_keyboard)
+                    lang = self.language_var.get()
+                    self.playback_status_var.set(f"{self.translations[lang]['looping']} {highlighted_keyboard.chord_name}")
+
+                # Tempo and sound changes are built in the background and take effect at the loop boundary
+                parameters = self._loop_parameters()
+                if parameters != built_parameters and 'thread' not in next_section:
+                    built_parameters = parameters
+                    next_section['thread'] = threading.Thread(
+                        target=lambda: next_section.update(section=build_section(events)), daemon=True)
+                    next_section['thread'].start()
+
+                next_time = length if not use_midi or event_index >= len(content) else content[event_index][0]
+                time.sleep(max(0.0, min(0.005, next_time - elapsed)))
+            loop_start += length
+            if next_section.get('section') is not None:
+                section = next_section['section']
+                next_section = {}
+            elif next_section and not next_section['thread'].is_alive():
+                # Building failed (e.g. a note out of MIDI range); keep looping the previous section
+                next_section = {}
+
+        if use_midi and section is not None:
+            # Silence notes that were still sounding when the loop was stopped
+            for _, kind, note in section[0]:
+                if kind == 'note_off':
+                    self.midi_output.send(mido.Message('note_off', note=note))
+        if highlighted_keyboard:
+            self.unhighlight_saved_keyboard(highlighted_keyboard)
+        self.playback_status_var.set("")
+        self.is_playing_song = False
+        lang = self.language_var.get()
+        self.play_song_button.config(text=self.translations[lang]['play_song'])
+
+    def play_arpeggiated_chord_during_song(self, selected_keys):
+        while selected_keys and self.is_playing_song:
+            speed = self.chord_speed.get()
+            if speed == 0:
+                delay = 0.1
+            else:
+                delay = 2.0 / speed  # Inverse relationship: higher speed = shorter delay
+            key = selected_keys.pop(0)
+            self.play_note_wrapper(key)
+            start_time = time.time()
+            while time.time() - start_time < delay:
+                if not self.is_playing_song:
+                    break
+                time.sleep(0.05)
+
+    def highlight_saved_keyboard(self, saved_keyboard):
+        saved_canvas = saved_keyboard.canvas
+        x0, y0, x1, y1 = saved_canvas.bbox("all")
+        saved_keyboard.border_rect = saved_canvas.create_rectangle(x0, y0, x1, y1, outline="red", width=2)
+        counters.count('canvas.items')
+
+    def unhighlight_saved_keyboard(self, saved_keyboard):
+        if saved_keyboard.border_rect:
+            saved_keyboard.canvas.delete(saved_keyboard.border_rect)
+            saved_keyboard.border_rect = None
+
+    def save_settings(self):
+        if not self.config.has_section('Settings'):
+            self.config.add_section('Settings')
+        self.config.set('Settings', 'number_of_octaves', str(self.octaves))
+        self.config.set('Settings', 'output_method', self.output_method.get())
+        self.config.set('Settings', 'midi_port', self.selected_midi_port or '')
+        self.config.set('Settings', 'midi_input_port', self.selected_midi_input_port or '')
+        self.config.set('Settings', 'library_path', self.library_path)
+        self.config.set('Settings', 'clock_sync', str(self.clock_sync_enabled.get()))
+        self.config.set('Settings', 'send_midi_clock', str(self.send_midi_clock.get()))
+        self.config.set('Settings', 'clock_beats_per_chord', str(self.clock_beats_per_chord))
+        self.config.set('Settings', 'midi_instrument', str(self.midi_instrument))
+        self.config.set('Settings', 'midi_instrument_name', self.midi_instrument_name)
+        self.config.set('Settings', 'pc_timbre', self.pc_timbre.get())
+        self.config.set('Settings', 'sample_library_path', self.sample_library_path)
+        self.config.set('Settings', 'reverb_enabled', str(self.reverb_enabled.get()))
+        self.config.set('Settings', 'latency_tracing', str(self.latency_tracing.get()))
+        self.config.set('Settings', 'show_hud', str(self.show_hud.get()))
+        self.config.set('Settings', 'profiling_counters', str(self.profiling_counters.get()))
+        self.config.set('Settings', 'profiler', self.profiler_mode.get())
+        self.config.set('Settings', 'reverb_mix', str(self.reverb_mix))
+        self.config.set('Settings', 'impulse_response_path', self.impulse_response_path)
+        self.config.set('Settings', 'eq_preset', self.eq_preset.get())
+        self.config.set('Settings', 'pc_volume', str(self.pc_volume.get()))
+        self.config.set('Settings', 'midi_volume', str(self.midi_volume.get()))
+        self.config.set('Settings', 'song_speed', str(self.song_speed.get()))
+        self.config.set('Settings', 'chord_speed', str(self.chord_speed.get()))
+        self.config.set('Settings', 'playback_octave', str(self.playback_octave.get()))
+        self.config.set('Settings', 'language', self.language_var.get())
+        self.config.set('Settings', 'prerender_lookahead', str(self.prerender_lookahead))
+        self.config.set('Settings', 'watch_song_file', str(self.watch_song_file.get()))
+        if self.help_window_rel_x is not None and self.help_window_rel_y is not None:
+            self.config.set('Settings', 'help_window_rel_x', str(self.help_window_rel_x))
+            self.config.set('Settings', 'help_window_rel_y', str(self.help_window_rel_y))
+        else:
+            if self.config.has_option('Settings', 'help_window_rel_x'):
+                self.config.remove_option('Settings', 'help_window_rel_x')
+            if self.config.has_option('Settings', 'help_window_rel_y'):
+                self.config.remove_option('Settings', 'help_window_rel_y')
+        with open('settings.ini', 'w') as configfile:
+            self.config.write(configfile)
+        counters.count('settings.writes')
+
+    def load_settings(self):
+        if os.path.exists('settings.ini'):
+            self.config.read('settings.ini')
+            # Load language setting
+            self.language_var = tk.StringVar(value=self.config.get('Settings', 'language', fallback='en'))
+            self.language_var.trace('w', self.change_language)
+            # Load help window position relative to main window
+            help_window_rel_x = self.config.get('Settings', 'help_window_rel_x', fallback=None)
+            help_window_rel_y = self.config.get('Settings', 'help_window_rel_y', fallback=None)
+
+            if help_window_rel_x and help_window_rel_x.strip() != '':
+                self.help_window_rel_x = int(help_window_rel_x)
+            else:
+                self.help_window_rel_x = None
+
+            if help_window_rel_y and help_window_rel_y.strip() != '':
+                self.help_window_rel_y = int(help_window_rel_y)
+            else:
+                self.help_window_rel_y = None
+        else:
+            # Create default settings if settings.ini does not exist
+            self.config['Settings'] = {
+                'number_of_octaves': '4',
+                'output_method': 'PC Audio',
+                'midi_port': '',
+                'midi_input_port': '',
+                'library_path': '',
+                'clock_sync': 'False',
+                'send_midi_clock': 'False',
+                'clock_beats_per_chord': '1',
+                'midi_instrument': '0',
+                'midi_instrument_name': 'Acoustic Grand Piano',
+                'pc_timbre': 'Sine',
+                'sample_library_path': '',
+                'reverb_enabled': 'False',
+                'latency_tracing': 'False',
+                'show_hud': 'False',
+                'profiling_counters': 'False',
+                'profiler': 'Off',
+                'reverb_mix': '0.3',
+                'impulse_response_path': '',
+                'eq_preset': 'Flat',
+                'pc_volume': '0.5',
+                'midi_volume': '64',
+                'song_speed': '10',  # Default to medium speed
+                'chord_speed': '0',
+                'playback_octave': '0',
+                'language': 'en',
+                'prerender_lookahead': '4',
+                'watch_song_file': 'False'
+            }
+            with open('settings.ini', 'w') as configfile:
+                self.config.write(configfile)
+            # Initialize help window positions
+            self.help_window_rel_x = None
+            self.help_window_rel_y = None
+
+    def recognize_chord(self):
+        selected_keys = [key for key in self.white_keys + self.black_keys if key.selected]
+        if not selected_keys:
+            # No keys selected
+            return
+
+        recognized_chord = recognize_chord_name([key.midi_note for key in selected_keys])
+        if recognized_chord:
+            self.chord_name_var.set(recognized_chord)
+            # Suppress pop-up message
+            # messagebox.showinfo("Chord Recognition", f"Recognized Chord: {recognized_chord}")
+        else:
+            # Suppress pop-up message
+            lang = self.language_var.get()
+            messagebox.showinfo(self.translations[lang]['chord_recognition_title'], self.translations[lang]['chord_not_recognized'])
+
+    def match_intervals_to_chord(self, intervals):
+        return match_intervals_to_chord(intervals)
+
+    def apply_chord_symbol(self, event=None):
+        # The reverse of recognize_chord: select the keys of the chord typed in the chord name field
+        text = self.chord_name_var.get().strip()
+        if not text:
+            return
+        try:
+            notes = chord_symbol_notes(text, 48, 48 + self.octaves * 12 - 1)
+        except ValueError:
+            # Several chords at once are entered as a progression
+            symbols = split_progression(text)
+            if len(symbols) > 1:
+                self.chord_name_var.set("")
+                self.enter_progression(text)
+            else:
+                self.message_label_var.set(f"{self.translations[self.language_var.get()]['unknown_chord']} '{text}'")
+            return
+        for key in self.white_keys + self.black_keys:
+            key.selected = key.midi_note in notes
+            self.input_canvas.itemconfig(key.rect, fill="blue" if key.selected else key.original_color)
+        self.message_label_var.set("")
+        self.update_button_states()
+
+    def enter_progression(self, text=None):
+        if text is None:
+            lang = self.language_var.get()
+            text = simpledialog.askstring(self.translations[lang]['enter_progression'],
+                                          "Chords, e.g. C Am F G or Dm7 | G7 | Cmaj7:", parent=self.root)
+            if not text:
+                return
+        symbols = split_progression(text)
+        highest = 48 + self.octaves * 12 - 1
+        try:
+            chords = [(symbol, chord_symbol_notes(symbol, 48, highest)) for symbol in symbols]
+        except ValueError as e:
+            messagebox.showerror("Error", f"An error occurred while reading the progression:\n{e}")
+            return
+        all_notes = keyboard_midi_notes(self.octaves)
+        # All chords are added first, and the scroll region and view are updated once at the end
+        operations = []
+        for symbol, notes in chords:
+            key_states = [note in notes for note in all_notes]
+            operations.append((EditHistory.INSERT, len(self.saved_keyboards), EditHistory.mask(key_states),
+                               len(key_states), symbol, ''))
+            self.add_saved_keyboard(symbol, key_states)
+        self.history.record(operations)
+        self.saved_keyboards_frame.canvas.update_idletasks()
+        self.saved_keyboards_frame.canvas.configure(scrollregion=self.saved_keyboards_frame.canvas.bbox('all'))
+        self.saved_keyboards_frame.canvas.yview_moveto(1.0)
+        self.unsaved_changes = True
+
+    def change_language(self, *args):
+        lang = self.language_var.get()
+
+        # Update window title
+        self.root.title(self.translations[lang]['title'])
+
+        # Update labels
+        self.octave_label.config(text=f"{self.translations[lang]['number_of_octaves']}: {self.octaves}")
+        self.song_name_label.config(text=self.translations[lang]['song_name'])
+
+        # Update buttons
+        if self.currently_editing_keyboard:
+            self.next_chord_button.config(text=self.translations[lang]['save_chord'])
+        else:
+            self.next_chord_button.config(text=self.translations[lang]['next_chord'])
+        self.play_chord_button.config(text=self.translations[lang]['play_chord'])
+        self.clear_chord_button.config(text=self.translations[lang]['clear_chord'])
+        self.delete_chord_button.config(text=self.translations[lang]['delete_chord'])
+        self.play_song_button.config(text=self.translations[lang]['play_song'] if not self.is_playing_song else self.translations[lang]['stop_song'])
+        self.mute_button.config(text=self.translations[lang]['mute_input'] if not self.is_muted else self.translations[lang]['unmute_input'])
+        self.what_chord_button.config(text=self.translations[lang]['what_chord'])
+
+        # Update volume and speed labels
+        self.pc_volume_label.config(text=self.translations[lang]['pc_volume'])
+        self.midi_volume_label.config(text=self.translations[lang]['midi_volume'])
+        self.chord_speed_label.config(text=self.translations[lang]['chord_speed'])
+        self.song_speed_label.config(text=self.translations[lang]['song_speed'])
+
+        # Update message labels
+        self.message_label_var.set("")
+        self.playback_status_var.set("")
+
+        # Update menu labels by recreating the menu
+        self.create_menu()
+
+        # Save the selected language to settings
+        self.save_settings()
+
+
+# Common chord types and their intervals
+CHORD_TYPES = {
+    'Major': [0, 4, 7],
+    'Minor': [0, 3, 7],
+    'Diminished': [0, 3, 6],
+    'Augmented': [0, 4, 8],
+    'Major Seventh': [0, 4, 7, 11],
+    'Minor Seventh': [0, 3, 7, 10],
+    'Dominant Seventh': [0, 4, 7, 10],
+    'Suspended 2nd': [0, 2, 7],
+    'Suspended 4th': [0, 5, 7],
+    'Major Sixth': [0, 4, 7, 9],
+    'Minor Sixth': [0, 3, 7, 9],
+    'Ninth': [0, 4, 7, 10, 14],
+    'Minor Ninth': [0, 3, 7, 10, 14],
+    'Eleventh': [0, 4, 7, 10, 14, 17],
+    'Minor Eleventh': [0, 3, 7, 10, 14, 17],
+    'Thirteenth': [0, 4, 7, 10, 14, 17, 21],
+    'Minor Thirteenth': [0, 3, 7, 10, 14, 17, 21],
+    'Augmented Seventh': [0, 4, 8, 10],
+    'Diminished Seventh': [0, 3, 6, 9],
+    'Half-Diminished Seventh': [0, 3, 6, 10]
+}
+
+NOTE_NAMES_SHARP = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+
+
+def match_intervals_to_chord(intervals):
+    for chord_type, chord_intervals in CHORD_TYPES.items():
+        if chord_intervals == intervals:
+            return chord_type
+        # Check for subset match (e.g., if user plays only root and third)
+        elif set(intervals).issubset(chord_intervals):
+            return chord_type
+    return None
+
+
+# Function to name the chord formed by a set of MIDI notes, or None if it is not recognized
+def recognize_chord_name(midi_notes):
+    # Normalize to one octave (0-11) and remove duplicates
+    pitch_classes = sorted(set(note % 12 for note in midi_notes))
+
+    # Try all possible roots; the first match is the most likely chord
+    for root in pitch_classes:
+        intervals = sorted((note - root) % 12 for note in pitch_classes)
+        chord_type = match_intervals_to_chord(intervals)
+        if chord_type:
+            return f"{NOTE_NAMES_SHARP[root]} {chord_type}"
+    return None
+
+
+# Spellings of the twelve roots in chord symbols
+ROOT_SPELLINGS = {
+    'C': 0, 'B#': 0, 'C#': 1, 'Db': 1, 'D': 2, 'D#': 3, 'Eb': 3, 'E': 4, 'Fb': 4, 'E#': 5, 'F': 5,
+    'F#': 6, 'Gb': 6, 'G': 7, 'G#': 8, 'Ab': 8, 'A': 9, 'A#': 10, 'Bb': 10, 'B': 11, 'Cb': 11,
+}
+
+# Chord symbol qualities and their intervals above the root; several spellings share one chord
+SYMBOL_QUALITIES = {
+    ('', 'maj', 'M'): [0, 4, 7],
+    ('m', 'min', '-'): [0, 3, 7],
+    ('dim', '°', 'o'): [0, 3, 6],
+    ('aug', '+'): [0, 4, 8],
+    ('5',): [0, 7],
+    ('6', 'maj6'): [0, 4, 7, 9],
+    ('m6', 'min6'): [0, 3, 7, 9],
+    ('7', 'dom7'): [0, 4, 7, 10],
+    ('maj7', 'M7', 'Δ', 'Δ7', 'ma7'): [0, 4, 7, 11],
+    ('m7', 'min7', '-7'): [0, 3, 7, 10],
+    ('mMaj7', 'mmaj7', 'm(maj7)', 'mM7'): [0, 3, 7, 11],
+    ('m7b5', 'ø', 'ø7', 'min7b5', '-7b5'): [0, 3, 6, 10],
+    ('dim7', '°7', 'o7'): [0, 3, 6, 9],
+    ('aug7', '+7', '7#5'): [0, 4, 8, 10],
+    ('7b5',): [0, 4, 6, 10],
+    ('sus2',): [0, 2, 7],
+    ('sus4', 'sus'): [0, 5, 7],
+    ('7sus4', '7sus'): [0, 5, 7, 10],
+    ('add9', 'add2'): [0, 4, 7, 14],
+    ('madd9',): [0, 3, 7, 14],
+    ('6/9', '69'): [0, 4, 7, 9, 14],
+    ('9',): [0, 4, 7, 10, 14],
+    ('maj9', 'M9'): [0, 4, 7, 11, 14],
+    ('m9', 'min9'): [0, 3, 7, 10, 14],
+    ('7b9',): [0, 4, 7, 10, 13],
+    ('7#9',): [0, 4, 7, 10, 15],
+    ('11',): [0, 4, 7, 10, 14, 17],
+    ('m11', 'min11'): [0, 3, 7, 10, 14, 17],
+    ('13',): [0, 4, 7, 10, 14, 17, 21],
+    ('m13', 'min13'): [0, 3, 7, 10, 14, 17, 21],
+}
+
+
+# Function to build the lookup table of every root and quality: symbol -> (root pitch class, intervals).
+# Names as written by recognize_chord_name, e.g. "F# Minor Seventh", are included.
+def build_chord_symbol_table():
+    table = {}
+    for root_name, root in ROOT_SPELLINGS.items():
+        for spellings, intervals in SYMBOL_QUALITIES.items():
+            for spelling in spellings:
+                table[root_name + spelling] = (root, tuple(intervals))
+        for chord_type, intervals in CHORD_TYPES.items():
+            table[f"{root_name} {chord_type}"] = (root, tuple(intervals))
+    return table
+
+
+CHORD_SYMBOL_TABLE = build_chord_symbol_table()
+
+
+# Function to read a chord symbol such as "F#m7b5", "Bbmaj7", "C/E" or "A Minor" into
+# (root pitch class, intervals, bass pitch class or None)
+def parse_chord_symbol(symbol):
+    symbol = symbol.strip()
+    chord = CHORD_SYMBOL_TABLE.get(symbol)
+    if chord:
+        return chord[0], chord[1], None
+    # Slash chords: a chord over a bass note ("6/9" is a quality, so that is looked up first)
+    chord_symbol, _, bass_name = symbol.rpartition('/')
+    if chord_symbol in CHORD_SYMBOL_TABLE and bass_name in ROOT_SPELLINGS:
+        root, intervals = CHORD_SYMBOL_TABLE[chord_symbol]
+        return root, intervals, ROOT_SPELLINGS[bass_name]
+    raise ValueError(f"Unknown chord '{symbol}'.")
+
+
+# Function to voice a chord symbol as MIDI notes: root position from the lowest octave of the range,
+# with a slash bass below it; notes that do not fit are folded back into the range
+def chord_symbol_notes(symbol, lowest=48, highest=95):
+    root, intervals, bass = parse_chord_symbol(symbol)
+    root_note = lowest + (root - lowest) % 12
+    notes = [root_note + interval for interval in intervals]
+    if bass is not None and bass != root:
+        bass_note = root_note - (root - bass) % 12
+        if bass_note < lowest:
+            bass_note += 12
+            notes = [note + 12 for note in notes]
+        notes = [bass_note] + [note for note in notes if note % 12 != bass]
+    folded = set()
+    for note in notes:
+        while note > highest:
+            note -= 12
+        folded.add(note)
+    return sorted(folded)
+
+
+# Function to split a progression such as "C Am F G", "C | Am | F" or "C Major, A Minor" into chord symbols
+def split_progression(text):
+    if ',' in text or '|' in text:
+        return [symbol.strip() for symbol in re.split(r'[,|]', text) if symbol.strip()]
+    return text.split()
+
+
+# Version of the interned song format written by intern_song
+SONG_FORMAT_VERSION = 2
+
+
+# Function to list the chords of a song in order, from the interned format or a plain 'saved_keyboards' list
+def song_keyboards(song_data):
+    if "chords" not in song_data:
+        return song_data.get("saved_keyboards", [])
+    if song_data.get("format", SONG_FORMAT_VERSION) > SONG_FORMAT_VERSION:
+        raise ValueError("The song was saved by a newer version of Pianoman.")
+    chords = song_data["chords"]
+    sequence = song_data.get("sequence", [])
+    if "form" in song_data:
+        sections = song_data["sections"]
+        sequence = [index for section in song_data["form"]
+                    for index in sequence[sections[section]["start"]:sections[section]["end"]]]
+    # Repeated chords are the same objects from the chord table
+    return [chords[index] for index in sequence]
+
+
+# Function to find repeated phrases in a chord index sequence, as sections and the order they are played in
+def find_sections(sequence, phrase_lengths=(8, 4)):
+    best = None
+    for length in phrase_lengths:
+        phrases = [tuple(sequence[i:i + length]) for i in range(0, len(sequence), length)]
+        unique_phrases = list(dict.fromkeys(phrases))
+        # Stored size: the unique phrases plus one form entry per phrase
+        size = sum(len(phrase) for phrase in unique_phrases) + len(phrases)
+        if size < len(sequence) and (best is None or size < best[0]):
+            best = (size, phrases, unique_phrases)
+    if best is None:
+        return None  # Nothing repeats often enough to be worth sections
+    _, phrases, unique_phrases = best
+    condensed, sections = [], []
+    for number, phrase in enumerate(unique_phrases):
+        sections.append({"name": chr(ord('A') + number) if number < 26 else f"S{number + 1}",
+                         "start": len(condensed), "end": len(condensed) + len(phrase)})
+        condensed.extend(phrase)
+    section_numbers = {phrase: number for number, phrase in enumerate(unique_phrases)}
+    return condensed, sections, [section_numbers[phrase] for phrase in phrases]
+
+
+# Function to convert a song to the interned format: a table of unique chords plus index sequence and sections
+def intern_song(song_data):
+    chords, chord_numbers, sequence = [], {}, []
+    for keyboard_data in song_keyboards(song_data):
+        chord = (keyboard_data["chord_name"], tuple(keyboard_data["key_states"]))
+        if chord not in chord_numbers:
+            chord_numbers[chord] = len(chords)
+            chords.append({"chord_name": chord[0], "key_states": list(chord[1])})
+        sequence.append(chord_numbers[chord])
+    interned = {key: value for key, value in song_data.items()
+                if key not in ("saved_keyboards", "chords", "sequence", "sections", "form")}
+    interned["format"] = SONG_FORMAT_VERSION
+    interned["chords"] = chords
+    sections = find_sections(sequence)
+    if sections:
+        interned["sections"], interned["form"] = sections[1:]
+        interned["sequence"] = sections[0]
+    else:
+        interned["sequence"] = sequence
+    return interned
+
+
+class JsonStreamReader:
+    """Reads JSON from a text file piece by piece, keeping only a sliding window of the text in memory.
+
+    Values are decoded with JSONDecoder.raw_decode on the window; when a value runs past the end of
+    the window, the next chunk is read and decoding is retried.
+    """
+
+    WHITESPACE = ' \t\r\n'
+
+    def __init__(self, f, chunk_size=1 << 16):
+        self.file = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        # Drop the text that has been read and append the next chunk; False at the end of the file
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        self.eof = not chunk
+        return not self.eof
+
+    def peek(self):
+        # The next character that is not whitespace, or '' at the end of the file
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in self.WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._fill():
+                return ''
+
+    def expect(self, characters):
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f"Expected one of {characters!r} in the song file, found {character!r}.")
+        self.position += 1
+        return character
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the end of the window may continue in the next chunk
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.position = end
+            return value
+
+    def items(self):
+        # The values of the array that starts here, one at a time
+        self.expect('[')
+        if self.peek() == ']':
+            self.position += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(',]') == ']':
+                return
+
+
+# Function to read a song file incrementally, in either format: yields ('field', name, value) for the song
+# settings and ('chord', chord data) for each chord in order. Chords of a plain 'saved_keyboards' list are
+# yielded as soon as they have been read; the interned format is expanded at the end of the file, since its
+# keys may come in any order and the sequence only has meaning together with the sections and form.
+def iter_song_file(file_path, chunk_size=1 << 16):
+    with open(file_path, 'r') as f:
+        reader = JsonStreamReader(f, chunk_size)
+        reader.expect('{')
+        if reader.peek() == '}':
+            return
+        interned = {}
+        while True:
+            name = reader.value()
+            reader.expect(':')
+            if name == "saved_keyboards":
+                for keyboard_data in reader.items():
+                    yield 'chord', keyboard_data
+            elif name in ("chords", "sequence"):
+                interned[name] = list(reader.items())
+            else:
+                value = reader.value()
+                if name in ("sections", "form"):
+                    interned[name] = value
+                elif name == "format":
+                    if value > SONG_FORMAT_VERSION:
+                        raise ValueError("The song was saved by a newer version of Pianoman.")
+                    interned[name] = value
+                else:
+                    yield 'field', name, value
+            if reader.expect(',}') == '}':
+                break
+        if "chords" in interned:
+            for keyboard_data in song_keyboards(interned):
+                yield 'chord', keyboard_data
+
+
+# Function to write a song file in the interned format
+def write_song_file(song_data, file_path):
+    with open(file_path, 'w') as f:
+        json.dump(intern_song(song_data), f, separators=(',', ':'))
+
+
+# Function to draw a song as a PDF chord sheet (file_path may also be a binary file object)
+def render_song_pdf(song_data, file_path, song_title=None):
+    if song_title is None:
+        song_title = song_data.get("song_name") or "Untitled"
+    c = pdf_canvas.Canvas(file_path, pagesize=A4)
+    draw_song_pages(c, song_data, song_title)
+    counters.count('pdf.pages', c.getPageNumber())  # Every page started has the title on it
+    c.save()
+
+
+# Function to draw the chord sheet pages of a song on a PDF canvas (or a PdfDisplayList), leaving the last page open
+def draw_song_pages(c, song_data, song_title):
+    octaves = song_data.get("number_of_octaves", 4)
+    saved_keyboards = song_keyboards(song_data)
+    # key_states lists the white keys of all octaves first, then the black keys
+    black_key_flags = [False] * (octaves * 7) + [True] * (octaves * 5)
+
+    page_width, page_height = A4
+    margin = 50
+
+    # Add title
+    c.setFont("Helvetica-Bold", 16)
+    c.drawCentredString(page_width / 2, page_height - margin, song_title)
+
+    # Calculate keyboard dimensions
+    keyboard_width = page_width / 2 - margin * 1.5
+    keyboard_height = 50
+    white_key_width = keyboard_width / (octaves * 7)
+    black_key_width = white_key_width * 0.6
+    black_key_height = keyboard_height * 0.6
+
+    x_position = margin
+    y_position = page_height - margin - 50 - keyboard_height
+    keyboards_in_row = 0
+    keyboards_per_row = 2
+    keyboards_in_page = 0
+    keyboards_per_page = 8
+    current_page = 1
+    total_keyboards = len(saved_keyboards)
+    total_pages = (total_keyboards - 1) // keyboards_per_page + 1
+
+    forms = {}  # Chord -> name of the PDF form that draws it, so a repeated chord is drawn only once
+    for idx, keyboard_data in enumerate(saved_keyboards, start=1):
+        chord = (keyboard_data["chord_name"], tuple(keyboard_data["key_states"]))
+        form_name = forms.get(chord)
+        if form_name is None:
+            form_name = forms[chord] = f"chord{len(forms)}"
+            # The form's box is wide enough for long chord names
+            c.beginForm(form_name, 0, 0, page_width, keyboard_height + 30)
+
+            # Draw chord name
+            c.setFont("Helvetica", 12)
+            c.drawString(0, keyboard_height + 10, keyboard_data["chord_name"])
+
+            # Draw keyboard
+            key_states = keyboard_data["key_states"]
+
+            # Draw white keys
+            for i, is_black in enumerate(black_key_flags):
+                if not is_black:
+                    x = i * white_key_width
+                    c.rect(x, 0, white_key_width, keyboard_height, stroke=1, fill=0)
+                    if key_states[i]:
+                        c.setFillColorRGB(0, 0, 1)  # Blue color
+                        c.rect(x, 0, white_key_width, keyboard_height, stroke=0, fill=1)
+                        c.setFillColorRGB(0, 0, 0)  # Reset to black
+
+            # Draw black keys
+            for i, is_black in enumerate(black_key_flags):
+                if is_black:
+                    x = (i - 0.5) * white_key_width
+                    y = keyboard_height - black_key_height
+                    c.rect(x, y, black_key_width, black_key_height, stroke=1, fill=1)
+                    if key_states[i]:
+                        c.setFillColorRGB(0, 0, 1)  # Blue color
+                        c.rect(x, y, black_key_width, black_key_height, stroke=0, fill=1)
+                        c.setFillColorRGB(0, 0, 0)  # Reset to black
+            c.endForm()
+
+        c.saveState()
+        c.translate(x_position, y_position)
+        c.doForm(form_name)
+        c.restoreState()
+
+        # Update positions
+        keyboards_in_row += 1
+        keyboards_in_page += 1
+        if keyboards_in_row >= keyboards_per_row:
+            x_position = margin
+            y_position -= keyboard_height + 70  # Adjust spacing
+            keyboards_in_row = 0
+        else:
+            x_position += keyboard_width + margin
+
+        if keyboards_in_page >= keyboards_per_page or y_position < margin:
+            # Start a new page
+            c.showPage()
+            current_page += 1
+            keyboards_in_page = 0
+            x_position = margin
+            y_position = page_height - margin - 50 - keyboard_height
+            keyboards_in_row = 0
+
+            # Add title again
+            c.setFont("Helvetica-Bold", 16)
+            c.drawCentredString(page_width / 2, page_height - margin, song_title)
+
+        if idx == total_keyboards or keyboards_in_page == keyboards_per_page:
+            # Add page numbering
+            c.setFont("Helvetica", 10)
+            c.drawCentredString(page_width / 2, margin / 2, f"Page {current_page} of {total_pages}")
+
+
+class PdfDisplayList:
+    """Stands in for a reportlab canvas, recording the drawing calls of draw_song_pages page by page.
+
+    Pages drawn in a worker process can be sent back, cached as JSON and replayed into the canvas of
+    another document.
+    """
+
+    RECORDED = {'setFont', 'drawString', 'drawCentredString', 'rect', 'setFillColorRGB', 'beginForm', 'endForm',
+                'saveState', 'translate', 'doForm', 'restoreState'}
+
+    def __init__(self):
+        self.pages = [[]]
+
+    def __getattr__(self, name):
+        if name not in self.RECORDED:
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self.pages[-1].append((name, args, kwargs))
+
+    def showPage(self):
+        self.pages.append([])
+
+    def getPageNumber(self):
+        return len(self.pages)
+
+
+# Function to replay recorded pages into a canvas; the form names get a prefix, so several songs can share a document
+def replay_pdf_pages(c, pages, form_prefix=''):
+    for page in pages:
+        for name, args, kwargs in page:
+            if name in ('beginForm', 'doForm'):
+                args = [form_prefix + args[0], *args[1:]]
+            getattr(c, name)(*args, **kwargs)
+        c.showPage()
+
+
+# Version of the cached songbook pages; change it when draw_song_pages draws differently
+SONGBOOK_CACHE_VERSION = 1
+
+
+# Process pool job: draw the pages of one song of a songbook as a display list
+def songbook_pages_job(song_data, song_title):
+    display_list = PdfDisplayList()
+    draw_song_pages(display_list, song_data, song_title)
+    return display_list.pages
+
+
+# Function to read a songbook document: its name and the paths of its song files
+def load_songbook(songbook_path):
+    with open(songbook_path, 'r') as f:
+        songbook = json.load(f)
+    if not isinstance(songbook, dict) or not isinstance(songbook.get("songs"), list):
+        raise ValueError("A songbook needs a 'songs' list of song files.")
+    # Song paths are relative to the songbook file
+    directory = os.path.dirname(os.path.abspath(songbook_path))
+    song_files = [os.path.normpath(os.path.join(directory, song_file)) for song_file in songbook["songs"]]
+    songbook_name = songbook.get("songbook_name") or os.path.splitext(os.path.basename(songbook_path))[0]
+    return songbook_name, song_files
+
+
+# Function to write a songbook document that references song files
+def write_songbook(songbook_path, song_files, songbook_name=None):
+    directory = os.path.dirname(os.path.abspath(songbook_path))
+    songs = []
+    for song_file in song_files:
+        try:
+            songs.append(os.path.relpath(song_file, directory).replace(os.sep, '/'))
+        except ValueError:
+            songs.append(os.path.abspath(song_file))  # On another drive (Windows)
+    with open(songbook_path, 'w') as f:
+        json.dump({"songbook_name": songbook_name or os.path.splitext(os.path.basename(songbook_path))[0],
+                   "songs": songs}, f, indent=2)
+
+
+# Function to compile a songbook into one PDF with a linked table of contents. The pages of each song are drawn
+# in worker processes as display lists, which are cached next to the songbook and reused while a song is unchanged.
+def build_songbook_pdf(songbook_path, pdf_path, workers=None):
+    songbook_name, song_files = load_songbook(songbook_path)
+    # One cache per songbook, so songbooks in the same folder do not prune each other's pages
+    cache_directory = os.path.join(os.path.dirname(os.path.abspath(songbook_path)), '.songbook-cache',
+                                   os.path.splitext(os.path.basename(songbook_path))[0])
+    os.makedirs(cache_directory, exist_ok=True)
+
+    songs = []  # [title, cache file, pages]
+    for song_file in song_files:
+        with open(song_file, 'r') as f:
+            song_data = json.load(f)
+        song_title = song_data.get("song_name") or os.path.splitext(os.path.basename(song_file))[0]
+        key = song_content_hash({'song': song_data, 'title': song_title, 'version': SONGBOOK_CACHE_VERSION})
+        cache_file = os.path.join(cache_directory, key[:24] + '.json')
+        pages = None
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r') as f:
+                    pages = json.load(f)
+            except (OSError, ValueError):
+                pages = None  # Damaged cache file: draw the song again
+        songs.append([song_title, cache_file, pages, song_data])
+
+    missing = [song for song in songs if song[2] is None]
+    if missing:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(songbook_pages_job, song[3], song[0]) for song in missing]
+            for song, future in zip(missing, futures):
+                song[2] = future.result()
+                with open(song[1], 'w') as f:
+                    json.dump(song[2], f, separators=(',', ':'))
+
+    # Songs no longer in the songbook (or changed since) leave their cached pages behind
+    used = {os.path.basename(song[1]) for song in songs}
+    for file_name in os.listdir(cache_directory):
+        if file_name.endswith('.json') and file_name not in used:
+            os.remove(os.path.join(cache_directory, file_name))
+
+    c = pdf_canvas.Canvas(pdf_path, pagesize=A4)
+    c.setTitle(songbook_name)
+    page_width, page_height = A4
+    margin = 50
+    entries_per_page = 30
+    toc_pages = max(1, -(-len(songs) // entries_per_page))
+
+    # Table of contents, with each line linked to the first page of its song
+    first_page = toc_pages + 1
+    for number, (song_title, _, pages, _) in enumerate(songs):
+        if number % entries_per_page == 0:
+            if number:
+                c.showPage()
+            c.setFont("Helvetica-Bold", 16)
+            c.drawCentredString(page_width / 2, page_height - margin, songbook_name)
+            c.setFont("Helvetica-Bold", 12)
+            c.drawString(margin, page_height - margin - 30, "Contents")
+            if number == 0:
+                c.bookmarkPage("contents")
+                c.addOutlineEntry("Contents", "contents", level=0)
+        y = page_height - margin - 55 - (number % entries_per_page) * 22
+        c.setFont("Helvetica", 12)
+        c.drawString(margin, y, f"{number + 1}. {song_title}")
+        c.drawRightString(page_width - margin, y, str(first_page))
+        c.linkRect("", f"song{number}", (margin, y - 4, page_width - margin, y + 12), thickness=0)
+        first_page += len(pages)
+    if not songs:
+        c.setFont("Helvetica-Bold", 16)
+        c.drawCentredString(page_width / 2, page_height - margin, songbook_name)
+    c.showPage()
+
+    # The songs, in order
+    for number, (song_title, _, pages, _) in enumerate(songs):
+        c.bookmarkPage(f"song{number}")
+        c.addOutlineEntry(song_title, f"song{number}", level=0)
+        replay_pdf_pages(c, pages, form_prefix=f"song{number}_")
+    c.showOutline()
+    c.save()
+
+    total_pages = toc_pages + sum(len(song[2]) for song in songs)
+    counters.count('pdf.pages', total_pages)
+    return {'songs': len(songs), 'pages': total_pages, 'rendered': len(missing), 'cached': len(songs) - len(missing)}
+
+
+# Size of the single-cycle wavetables used by the PC audio synthesizer
+WAVETABLE_SIZE = 2048
+
+# Fixed gain per voice, so a chord gets louder with more notes instead of being normalized to its peak
+VOICE_GAIN = 0.3
+
+# PC audio timbres: relative amplitudes of the harmonics and the ADSR envelope
+# (attack, decay and release in seconds, sustain as a level between 0 and 1)
+TIMBRES = {
+    "Sine": ([1.0], (0.005, 0.05, 0.9, 0.05)),
+    "Electric Piano": ([1.0, 0.45, 0.2, 0.1, 0.05, 0.02], (0.002, 0.3, 0.4, 0.2)),
+    "Organ": ([1.0, 0.8, 0.0, 0.6, 0.0, 0.4, 0.0, 0.3], (0.01, 0.01, 1.0, 0.05)),
+    "Soft Square": ([1.0 / n if n % 2 else 0.0 for n in range(1, 16)], (0.01, 0.1, 0.7, 0.1)),
+    "Bright Saw": ([1.0 / n for n in range(1, 17)], (0.005, 0.2, 0.6, 0.15)),
+}
+
+
+def build_wavetable(harmonics, size=WAVETABLE_SIZE):
+    # Sum the harmonics into one cycle, normalized to a peak of 1, with a guard sample for interpolation
+    phase = np.arange(size + 1) * 2 * np.pi / size
+    table = sum(amplitude * np.sin((n + 1) * phase) for n, amplitude in enumerate(harmonics))
+    return table / np.max(np.abs(table))
+
+
+# Precomputed wavetables for all timbres
+WAVETABLES = {timbre: build_wavetable(harmonics) for timbre, (harmonics, _) in TIMBRES.items()}
+
+
+def adsr_envelope(note_length, attack, decay, sustain, release, fs=44100):
+    # Envelope for a note held for note_length samples, followed by its release
+    attack_length = max(1, int(attack * fs))
+    decay_length = max(1, int(decay * fs))
+    release_length = max(1, int(release * fs))
+    n = np.arange(note_length + release_length)
+    held = np.minimum(n, note_length)
+    envelope = np.where(held < attack_length, held / attack_length,
+                        np.maximum(sustain, 1 - (1 - sustain) * (held - attack_length) / decay_length))
+    # Fade out from the level reached at note off
+    return envelope * np.clip(1 - (n - note_length) / release_length, 0, 1)
+
+
+def synthesize_voices(frequencies, duration=0.5, timbre="Sine", onsets=None, fs=44100):
+    with counters.timed('synth'):
+        return _synthesize_voices(frequencies, duration, timbre, onsets, fs)
+
+
+def _synthesize_voices(frequencies, duration, timbre, onsets, fs):
+    if timbre == SAMPLED_PIANO_TIMBRE and sample_library is not None:
+        return sample_library.render(frequencies, duration, onsets, fs)
+    # Render all voices in a single vectorized pass: one phase-accumulator oscillator per row
+    table = WAVETABLES.get(timbre, WAVETABLES["Sine"])
+    _, (attack, decay, sustain, release) = TIMBRES.get(timbre, TIMBRES["Sine"])
+    envelope = adsr_envelope(int(fs * duration), attack, decay, sustain, release, fs)
+    increments = np.asarray(frequencies, dtype=float)[:, None] * (WAVETABLE_SIZE / fs)
+    phase = (np.arange(len(envelope))[None, :] * increments) % WAVETABLE_SIZE
+    index = phase.astype(np.int64)
+    # Linear interpolation between neighbouring table samples
+    voices = table[index] + (table[index + 1] - table[index]) * (phase - index)
+    voices *= envelope * VOICE_GAIN
+    if onsets is None:
+        return voices.sum(axis=0)
+    # Place each voice at its own start sample (arpeggios)
+    audio = np.zeros(max(onsets) + len(envelope))
+    for onset, voice in zip(onsets, voices):
+        audio[onset:onset + len(voice)] += voice
+    return audio
+
+
+def read_wav_header(file_path):
+    # Parse the RIFF chunks of a PCM WAV file without reading the sample data
+    with open(file_path, 'rb') as f:
+        riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise ValueError(f"'{file_path}' is not a WAV file.")
+        header = {}
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                raise ValueError(f"'{file_path}' has no audio data.")
+            chunk_id, chunk_size = struct.unpack('<4sI', chunk)
+            if chunk_id == b'fmt ':
+                audio_format, channels, sample_rate, _, _, bits = struct.unpack('<HHIIHH', f.read(16))
+                header.update(audio_format=audio_format, channels=channels, sample_rate=sample_rate, bits=bits)
+                f.seek(chunk_size - 16 + chunk_size % 2, os.SEEK_CUR)
+            elif chunk_id == b'data':
+                if 'bits' not in header:
+                    raise ValueError(f"'{file_path}' has no format chunk.")
+                header.update(data_offset=f.tell(), data_size=chunk_size)
+                return header
+            else:
+                # Chunks are padded to an even size
+                f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+
+# Name of the timbre that plays the loaded sample library
+SAMPLED_PIANO_TIMBRE = "Sampled Piano"
+
+
+class SampleLibrary:
+    """Multisample piano library played from local WAV files through memory maps."""
+
+    def __init__(self, directory, cache_size=64, release=0.1):
+        self.directory = directory
+        self.cache_size = cache_size
+        self.release = release
+        # Only the WAV headers are read here; sample data is paged in on demand
+        self.samples = {}
+        for file_name in sorted(os.listdir(directory)):
+            midi_note = self.note_from_file_name(file_name)
+            if midi_note is None:
+                continue
+            file_path = os.path.join(directory, file_name)
+            try:
+                header = read_wav_header(file_path)
+            except (OSError, ValueError, struct.error):
+                continue
+            if header['audio_format'] == 1 and header['bits'] == 16:
+                self.samples[midi_note] = (file_path, header)
+        if not self.samples:
+            raise ValueError(f"No 16-bit PCM WAV samples found in '{directory}'.")
+        self.sampled_notes = np.array(sorted(self.samples))
+        self.memmaps = {}
+        # Pitched buffers for notes between the samples, least recently used first
+        self.resampled = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def note_from_file_name(file_name):
+        # Accept names such as "60.wav", "piano_C4.wav" or "F#3.wav" (C4 = MIDI note 60)
+        stem, extension = os.path.splitext(file_name)
+        if extension.lower() != '.wav':
+            return None
+        if stem.isdigit():
+            return int(stem)
+        matches = re.findall(r'(?<![A-Za-z])([A-Ga-g])(#|b|s)?(-?\d)(?!\d)', stem)
+        if not matches:
+            return None
+        letter, accidental, octave = matches[-1]
+        semitone = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11}[letter.upper()]
+        semitone += {'#': 1, 's': 1, 'b': -1}.get(accidental, 0)
+        return (int(octave) + 1) * 12 + semitone
+
+    def _sample_data(self, sampled_note):
+        # Memory-map a sample on first use and return its first channel as a view
+        data = self.memmaps.get(sampled_note)
+        if data is None:
+            file_path, header = self.samples[sampled_note]
+            frames = header['data_size'] // (2 * header['channels'])
+            data = np.memmap(file_path, dtype='<i2', mode='r', offset=header['data_offset'],
+                             shape=(frames, header['channels']))[:, 0]
+            self.memmaps[sampled_note] = data
+        return data
+
+    def voice(self, midi_note, length, fs=44100):
+        # Samples for a note: a view of the memory map if the note was sampled at the output rate,
+        # otherwise a cached buffer pitched from the nearest sample
+        sampled_note = int(self.sampled_notes[np.argmin(np.abs(self.sampled_notes - midi_note))])
+        data = self._sample_data(sampled_note)
+        ratio = 2 ** ((midi_note - sampled_note) / 12) * self.samples[sampled_note][1]['sample_rate'] / fs
+        if ratio == 1:
+            return data[:length]
+        key = (midi_note, fs)
+        with self.lock:
+            cached = self.resampled.get(key)
+            if cached is not None and len(cached) >= min(length, int((len(data) - 1) / ratio)):
+                self.resampled.move_to_end(key)
+                counters.count('sample_cache.hits')
+                return cached[:length]
+        counters.count('sample_cache.misses')
+        positions = np.arange(length) * ratio
+        positions = positions[positions < len(data) - 1]
+        index = positions.astype(np.int64)
+        fraction = positions - index
+        # Linear interpolation only touches the pages of the sample that are needed
+        buffer = (data[index] * (1 - fraction) + data[index + 1] * fraction).astype(np.float32)
+        with self.lock:
+            self.resampled[key] = buffer
+            while len(self.resampled) > self.cache_size:
+                self.resampled.popitem(last=False)
+        return buffer
+
+    def render(self, frequencies, duration=0.5, onsets=None, fs=44100):
+        # Mix the voices into one float buffer with the same fixed per-voice gain as the synthesizer
+        note_length = int(fs * duration)
+        release_length = max(1, int(self.release * fs))
+        envelope = np.concatenate([np.ones(note_length), np.linspace(1, 0, release_length, False)])
+        envelope *= VOICE_GAIN / 2 ** 15
+        if onsets is None:
+            onsets = [0] * len(frequencies)
+        audio = np.zeros(max(onsets) + len(envelope))
+        for frequency, onset in zip(frequencies, onsets):
+            midi_note = int(round(69 + 12 * np.log2(frequency / 440)))
+            voice = self.voice(midi_note, len(envelope), fs)
+            audio[onset:onset + len(voice)] += voice * envelope[:len(voice)]
+        return audio
+
+
+# Sample library used by the "Sampled Piano" timbre (None until one is loaded)
+sample_library = None
+
+
+def load_sample_library(directory):
+    global sample_library
+    sample_library = SampleLibrary(directory)
+    return sample_library
+
+
+def load_wav_mono(file_path, fs=44100):
+    # Read a 16-bit PCM WAV file as mono floats in [-1, 1], resampled to fs
+    header = read_wav_header(file_path)
+    if header['audio_format'] != 1 or header['bits'] != 16:
+        raise ValueError(f"'{file_path}' is not a 16-bit PCM WAV file.")
+    frames = header['data_size'] // (2 * header['channels'])
+    data = np.memmap(file_path, dtype='<i2', mode='r', offset=header['data_offset'],
+                     shape=(frames, header['channels']))
+    audio = data.mean(axis=1) / 2 ** 15
+    if header['sample_rate'] != fs:
+        positions = np.arange(int(frames * fs / header['sample_rate'])) * header['sample_rate'] / fs
+        audio = np.interp(positions, np.arange(frames), audio)
+    return audio
+
+
+# Three-band EQ presets: gain in dB for the low, mid and high band
+EQ_PRESETS = {
+    "Flat": (0.0, 0.0, 0.0),
+    "Warm": (3.0, 0.0, -4.0),
+    "Bright": (-2.0, 0.0, 4.0),
+    "Bass Boost": (6.0, 0.0, 0.0),
+    "Mid Cut": (0.0, -5.0, 0.0),
+}
+
+
+def design_eq_filter(gains, fs=44100, taps=511):
+    # Linear-phase FIR for a three-band EQ with bands centred at 100 Hz, 1 kHz and 8 kHz
+    frequencies = np.fft.rfftfreq(4096, 1 / fs)
+    gain_db = np.interp(np.log2(np.maximum(frequencies, 1)), np.log2([100, 1000, 8000]), gains)
+    impulse = np.fft.irfft(10 ** (gain_db / 20))
+    impulse = np.roll(impulse, taps // 2)[:taps]
+    return impulse * np.hanning(taps)
+
+
+class PartitionedConvolver:
+    """Uniformly partitioned overlap-add FFT convolution, processed one block at a time."""
+
+    def __init__(self, filter_spectra, block_size, effects_chain=None):
+        self.filter_spectra = filter_spectra
+        self.block_size = block_size
+        self.effects_chain = effects_chain
+        # Frequency-domain delay line holding the spectra of the most recent input blocks
+        self.input_spectra = np.zeros_like(filter_spectra)
+        self.position = 0
+        self.overlap = np.zeros(block_size)
+
+    @staticmethod
+    def partition(impulse_response, block_size):
+        # Split the impulse response into block-sized partitions and transform each of them once
+        partitions = -(-len(impulse_response) // block_size)
+        padded = np.zeros(partitions * block_size)
+        padded[:len(impulse_response)] = impulse_response
+        return np.fft.rfft(padded.reshape(partitions, block_size), n=2 * block_size, axis=1)
+
+    def process_block(self, block):
+        start_time = time.perf_counter()
+        partitions = len(self.filter_spectra)
+        self.input_spectra[self.position] = np.fft.rfft(block, n=2 * self.block_size)
+        # Input block n - k is multiplied with filter partition k
+        order = (self.position - np.arange(partitions)) % partitions
+        output = np.fft.irfft((self.input_spectra[order] * self.filter_spectra).sum(axis=0), n=2 * self.block_size)
+        self.position = (self.position + 1) % partitions
+        result = output[:self.block_size] + self.overlap
+        self.overlap = output[self.block_size:]
+        if self.effects_chain is not None:
+            self.effects_chain.record_block_time(time.perf_counter() - start_time)
+        return result
+
+
+class EffectsChain:
+    """Optional PC audio effects: convolution reverb and a three-band EQ, applied as one partitioned convolution."""
+
+    def __init__(self, impulse_response=None, reverb_mix=0.3, eq_gains=(0.0, 0.0, 0.0), block_size=1024, fs=44100):
+        self.block_size = block_size
+        self.fs = fs
+        # Combine dry signal, reverb and EQ into one response, so every block costs a single convolution
+        response = np.zeros(1 if impulse_response is None else len(impulse_response))
+        response[0] = 1.0 if impulse_response is None else 1.0 - reverb_mix
+        if impulse_response is not None:
+            # Scale the impulse response to unit energy so the wet level does not depend on the room
+            response += reverb_mix * impulse_response / max(np.sqrt(np.sum(impulse_response ** 2)), 1e-9)
+        if any(eq_gains):
+            eq_filter = design_eq_filter(eq_gains, fs)
+            size = len(response) + len(eq_filter) - 1
+            response = np.fft.irfft(np.fft.rfft(response, size) * np.fft.rfft(eq_filter, size), size)
+        self.tail_length = len(response) - 1
+        self.filter_spectra = PartitionedConvolver.partition(response, block_size)
+        # CPU cost per block
+        self.lock = threading.Lock()
+        self.blocks_processed = 0
+        self.total_block_time = 0.0
+        self.max_block_time = 0.0
+
+    def stream(self):
+        # Block-by-block processor with its own state, for real-time and streamed rendering
+        return PartitionedConvolver(self.filter_spectra, self.block_size, self)
+
+    def process(self, audio):
+        # Process a whole buffer offline; the result is longer by the reverb tail
+        convolver = self.stream()
+        total_length = len(audio) + self.tail_length
+        blocks = -(-total_length // self.block_size)
+        padded = np.zeros(blocks * self.block_size)
+        padded[:len(audio)] = audio
+        output = [convolver.process_block(padded[i * self.block_size:(i + 1) * self.block_size]) for i in range(blocks)]
+        return np.concatenate(output)[:total_length]
+
+    def record_block_time(self, seconds):
+        with self.lock:
+            self.blocks_processed += 1
+            self.total_block_time += seconds
+            self.max_block_time = max(self.max_block_time, seconds)
+
+    def cpu_report(self):
+        # Average and worst block time, and the average as a fraction of the block's duration (real-time load)
+        with self.lock:
+            mean_time = self.total_block_time / self.blocks_processed if self.blocks_processed else 0.0
+            return {
+                'blocks': self.blocks_processed,
+                'partitions': len(self.filter_spectra),
+                'mean_ms': mean_time * 1000,
+                'max_ms': self.max_block_time * 1000,
+                'realtime_load': mean_time / (self.block_size / self.fs),
+            }
+
+
+# Effects applied to PC audio (None when all effects are off)
+effects_chain = None
+
+
+def apply_effects(audio):
+    return audio if effects_chain is None else effects_chain.process(audio)
+
+
+def to_pcm16(audio, volume):
+    # Apply the volume and convert to 16-bit samples, clipping instead of normalizing
+    return (np.clip(audio * volume, -1, 1) * (2 ** 15 - 1)).astype(np.int16)
+
+
+class SimpleaudioBackend:
+    """PC audio backend that plays buffers on the sound card through simpleaudio."""
+
+    def play_buffer(self, audio, channels, bytes_per_sample, fs):
+        return sa.play_buffer(audio, channels, bytes_per_sample, fs)
+
+
+class NullPlayback:
+    """Play object of the null and capture backends; it 'plays' for as long as the buffer lasts."""
+
+    def __init__(self, duration):
+        self.end_time = time.perf_counter() + duration
+        self.stopped = threading.Event()
+
+    def is_playing(self):
+        return not self.stopped.is_set() and time.perf_counter() < self.end_time
+
+    def wait_done(self):
+        self.stopped.wait(max(0.0, self.end_time - time.perf_counter()))
+
+    def stop(self):
+        self.stopped.set()
+
+
+class NullAudioBackend:
+    """PC audio backend that discards buffers."""
+
+    def play_buffer(self, audio, channels, bytes_per_sample, fs):
+        return NullPlayback(len(audio) / (channels * fs))
+
+
+class CaptureAudioBackend(NullAudioBackend):
+    """PC audio backend that records every buffer with the time it was handed over, for tests and measurements."""
+
+    def __init__(self, keep_audio=True):
+        self.keep_audio = keep_audio
+        self.lock = threading.Lock()
+        self.buffers = []  # (perf_counter time, audio or None, fs)
+
+    def play_buffer(self, audio, channels, bytes_per_sample, fs):
+        with self.lock:
+            self.buffers.append((time.perf_counter(), np.array(audio) if self.keep_audio else None, fs))
+        return super().play_buffer(audio, channels, bytes_per_sample, fs)
+
+    def timestamps(self):
+        with self.lock:
+            return [timestamp for timestamp, _, _ in self.buffers]
+
+
+class MidoBackend:
+    """MIDI backend for the ports of the system, through mido and python-rtmidi."""
+
+    def get_output_names(self):
+        return mido.get_output_names()
+
+    def open_output(self, port_name):
+        return mido.open_output(port_name)
+
+
+# Function to list the MIDI input ports; there are none without python-rtmidi
+def midi_input_names():
+    return mido.get_input_names() if rtmidi else []
+
+
+class NullMidiOutput:
+    """MIDI output that discards messages."""
+
+    def send(self, msg):
+        pass
+
+    def close(self):
+        pass
+
+
+class NullMidiBackend:
+    """MIDI backend with a single output port that discards messages."""
+
+    port_name = "Null Output"
+
+    def get_output_names(self):
+        return [self.port_name]
+
+    def open_output(self, port_name):
+        return NullMidiOutput()
+
+
+class CaptureMidiOutput:
+    """MIDI output that records messages with the time they were sent."""
+
+    def __init__(self, port_name, events, lock):
+        self.port_name = port_name
+        self.events = events
+        self.lock = lock
+
+    def send(self, msg):
+        with self.lock:
+            self.events.append((time.perf_counter(), self.port_name, msg.copy()))
+
+    def close(self):
+        pass
+
+
+class CaptureMidiBackend(NullMidiBackend):
+    """MIDI backend whose output port records every message with its timestamp, for tests and measurements."""
+
+    port_name = "Capture Output"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []  # (perf_counter time, port name, mido message)
+
+    def open_output(self, port_name):
+        return CaptureMidiOutput(port_name, self.events, self.lock)
+
+    def timestamps(self, message_type=None):
+        with self.lock:
+            return [timestamp for timestamp, _, msg in self.events if message_type in (None, msg.type)]
+
+
+# Where PC audio and MIDI output go; replaced by the null or capture backends for headless runs
+audio_backend = SimpleaudioBackend() if sa else NullAudioBackend()
+midi_backend = MidoBackend() if rtmidi else NullMidiBackend()
+
+
+# Function to summarize the timing of events that should be evenly spaced: interval statistics in seconds
+def timing_jitter(timestamps, expected_interval=None):
+    intervals = np.diff(np.asarray(timestamps, dtype=float))
+    if len(intervals) == 0:
+        return {'events': len(timestamps)}
+    if expected_interval is None:
+        expected_interval = float(np.median(intervals))
+    deviations = intervals - expected_interval
+    return {
+        'events': len(timestamps),
+        'mean_interval': float(intervals.mean()),
+        'expected_interval': expected_interval,
+        'jitter_std': float(deviations.std()),
+        'jitter_max': float(np.abs(deviations).max()),
+        'drift': float(timestamps[-1] - timestamps[0] - expected_interval * len(intervals)),
+    }
+
+
+# Function to write what the capture backends recorded to a JSON file
+def save_capture(file_path, audio=None, midi=None):
+    capture = {'audio': [], 'midi': []}
+    if audio is not None:
+        capture['audio'] = [{'time': timestamp, 'samples': len(buffer) if buffer is not None else None, 'fs': fs}
+                            for timestamp, buffer, fs in audio.buffers]
+    if midi is not None:
+        capture['midi'] = [{'time': timestamp, 'port': port_name, 'message': str(msg)}
+                           for timestamp, port_name, msg in midi.events]
+    with open(file_path, 'w') as f:
+        json.dump(capture, f, indent=1)
+
+
+class LatencyTracer:
+    """Timestamps the stages of keypresses and playback events.
+
+    A trace is a chain of contiguous stages: each stage() call closes the span since the previous stage.
+    Finished traces feed rolling latency windows per kind, and all spans can be exported in Chrome
+    trace-event format. While disabled, every call returns immediately.
+    """
+
+    def __init__(self, window=200, max_events=100000):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.next_id = 1
+        self.traces = {}  # Trace id -> [kind, label, start time, time of the last stage]
+        self.events = deque(maxlen=max_events)  # Chrome trace events
+        self.window = window
+        self.latencies = {}  # Kind -> recent end-to-end latencies in seconds
+        self.playbacks = []  # Play objects, for counting active voices
+        self.origin = time.perf_counter()
+
+    def begin(self, kind, label='', start=None):
+        if not self.enabled:
+            return None
+        start = time.perf_counter() if start is None else start
+        with self.lock:
+            trace_id = self.next_id
+            self.next_id += 1
+            self.traces[trace_id] = [kind, label, start, start]
+        return trace_id
+
+    def stage(self, trace_id, name):
+        if trace_id is None:
+            return
+        now = time.perf_counter()
+        with self.lock:
+            trace = self.traces.get(trace_id)
+            if trace is None:
+                return
+            self.events.append(self._event(name, trace[0], trace[3], now, {'trace': trace_id, 'label': trace[1]}))
+            trace[3] = now
+
+    def finish(self, trace_id):
+        if trace_id is None:
+            return
+        now = time.perf_counter()
+        with self.lock:
+            trace = self.traces.pop(trace_id, None)
+            if trace is None:
+                return
+            kind, label, start, _ = trace
+            self.events.append(self._event(f"{kind} {label}".strip(), 'trace', start, now, {'trace': trace_id}))
+            self.latencies.setdefault(kind, deque(maxlen=self.window)).append(now - start)
+
+    def _event(self, name, category, start, end, args):
+        return {'name': name, 'cat': category, 'ph': 'X', 'ts': (start - self.origin) * 1e6,
+                'dur': (end - start) * 1e6, 'pid': os.getpid(), 'tid': threading.get_ident(), 'args': args}
+
+    def track_playback(self, playback):
+        if self.enabled and playback is not None:
+            with self.lock:
+                self.playbacks.append(playback)
+        return playback
+
+    def active_voices(self):
+        with self.lock:
+            self.playbacks = [playback for playback in self.playbacks if playback.is_playing()]
+            return len(self.playbacks)
+
+    def percentiles(self):
+        # Rolling p50/p99 latency in seconds per trace kind
+        with self.lock:
+            windows = {kind: list(latencies) for kind, latencies in self.latencies.items() if latencies}
+        return {kind: (float(np.percentile(latencies, 50)), float(np.percentile(latencies, 99)), len(latencies))
+                for kind, latencies in windows.items()}
+
+    def export_chrome_trace(self, file_path):
+        # Load the file in chrome://tracing or Perfetto
+        with self.lock:
+            events = list(self.events)
+        thread_names = [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': thread.ident,
+                         'args': {'name': thread.name}} for thread in threading.enumerate()]
+        with open(file_path, 'w') as f:
+            json.dump({'traceEvents': thread_names + events, 'displayTimeUnit': 'ms'}, f)
+
+
+# Latency tracing of keypresses and playback (off unless enabled from the Options menu or --trace)
+tracer = LatencyTracer()
+tracer_forced = False  # Set by --trace, so the menu setting cannot turn tracing off
+profiling_forced = False  # Set by --profile, so the menu settings cannot turn profiling off
+
+
+class PerformanceCounters:
+    """Per-subsystem counters and timers for profiling mode. While disabled, every call returns immediately."""
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.values = Counter()
+        self.started = time.time()
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            with self.lock:
+                self.values[name] += amount
+
+    def timed(self, name):
+        # Counts '<name>.calls' and adds the elapsed time to '<name>.seconds'
+        return self._timed(name) if self.enabled else nullcontext()
+
+    @contextmanager
+    def _timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.values[name + '.calls'] += 1
+                self.values[name + '.seconds'] += elapsed
+
+    def snapshot(self):
+        with self.lock:
+            return dict(sorted(self.values.items()))
+
+    def reset(self):
+        with self.lock:
+            self.values.clear()
+            self.started = time.time()
+
+    def dump(self, file_path):
+        with open(file_path, 'w') as f:
+            json.dump({'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+                       'dumped': time.strftime('%Y-%m-%dT%H:%M:%S'), 'version': 'Pianoman-v1.0',
+                       'platform': platform.platform(), 'counters': self.snapshot()}, f, indent=2)
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread at a fixed interval, for folded-stack flame graphs.
+
+    Unlike cProfile it does not slow down every function call, so timing-sensitive actions like
+    playback can be profiled as they run.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()  # Folded stack -> number of samples
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._sample_loop, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+    def _sample_loop(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write(self, file_path):
+        # One 'frame;frame;frame count' line per stack, as read by flamegraph.pl and speedscope
+        with open(file_path, 'w') as f:
+            for stack, samples in self.stacks.most_common():
+                f.write(f"{stack} {samples}\n")
+
+    def summary(self, limit=30):
+        # Samples per function, counted once per stack it appears in
+        own, total = Counter(), Counter()
+        for stack, samples in self.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += samples
+            for frame in set(frames):
+                total[frame] += samples
+        all_samples = sum(self.stacks.values()) or 1
+        lines = [f"{sum(self.stacks.values())} samples every {self.interval * 1000:.0f} ms", "",
+                 f"{'own %':>7}{'total %':>9}  function"]
+        for frame, samples in total.most_common(limit):
+            lines.append(f"{own[frame] * 100 / all_samples:>7.1f}{samples * 100 / all_samples:>9.1f}  {frame}")
+        return "\n".join(lines) + "\n"
+
+
+class CountingMidiOutput:
+    """Wraps a MIDI output port, counting the messages sent through it."""
+
+    def __init__(self, port):
+        self.port = port
+
+    def send(self, msg):
+        counters.count('midi.messages')
+        self.port.send(msg)
+
+    def close(self):
+        self.port.close()
+
+
+# Profiling mode (off unless enabled from the Options menu or --profile)
+counters = PerformanceCounters()
+profiler_mode = 'Off'  # 'Off', 'cProfile' or 'Sampling', for the actions run through run_profiled
+profile_directory = 'profiles'
+
+
+# Function to run an action (load song, export PDF, play song) under the selected profiler
+def run_profiled(action, function, *args, **kwargs):
+    mode = profiler_mode
+    if mode == 'Off':
+        return function(*args, **kwargs)
+    os.makedirs(profile_directory, exist_ok=True)
+    base_path = os.path.join(profile_directory, f"{action}-{time.strftime('%Y%m%d-%H%M%S')}")
+    if mode == 'cProfile':
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(function, *args, **kwargs)
+        finally:
+            profile.dump_stats(base_path + '.prof')
+            with open(base_path + '.txt', 'w') as f:
+                pstats.Stats(profile, stream=f).sort_stats('cumulative').print_stats(40)
+    sampler = SamplingProfiler(threading.get_ident())
+    sampler.start()
+    try:
+        return function(*args, **kwargs)
+    finally:
+        sampler.stop()
+        sampler.write(base_path + '.folded')
+        with open(base_path + '.txt', 'w') as f:
+            f.write(sampler.summary())
+
+
+# Function to play a single note using PC audio
+def play_note_pc(frequency, duration=0.5, volume=0.5, timbre="Sine", trace_id=None):
+    fs = 44100  # Sampling rate
+    tracer.stage(trace_id, 'thread_start')
+    audio = render_chord_pc([frequency], duration=duration, volume=volume, timbre=timbre)
+    tracer.stage(trace_id, 'synthesis')
+    playback = tracer.track_playback(audio_backend.play_buffer(audio, 1, 2, fs))
+    tracer.stage(trace_id, 'device')
+    tracer.finish(trace_id)
+    return playback
+
+
+# Function to play a chord using PC audio
+def play_chord_pc(frequencies, duration=0.5, volume=0.5, timbre="Sine", trace_id=None):
+    fs = 44100  # Sampling rate
+    tracer.stage(trace_id, 'thread_start')
+    audio = render_chord_pc(frequencies, duration=duration, volume=volume, timbre=timbre)
+    tracer.stage(trace_id, 'synthesis')
+    playback = tracer.track_playback(audio_backend.play_buffer(audio, 1, 2, fs))
+    tracer.stage(trace_id, 'device')
+    tracer.finish(trace_id)
+    return playback
+
+
+# Function to render a chord into a 16-bit PC audio buffer
+def render_chord_pc(frequencies, duration=0.5, volume=0.5, timbre="Sine"):
+    return to_pcm16(apply_effects(synthesize_voices(frequencies, duration, timbre)), volume)
+
+
+# Function to render an arpeggiated chord (one note every `delay` seconds) into a 16-bit PC audio buffer
+def render_arpeggio_pc(frequencies, delay, duration=0.5, volume=0.5, timbre="Sine"):
+    fs = 44100  # Sampling rate
+    onsets = [i * int(fs * delay) for i in range(len(frequencies))]
+    return to_pcm16(apply_effects(synthesize_voices(frequencies, duration, timbre, onsets=onsets)), volume)
+
+
+# Function to render each playable chord of a song as (start sample, PC audio buffer), timed like song playback
+def iter_song_chord_audio(song_data, song_speed=10, chord_speed=0, playback_octave=0, volume=0.5, timbre="Sine"):
+    fs = 44100  # Sampling rate
+    all_notes = keyboard_midi_notes(song_data.get("number_of_octaves", 4))
+    position = 0.0
+    rendered = {}  # Notes -> buffer, so a repeated chord is synthesized once
+    for keyboard_data in song_keyboards(song_data):
+        notes = tuple(sorted(note for note, selected in zip(all_notes, keyboard_data["key_states"]) if selected))
+        if not notes:
+            continue  # Playback skips empty chords as well
+        audio = rendered.get(notes)
+        if audio is None:
+            frequencies = [440 * 2 ** ((note - 69) / 12) * 2 ** playback_octave for note in notes]
+            if chord_speed == 0:
+                audio = render_chord_pc(frequencies, duration=0.5, volume=volume, timbre=timbre)
+            else:
+                audio = render_arpeggio_pc(frequencies, 2.0 / chord_speed, duration=0.5, volume=volume,
+                                           timbre=timbre)
+            rendered[notes] = audio
+        arpeggio_time = 0 if chord_speed == 0 else len(notes) * 2.0 / chord_speed
+        yield int(round(position * fs)), audio
+        position += arpeggio_time + 2.0 / song_speed
+
+
+# Function to render a whole song offline into one 16-bit PC audio buffer
+def render_song_audio(song_data, **settings):
+    chunks = list(iter_song_chord_audio(song_data, **settings))
+    if not chunks:
+        return np.zeros(0, dtype=np.int16)
+    mix = np.zeros(max(start + len(audio) for start, audio in chunks), dtype=np.int32)
+    for start, audio in chunks:
+        mix[start:start + len(audio)] += audio
+    return np.clip(mix, -(2 ** 15 - 1), 2 ** 15 - 1).astype(np.int16)
+
+
+# Function to render a song as consecutive blocks of finished 16-bit samples, chord by chord
+def iter_song_audio_blocks(song_data, **settings):
+    # Chords start in order, so every sample before the next chord's start can no longer change
+    pending = np.zeros(0, dtype=np.int32)
+    pending_start = 0
+    for start, audio in iter_song_chord_audio(song_data, **settings):
+        finished = start - pending_start
+        if finished > 0:
+            block = pending[:finished]
+            if len(block) < finished:
+                block = np.concatenate([block, np.zeros(finished - len(block), dtype=np.int32)])
+            yield np.clip(block, -(2 ** 15 - 1), 2 ** 15 - 1).astype(np.int16)
+            pending = pending[finished:]
+            pending_start = start
+        if len(pending) < len(audio):
+            pending = np.concatenate([pending, np.zeros(len(audio) - len(pending), dtype=np.int32)])
+        pending[:len(audio)] += audio
+    if len(pending):
+        yield np.clip(pending, -(2 ** 15 - 1), 2 ** 15 - 1).astype(np.int16)
+
+
+# Function to build the header of a 16-bit mono WAV file; without a data size it is a streaming header
+def wav_header(data_size=None, fs=44100):
+    # Streaming players accept the maximum size for data of unknown length
+    data_size = 0xFFFFFFFF - 36 if data_size is None else data_size
+    return (b'RIFF' + struct.pack('<I', 36 + data_size) + b'WAVE' +
+            b'fmt ' + struct.pack('<IHHIIHH', 16, 1, 1, fs, fs * 2, 2, 16) +
+            b'data' + struct.pack('<I', data_size))
+
+
+# Function to wrap 16-bit mono samples in a WAV file
+def wav_bytes(audio, fs=44100):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(fs)
+        wav_file.writeframes(audio.astype('<i2').tobytes())
+    return buffer.getvalue()
+
+
+class SongAudioStream(io.RawIOBase):
+    """Read-only file-like WAV stream of a song, synthesized chord by chord while it is read."""
+
+    def __init__(self, song_data, **settings):
+        super().__init__()
+        self.blocks = iter_song_audio_blocks(song_data, **settings)
+        self.buffer = bytearray(wav_header())
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        # Synthesize the next chord only when everything rendered so far has been read
+        while not self.buffer:
+            block = next(self.blocks, None)
+            if block is None:
+                return 0
+            self.buffer += block.astype('<i2').tobytes()
+        size = min(len(b), len(self.buffer))
+        b[:size] = self.buffer[:size]
+        del self.buffer[:size]
+        return size
+
+
+def keyboard_midi_notes(octaves):
+    # MIDI note of every entry in a key_states list: the white keys of all octaves, then the black keys
+    white_key_offsets = [0, 2, 4, 5, 7, 9, 11]
+    black_key_offsets = [1, 3, 6, 8, 10]
+    return ([48 + octave * 12 + offset for octave in range(octaves) for offset in white_key_offsets] +
+            [48 + octave * 12 + offset for octave in range(octaves) for offset in black_key_offsets])
+
+
+class MidiFileWriter:
+    """Streaming writer for a single-track Standard MIDI File; events are written as they arrive."""
+
+    def __init__(self, f, ticks_per_beat=480):
+        self.f = f
+        f.write(b'MThd' + struct.pack('>IHHH', 6, 0, 1, ticks_per_beat))
+        f.write(b'MTrk' + struct.pack('>I', 0))  # Length is filled in by close()
+        self.track_start = f.tell()
+        self.last_tick = 0
+
+    @staticmethod
+    def variable_length(value):
+        # Most delta times fit in one or two bytes
+        if value < 0x80:
+            return bytes((value,))
+        if value < 0x4000:
+            return bytes(((value >> 7) | 0x80, value & 0x7F))
+        data = bytearray([value & 0x7F])
+        value >>= 7
+        while value:
+            data.insert(0, (value & 0x7F) | 0x80)
+            value >>= 7
+        return bytes(data)
+
+    def event(self, tick, data):
+        # Events must be written in time order
+        self.f.write(self.variable_length(tick - self.last_tick) + data)
+        self.last_tick = tick
+
+    def meta(self, tick, meta_type, data):
+        self.event(tick, bytes([0xFF, meta_type]) + self.variable_length(len(data)) + data)
+
+    def close(self):
+        self.meta(self.last_tick, 0x2F, b'')
+        track_end = self.f.tell()
+        self.f.seek(self.track_start - 4)
+        self.f.write(struct.pack('>I', track_end - self.track_start))
+        self.f.seek(track_end)
+
+
+# Function to write a song as a Standard MIDI File, timed like song playback (one chord per beat)
+def export_song_midi(song_data, file_path, song_speed=10, chord_speed=0, playback_octave=0, velocity=64,
+                     program=0, ticks_per_beat=480):
+    all_notes = keyboard_midi_notes(song_data.get("number_of_octaves", 4))
+    beat = 2.0 / song_speed  # Song delay between chords, in seconds
+
+    def ticks(seconds):
+        return int(round(seconds / beat * ticks_per_beat))
+
+    note_ticks = ticks(0.5)
+    step_ticks = 0 if chord_speed == 0 else ticks(2.0 / chord_speed)
+    velocity = max(1, min(127, velocity))
+
+    with open(file_path, 'wb') as f:
+        writer = MidiFileWriter(f, ticks_per_beat)
+        writer.meta(0, 0x03, song_data.get("song_name", "").encode('utf-8'))
+        writer.meta(0, 0x51, int(beat * 1000000).to_bytes(3, 'big'))
+        writer.event(0, bytes([0xC0, program & 0x7F]))
+
+        # Pending note-offs; only the chords that are still sounding are kept
+        pending_offs = []
+        note_off_tick = {}
+
+        def flush_note_offs(until):
+            while pending_offs and pending_offs[0][0] <= until:
+                tick, note = heapq.heappop(pending_offs)
+                if note_off_tick.get(note) == tick:
+                    writer.event(tick, bytes([0x80, note, 0]))
+                    del note_off_tick[note]
+
+        tick = 0
+        for keyboard_data in song_keyboards(song_data):
+            notes = sorted(note + playback_octave * 12
+                           for note, selected in zip(all_notes, keyboard_data["key_states"]) if selected)
+            notes = [note for note in notes if 0 <= note <= 127]
+            if not notes:
+                continue  # Playback skips empty chords as well
+            flush_note_offs(tick)
+            writer.meta(tick, 0x06, keyboard_data.get("chord_name", "").encode('utf-8'))
+            for i, note in enumerate(notes):
+                note_on_tick = tick + i * step_ticks
+                flush_note_offs(note_on_tick)
+                if note in note_off_tick:
+                    # The note is still sounding: end it before striking it again
+                    writer.event(note_on_tick, bytes([0x80, note, 0]))
+                writer.event(note_on_tick, bytes([0x90, note, velocity]))
+                note_off_tick[note] = note_on_tick + note_ticks
+                heapq.heappush(pending_offs, (note_on_tick + note_ticks, note))
+            tick += len(notes) * step_ticks + ticks_per_beat
+        flush_note_offs(float('inf'))
+        writer.close()
+
+
+def iter_midi_track(data, position, end):
+    # Walk one track chunk and yield (tick, kind, value) for notes and tempo changes, without building lists
+    tick = 0
+    running_status = 0
+    while position < end:
+        # Delta time (variable-length quantity)
+        delta = 0
+        while True:
+            byte = data[position]
+            position += 1
+            delta = (delta << 7) | (byte & 0x7F)
+            if byte < 0x80:
+                break
+        tick += delta
+        status = data[position]
+        if status == 0xFF:
+            meta_type = data[position + 1]
+            position += 2
+            length = 0
+            while True:
+                byte = data[position]
+                position += 1
+                length = (length << 7) | (byte & 0x7F)
+                if byte < 0x80:
+                    break
+            if meta_type == 0x51:
+                yield tick, 'tempo', int.from_bytes(data[position:position + 3], 'big')
+            elif meta_type == 0x2F:
+                return
+            position += length
+            continue
+        if status in (0xF0, 0xF7):
+            position += 1
+            length = 0
+            while True:
+                byte = data[position]
+                position += 1
+                length = (length << 7) | (byte & 0x7F)
+                if byte < 0x80:
+                    break
+            position += length
+            continue
+        if status & 0x80:
+            running_status = status
+            position += 1
+        message_type = running_status & 0xF0
+        channel = running_status & 0x0F
+        if message_type in (0xC0, 0xD0):
+            position += 1
+            continue
+        note, velocity = data[position], data[position + 1]
+        position += 2
+        # Channel 10 holds drums, which are not part of the harmony
+        if channel == 9:
+            continue
+        if message_type == 0x90 and velocity > 0:
+            yield tick, 'note_on', note
+        elif message_type == 0x80 or message_type == 0x90:
+            yield tick, 'note_off', note
+
+
+# Function to read the notes of a MIDI file in time order, as (seconds, kind, note) tuples
+def iter_midi_file_notes(file_path):
+    with open(file_path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if data[:4] != b'MThd':
+        raise ValueError(f"'{file_path}' is not a MIDI file.")
+    header_length, _, track_count, division = struct.unpack('>IHHH', data[4:14])
+    if division & 0x8000:
+        raise ValueError("SMPTE time division is not supported.")
+    # Locate the track chunks and merge their event streams lazily
+    tracks = []
+    position = 8 + header_length
+    while position + 8 <= len(data) and len(tracks) < track_count:
+        chunk_id, chunk_length = struct.unpack('>4sI', data[position:position + 8])
+        if chunk_id == b'MTrk':
+            tracks.append(iter_midi_track(data, position + 8, min(len(data), position + 8 + chunk_length)))
+        position += 8 + chunk_length
+    tempo = 500000  # Microseconds per beat (120 BPM) until a tempo change
+    last_tick = 0
+    seconds = 0.0
+    try:
+        for tick, kind, value in heapq.merge(*tracks, key=lambda event: event[0]):
+            seconds += (tick - last_tick) * tempo / (division * 1000000)
+            last_tick = tick
+            if kind == 'tempo':
+                tempo = value
+            else:
+                yield seconds, kind, value
+    finally:
+        for track in tracks:
+            track.close()
+        data.close()
+
+
+# Function to group the notes of a MIDI file into chords of notes struck within `window` seconds
+def iter_midi_file_chords(file_path, window=0.05):
+    chord = set()
+    chord_start = None
+    for seconds, kind, note in iter_midi_file_notes(file_path):
+        if kind != 'note_on':
+            continue
+        if chord_start is not None and seconds - chord_start > window:
+            yield chord
+            chord = set()
+        if not chord:
+            chord_start = seconds
+        chord.add(note)
+    if chord:
+        yield chord
+
+
+# Function to turn a set of MIDI notes into key_states, folding notes outside the keyboard into its range
+def notes_to_key_states(midi_notes, octaves):
+    lowest = 48
+    highest = lowest + octaves * 12 - 1
+    clamped = set()
+    for note in midi_notes:
+        while note < lowest:
+            note += 12
+        while note > highest:
+            note -= 12
+        clamped.add(note)
+    return [note in clamped for note in keyboard_midi_notes(octaves)]
+
+
+# Function to list the close-position voicings of a chord (every inversion, at every octave) within a range.
+# Voicings keep the number of keys; doubled notes continue the chord upwards.
+def chord_voicings(midi_notes, lowest, highest):
+    pitch_classes = sorted(set(note % 12 for note in midi_notes))
+    size = len(set(midi_notes))
+    voicings = {tuple(sorted(set(midi_notes)))}  # The chord as it was entered is always a candidate
+    for inversion in range(len(pitch_classes)):
+        rotated = pitch_classes[inversion:] + pitch_classes[:inversion]
+        for bass in range(lowest + rotated[0] - lowest % 12, highest + 1, 12):
+            if bass < lowest:
+                continue
+            voicing = [bass]
+            for i in range(1, size):
+                pitch_class = rotated[i % len(rotated)]
+                voicing.append(voicing[-1] + (pitch_class - voicing[-1] - 1) % 12 + 1)
+            if voicing[-1] > highest:
+                break
+            voicings.add(tuple(voicing))
+    return [list(voicing) for voicing in voicings]
+
+
+# Function to measure how far the keys move from one set of voicings to another: every note travels to the
+# nearest note of the other chord, both ways. Returns a (len(previous), len(current)) cost matrix.
+def voice_leading_costs(previous, current):
+    width = max(len(voicing) for voicing in previous + current)
+    previous_notes = np.array([voicing + [voicing[-1]] * (width - len(voicing)) for voicing in previous])
+    current_notes = np.array([voicing + [voicing[-1]] * (width - len(voicing)) for voicing in current])
+    previous_sizes = np.array([len(voicing) for voicing in previous])
+    current_sizes = np.array([len(voicing) for voicing in current])
+    distances = np.abs(previous_notes[:, None, :, None] - current_notes[None, :, None, :])
+    # Padding repeats the top note; only the real notes of each voicing count
+    previous_mask = np.arange(width)[None, :] < previous_sizes[:, None]
+    current_mask = np.arange(width)[None, :] < current_sizes[:, None]
+    forward = (distances.min(axis=3) * previous_mask[:, None, :]).sum(axis=2)
+    backward = (distances.min(axis=2) * current_mask[None, :, :]).sum(axis=2)
+    return forward + backward
+
+
+# Function to re-voice a sequence of chords (lists of MIDI notes) so the keys move as little as possible.
+# Dynamic programming over the candidate voicings of each chord keeps this linear in the number of chords.
+def smooth_voicings(chords, lowest=48, highest=95):
+    playable = [i for i, notes in enumerate(chords) if notes]
+    if not playable:
+        return [list(notes) for notes in chords]
+    center = (lowest + highest) / 2
+    candidates = [chord_voicings(chords[i], lowest, highest) for i in playable]
+    # A slight pull towards the middle of the keyboard keeps long songs from drifting to one end
+    register_costs = [0.1 * np.abs(np.array([np.mean(voicing) for voicing in voicings]) - center)
+                      for voicings in candidates]
+    total_costs = register_costs[0]
+    back_pointers = []
+    for step in range(1, len(candidates)):
+        costs = total_costs[:, None] + voice_leading_costs(candidates[step - 1], candidates[step])
+        back_pointers.append(costs.argmin(axis=0))
+        total_costs = costs.min(axis=0) + register_costs[step]
+    choice = int(total_costs.argmin())
+    result = [list(notes) for notes in chords]
+    for step in range(len(candidates) - 1, -1, -1):
+        result[playable[step]] = candidates[step][choice]
+        if step:
+            choice = int(back_pointers[step - 1][choice])
+    return result
+
+
+# Function to import a MIDI file as (chord name, key_states) pairs for the saved keyboards
+def import_midi_chords(file_path, octaves, window=0.05):
+    for chord in iter_midi_file_chords(file_path, window):
+        yield recognize_chord_name(chord) or "", notes_to_key_states(chord, octaves)
+
+
+# Function to build the chord templates for chromagram matching: names and a (templates, 12) matrix
+# of unit-length pitch-class profiles, one per root and chord type (extensions folded into one octave)
+def build_chord_templates():
+    names = []
+    profiles = []
+    seen = set()
+    for chord_type, intervals in CHORD_TYPES.items():
+        for root in range(12):
+            pitch_classes = frozenset((root + interval) % 12 for interval in intervals)
+            if pitch_classes in seen:
+                continue  # e.g. a sixth chord is also a minor seventh on another root
+            seen.add(pitch_classes)
+            profile = np.zeros(12)
+            profile[list(pitch_classes)] = 1
+            names.append(f"{NOTE_NAMES_SHARP[root]} {chord_type}")
+            profiles.append(profile / np.linalg.norm(profile))
+    return names, np.array(profiles)
+
+
+CHORD_TEMPLATE_NAMES, CHORD_TEMPLATES = build_chord_templates()
+
+
+# Function to stream the chromagram of a 16-bit PCM WAV file: yields (frame times, (frames, 12) chroma)
+# per block. The file is memory-mapped and analysed a block at a time, so memory use does not grow with length.
+def iter_wav_chroma(file_path, frame_size=8192, hop_size=4096, frames_per_block=64):
+    header = read_wav_header(file_path)
+    if header['audio_format'] != 1 or header['bits'] != 16:
+        raise ValueError(f"'{file_path}' is not a 16-bit PCM WAV file.")
+    sample_rate = header['sample_rate']
+    total = header['data_size'] // (2 * header['channels'])
+    data = np.memmap(file_path, dtype='<i2', mode='r', offset=header['data_offset'],
+                     shape=(total, header['channels']))
+
+    # Map the STFT bins between A1 and B6 to pitch classes
+    frequencies = np.fft.rfftfreq(frame_size, 1 / sample_rate)
+    in_range = (frequencies >= 55) & (frequencies <= 2000)
+    pitch_classes = np.round(12 * np.log2(np.maximum(frequencies, 1) / 440) + 69).astype(int) % 12
+    chroma_map = np.zeros((len(frequencies), 12))
+    chroma_map[np.nonzero(in_range)[0], pitch_classes[in_range]] = 1
+    window = np.hanning(frame_size)
+
+    frame = 0
+    while frame * hop_size + frame_size <= total:
+        frame_count = min(frames_per_block, (total - frame_size) // hop_size + 1 - frame)
+        start = frame * hop_size
+        block = data[start:start + (frame_count - 1) * hop_size + frame_size].mean(axis=1) / 2 ** 15
+        frames = np.lib.stride_tricks.sliding_window_view(block, frame_size)[::hop_size]
+        spectrum = np.abs(np.fft.rfft(frames * window, axis=1)) ** 2
+        chroma = spectrum @ chroma_map
+        # Silent frames get an all-zero chroma
+        chroma[np.sqrt((frames ** 2).mean(axis=1)) < 1e-3] = 0
+        times = (frame + np.arange(frame_count)) * hop_size / sample_rate
+        yield times, chroma
+        frame += frame_count
+
+
+# Function to match chroma vectors against the chord templates: template index per row, -1 for silence
+def match_chroma(chroma):
+    norms = np.linalg.norm(chroma, axis=1, keepdims=True)
+    scores = (chroma / np.where(norms > 0, norms, 1)) @ CHORD_TEMPLATES.T
+    return np.where(norms[:, 0] > 0, scores.argmax(axis=1), -1)
+
+
+# Function to detect the chords of a WAV recording: yields (start time, end time, chord name).
+# Without a beat period a new chord starts where the detected chord changes for at least min_duration
+# seconds; with a beat period (seconds) there is one chord per beat.
+def iter_wav_chords(file_path, beat_period=None, min_duration=0.5, **stft_settings):
+    if beat_period:
+        beat = 0
+        beat_chroma = np.zeros(12)
+        for times, chroma in iter_wav_chroma(file_path, **stft_settings):
+            beats = (times // beat_period).astype(int)
+            for frame_beat, frame_chroma in zip(beats, chroma):
+                if frame_beat != beat:
+                    label = match_chroma(beat_chroma[None, :])[0]
+                    if label >= 0:
+                        yield float(beat * beat_period), float((beat + 1) * beat_period), CHORD_TEMPLATE_NAMES[label]
+                    beat, beat_chroma = frame_beat, np.zeros(12)
+                beat_chroma += frame_chroma
+        label = match_chroma(beat_chroma[None, :])[0]
+        if label >= 0:
+            yield float(beat * beat_period), float((beat + 1) * beat_period), CHORD_TEMPLATE_NAMES[label]
+        return
+
+    current = None  # [label, start, end] of the chord being built
+    pending = None  # A different chord that has not lasted min_duration yet
+    for times, chroma in iter_wav_chroma(file_path, **stft_settings):
+        step = times[1] - times[0] if len(times) > 1 else 0
+        for time_point, label in zip(times, match_chroma(chroma)):
+            if current is None:
+                current = [label, time_point, time_point + step]
+            elif label == current[0]:
+                # A short deviation is absorbed into the current chord
+                current[2] = time_point + step
+                pending = None
+            elif pending and label == pending[0]:
+                pending[2] = time_point + step
+                if pending[2] - pending[1] >= min_duration:
+                    if current[0] >= 0:
+                        yield float(current[1]), float(current[2]), CHORD_TEMPLATE_NAMES[current[0]]
+                    current, pending = pending, None
+            else:
+                pending = [label, time_point, time_point + step]
+    if current and current[0] >= 0:
+        yield float(current[1]), float(current[2]), CHORD_TEMPLATE_NAMES[current[0]]
+
+
+# Function to import the chords of a WAV recording as (chord name, key_states), voiced on the input keyboard
+def import_wav_chords(file_path, octaves, beat_period=None, min_duration=0.5):
+    highest = 48 + octaves * 12 - 1
+    for _, _, chord_name in iter_wav_chords(file_path, beat_period, min_duration):
+        yield chord_name, notes_to_key_states(chord_symbol_notes(chord_name, 48, highest), octaves)
+
+
+# Process pool job: detect the chords of one WAV file and write them as a song JSON file
+def wav_song_job(file_path, output_directory, octaves, beat_period, min_duration):
+    song_name = os.path.splitext(os.path.basename(file_path))[0]
+    song_data = {
+        "song_name": song_name,
+        "saved_keyboards": [{"chord_name": chord_name, "key_states": key_states} for chord_name, key_states
+                            in import_wav_chords(file_path, octaves, beat_period, min_duration)],
+        "number_of_octaves": octaves
+    }
+    song_file = os.path.join(output_directory, song_name + ".json")
+    write_song_file(song_data, song_file)
+    return song_file
+
+
+# Function to turn many WAV recordings into song files, analysing the files in parallel worker processes
+def import_wav_songs(file_paths, output_directory, octaves=4, beat_period=None, min_duration=0.5, workers=None):
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(wav_song_job, file_path, output_directory, octaves, beat_period, min_duration)
+                   for file_path in file_paths]
+        return [future.result() for future in futures]
+
+
+# Function to export many song JSON files to MIDI files in one batch
+def export_songs_midi(song_files, output_directory, **settings):
+    exported = []
+    for song_file in song_files:
+        with open(song_file, 'r') as f:
+            song_data = json.load(f)
+        song_data.setdefault("song_name", os.path.splitext(os.path.basename(song_file))[0])
+        file_path = os.path.join(output_directory, os.path.splitext(os.path.basename(song_file))[0] + ".mid")
+        export_song_midi(song_data, file_path, **settings)
+        exported.append(file_path)
+    return exported
+
+
+# Function to read a pitch-class set such as "C E G", "Bb D F" or "0 4 7"
+def parse_pitch_set(text):
+    flats = {'Db': 'C#', 'Eb': 'D#', 'Gb': 'F#', 'Ab': 'G#', 'Bb': 'A#', 'Cb': 'B', 'Fb': 'E'}
+    mask = 0
+    for token in text.replace(',', ' ').split():
+        if token.isdigit() and int(token) < 12:
+            mask |= 1 << int(token)
+            continue
+        name = token[:1].upper() + token[1:]
+        name = flats.get(name, name)
+        if name == 'E#':
+            name = 'F'
+        elif name == 'B#':
+            name = 'C'
+        if name not in NOTE_NAMES_SHARP:
+            raise ValueError(f"Unknown note '{token}'.")
+        mask |= 1 << NOTE_NAMES_SHARP.index(name)
+    return mask
+
+
+# Krumhansl-Kessler key profiles: how well each pitch class fits a major or minor key with tonic C
+MAJOR_KEY_PROFILE = [6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88]
+MINOR_KEY_PROFILE = [6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17]
+
+# The 24 keys: rows 0-11 are C major to B major, rows 12-23 are C minor to B minor
+KEY_NAMES = [f"{name} major" for name in NOTE_NAMES_SHARP] + [f"{name} minor" for name in NOTE_NAMES_SHARP]
+
+
+def _standardize(matrix):
+    # Rows with zero mean and unit variance, so a dot product divided by 12 is a correlation
+    matrix = matrix - matrix.mean(axis=1, keepdims=True)
+    deviation = matrix.std(axis=1, keepdims=True)
+    return matrix / np.where(deviation > 0, deviation, 1)
+
+
+KEY_PROFILE_MATRIX = _standardize(np.array([np.roll(MAJOR_KEY_PROFILE, tonic) for tonic in range(12)] +
+                                           [np.roll(MINOR_KEY_PROFILE, tonic) for tonic in range(12)]))
+
+# Scale degrees in major and minor keys, by semitones above the tonic
+MAJOR_DEGREES = ['I', 'bII', 'II', 'bIII', 'III', 'IV', '#IV', 'V', 'bVI', 'VI', 'bVII', 'VII']
+MINOR_DEGREES = ['I', 'bII', 'II', 'III', '#III', 'IV', '#IV', 'V', 'VI', '#VI', 'VII', '#VII']
+
+# Roman numeral suffix and whether the numeral is lower case, per chord type
+NUMERAL_STYLES = {
+    'Major': ('', False), 'Minor': ('', True), 'Diminished': ('°', True), 'Augmented': ('+', False),
+    'Major Seventh': ('maj7', False), 'Minor Seventh': ('7', True), 'Dominant Seventh': ('7', False),
+    'Suspended 2nd': ('sus2', False), 'Suspended 4th': ('sus4', False), 'Major Sixth': ('6', False),
+    'Minor Sixth': ('6', True), 'Ninth': ('9', False), 'Minor Ninth': ('9', True), 'Eleventh': ('11', False),
+    'Minor Eleventh': ('11', True), 'Thirteenth': ('13', False), 'Minor Thirteenth': ('13', True),
+    'Augmented Seventh': ('+7', False), 'Diminished Seventh': ('°7', True), 'Half-Diminished Seventh': ('ø7', True),
+}
+
+
+# Function to find the root and chord type of a pitch-class mask; exact chords on any root go before
+# partial matches, so that A-C-E is A minor rather than an incomplete C sixth
+def chord_root_and_type(mask):
+    pitch_classes = [pitch_class for pitch_class in range(12) if mask >> pitch_class & 1]
+    for root in pitch_classes:
+        intervals = {(pitch_class - root) % 12 for pitch_class in pitch_classes}
+        for chord_type, chord_intervals in CHORD_TYPES.items():
+            if intervals == {interval % 12 for interval in chord_intervals}:
+                return root, chord_type
+    for root in pitch_classes:
+        chord_type = match_intervals_to_chord(sorted((pitch_class - root) % 12 for pitch_class in pitch_classes))
+        if chord_type:
+            return root, chord_type
+    return None
+
+
+# Function to write a chord as a Roman numeral in a key (an index into KEY_NAMES)
+def roman_numeral(mask, key_index):
+    chord = chord_root_and_type(mask)
+    if chord is None:
+        return '?'
+    root, chord_type = chord
+    degrees = MAJOR_DEGREES if key_index < 12 else MINOR_DEGREES
+    numeral = degrees[(root - key_index % 12) % 12]
+    suffix, lower_case = NUMERAL_STYLES.get(chord_type, ('', False))
+    if lower_case:
+        numeral = numeral.lower()
+    return numeral + suffix
+
+
+# Function to estimate the key of every song at once from the pitch-class masks of its chords.
+# Returns (key index or None, correlation) per song.
+def estimate_keys(songs_masks):
+    counts = [len(masks) for masks in songs_masks]
+    if not songs_masks:
+        return []
+    masks = np.fromiter((mask for masks in songs_masks for mask in masks), dtype=np.int64, count=sum(counts))
+    # Pitch-class histogram per song: how many chords contain each pitch class
+    bits = (masks[:, None] >> np.arange(12)) & 1
+    histograms = np.zeros((len(songs_masks), 12))
+    np.add.at(histograms, np.repeat(np.arange(len(songs_masks)), counts), bits)
+    # Correlation of every song with all 24 key profiles in one matrix product
+    correlations = _standardize(histograms) @ KEY_PROFILE_MATRIX.T / 12
+    best_keys = correlations.argmax(axis=1)
+    has_notes = histograms.any(axis=1)
+    return [(int(key), float(correlations[i, key])) if has_notes[i] else (None, 0.0)
+            for i, key in enumerate(best_keys)]
+
+
+# Function to analyse songs given as lists of chord masks: (key name, correlation, Roman-numeral progression)
+def analyze_chord_masks(songs_masks):
+    numeral_cache = {}
+    results = []
+    for masks, (key_index, score) in zip(songs_masks, estimate_keys(songs_masks)):
+        if key_index is None:
+            results.append(('', 0.0, ''))
+            continue
+        numerals = []
+        for mask in masks:
+            if mask:
+                if (mask, key_index) not in numeral_cache:
+                    numeral_cache[mask, key_index] = roman_numeral(mask, key_index)
+                numerals.append(numeral_cache[mask, key_index])
+        results.append((KEY_NAMES[key_index], score, ' '.join(numerals)))
+    return results
+
+
+# Function to reduce the chords of a song to pitch-class masks
+def song_chord_masks(song_data):
+    bits = [1 << (note % 12) for note in keyboard_midi_notes(song_data.get("number_of_octaves", 4))]
+    masks = {}  # By chord object, so the chords of an interned song are reduced once
+    for keyboard_data in song_keyboards(song_data):
+        if id(keyboard_data) not in masks:
+            masks[id(keyboard_data)] = sum({bit for bit, selected in zip(bits, keyboard_data["key_states"]) if selected})
+    return [masks[id(keyboard_data)] for keyboard_data in song_keyboards(song_data)]
+
+
+# Analysis results of songs in the app, by song content hash
+song_analysis_cache = OrderedDict()
+
+
+# Function to analyse one song, cached by its content
+def analyze_song(song_data):
+    content_hash = song_content_hash(song_data)
+    if content_hash in song_analysis_cache:
+        counters.count('analysis_cache.hits')
+    else:
+        counters.count('analysis_cache.misses')
+        song_analysis_cache[content_hash] = analyze_chord_masks([song_chord_masks(song_data)])[0]
+        while len(song_analysis_cache) > 32:
+            song_analysis_cache.popitem(last=False)
+    return song_analysis_cache[content_hash]
+
+
+# Function to read a key such as "A minor", "Am", "Eb major" or "F#" into an index into KEY_NAMES
+def parse_key_name(text):
+    match = re.fullmatch(r'\s*([A-Ga-g][#b]?)\s*(major|maj|minor|min|m)?\s*', text, re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Unknown key '{text}'.")
+    tonic = (parse_pitch_set(match.group(1)).bit_length() - 1)
+    minor = (match.group(2) or '').lower() in ('minor', 'min') or match.group(2) == 'm'
+    return tonic + 12 * minor
+
+
+class SongLibrary:
+    """SQLite index of the song files in a folder: song metadata, key analysis and the pitch-class set of every chord."""
+
+    VERSION = 2  # Older indexes are rebuilt
+
+    def __init__(self, database_path='library.sqlite'):
+        self.connection = sqlite3.connect(database_path)
+        if self.connection.execute('PRAGMA user_version').fetchone()[0] < self.VERSION:
+            self.connection.executescript("""
+                DROP TABLE IF EXISTS chords;
+                DROP TABLE IF EXISTS songs;
+            """)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS songs (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                song_name TEXT NOT NULL,
+                chord_count INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chords (
+                song_id INTEGER NOT NULL REFERENCES songs(id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                chord_name TEXT NOT NULL COLLATE NOCASE,
+                pitch_classes INTEGER NOT NULL,
+                PRIMARY KEY (song_id, position)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS key_analysis (
+                content_hash TEXT PRIMARY KEY,
+                key_name TEXT NOT NULL COLLATE NOCASE,
+                key_score REAL NOT NULL,
+                progression TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS chords_by_name ON chords(chord_name);
+            CREATE INDEX IF NOT EXISTS chords_by_pitch_classes ON chords(pitch_classes);
+            CREATE INDEX IF NOT EXISTS songs_by_content_hash ON songs(content_hash);
+        """)
+        self.connection.execute(f'PRAGMA user_version = {self.VERSION}')
+        self.connection.execute('PRAGMA foreign_keys = ON')
+
+    def close(self):
+        self.connection.close()
+
+    def rescan(self, directory):
+        # Only files whose modification time or size changed are parsed again; returns (updated, removed)
+        known = {path: (song_id, mtime, size) for song_id, path, mtime, size
+                 in self.connection.execute('SELECT id, path, mtime, size FROM songs')}
+        found = set()
+        updated = 0
+        unanalyzed = {}  # Content hash -> chord masks of changed songs
+        with self.connection:
+            for folder, _, file_names in os.walk(directory):
+                for file_name in file_names:
+                    if not file_name.lower().endswith('.json'):
+                        continue
+                    path = os.path.abspath(os.path.join(folder, file_name))
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    found.add(path)
+                    if path in known and known[path][1:] == (stat.st_mtime, stat.st_size):
+                        continue
+                    if path in known:
+                        self.connection.execute('DELETE FROM songs WHERE id = ?', (known[path][0],))
+                    indexed = self._index_song(path, stat)
+                    if indexed:
+                        unanalyzed[indexed[0]] = indexed[1]
+                        updated += 1
+            removed = [(known[path][0],) for path in known.keys() - found]
+            self.connection.executemany('DELETE FROM songs WHERE id = ?', removed)
+            self._analyze(unanalyzed)
+        return updated, len(removed)
+
+    def _index_song(self, path, stat):
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+            song_data = json.loads(content)
+            masks = song_chord_masks(song_data)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None  # Not a song file
+        content_hash = hashlib.sha256(content).hexdigest()
+        saved_keyboards = song_keyboards(song_data)
+        cursor = self.connection.execute(
+            'INSERT INTO songs (path, mtime, size, content_hash, song_name, chord_count) VALUES (?, ?, ?, ?, ?, ?)',
+            (path, stat.st_mtime, stat.st_size, content_hash,
+             song_data.get("song_name") or os.path.splitext(os.path.basename(path))[0], len(saved_keyboards)))
+        self.connection.executemany(
+            'INSERT INTO chords (song_id, position, chord_name, pitch_classes) VALUES (?, ?, ?, ?)',
+            [(cursor.lastrowid, position, keyboard_data.get("chord_name", ""), mask)
+             for position, (keyboard_data, mask) in enumerate(zip(saved_keyboards, masks))])
+        return content_hash, masks
+
+    def _analyze(self, songs_masks):
+        # Key analysis is cached by file content; new content is analysed in one batch
+        cached = set()
+        hashes = list(songs_masks)
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start:start + 500]
+            cached.update(row[0] for row in self.connection.execute(
+                f'SELECT content_hash FROM key_analysis WHERE content_hash IN ({",".join("?" * len(batch))})', batch))
+        hashes = [content_hash for content_hash in hashes if content_hash not in cached]
+        results = analyze_chord_masks([songs_masks[content_hash] for content_hash in hashes])
+        self.connection.executemany(
+            'INSERT INTO key_analysis (content_hash, key_name, key_score, progression) VALUES (?, ?, ?, ?)',
+            [(content_hash,) + result for content_hash, result in zip(hashes, results)])
+        # Forget analyses of content no song has any more
+        self.connection.execute(
+            'DELETE FROM key_analysis WHERE content_hash NOT IN (SELECT content_hash FROM songs)')
+
+    def _select_songs(self, condition='', parameters=()):
+        # Rows of (path, song name, chord count, key, correlation, Roman-numeral progression)
+        return self.connection.execute(
+            'SELECT path, song_name, chord_count, key_name, key_score, progression '
+            'FROM songs LEFT JOIN key_analysis USING (content_hash) '
+            f'{"WHERE " + condition if condition else ""} ORDER BY song_name COLLATE NOCASE',
+            parameters).fetchall()
+
+    def songs(self):
+        return self._select_songs()
+
+    def search_chord_name(self, chord_name):
+        return self._select_songs('id IN (SELECT song_id FROM chords WHERE chord_name = ?)', (chord_name.strip(),))
+
+    def search_pitch_set(self, mask, contains=False):
+        # Exact pitch-class set, or any chord that contains all of the given pitch classes
+        condition = '(pitch_classes & ?) = ?' if contains else 'pitch_classes = ?'
+        parameters = (mask, mask) if contains else (mask,)
+        return self._select_songs(f'id IN (SELECT song_id FROM chords WHERE {condition})', parameters)
+
+    def search_progression(self, chords):
+        # Consecutive chords, each given as a chord name or as a pitch-class mask
+        if not chords:
+            return []
+        joins = []
+        conditions = []
+        parameters = []
+        for i, chord in enumerate(chords):
+            if i:
+                joins.append(f'JOIN chords c{i} ON c{i}.song_id = c0.song_id AND c{i}.position = c0.position + {i}')
+            if isinstance(chord, int):
+                conditions.append(f'c{i}.pitch_classes = ?')
+            else:
+                conditions.append(f'c{i}.chord_name = ?')
+                chord = chord.strip()
+            parameters.append(chord)
+        return self._select_songs(
+            f'id IN (SELECT c0.song_id FROM chords c0 {" ".join(joins)} WHERE {" AND ".join(conditions)})', parameters)
+
+    def search_key(self, key_index):
+        return self._select_songs('key_name = ?', (KEY_NAMES[key_index],))
+
+    def search_numerals(self, numerals):
+        # Consecutive Roman numerals in the analysed progression, e.g. "ii V I"
+        pattern = ' ' + ' '.join(numerals.split()) + ' '
+        return self._select_songs("instr(' ' || progression || ' ', ?) > 0", (pattern,))
+
+
+# Function to hash a song's content, used to name uploaded songs and as the cache key of their renders
+def song_content_hash(song_data):
+    canonical = json.dumps(song_data, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+# Process pool jobs of the song server (module level, so they can be sent to worker processes)
+def pdf_job(song_data):
+    buffer = io.BytesIO()
+    render_song_pdf(song_data, buffer)
+    return buffer.getvalue()
+
+
+def audio_job(song_data, settings):
+    return wav_bytes(render_song_audio(song_data, **settings))
+
+
+class HttpError(Exception):
+    """HTTP error response of the song server."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class SongServer:
+    """Headless HTTP API for songs: upload and list, chord recognition, PDF generation and audio rendering.
+
+    The server only listens on localhost. PDF and audio renders run in a process pool, at most
+    max_concurrent_jobs at a time, and are cached by song content hash. stream.wav sends audio
+    while it is synthesized and keeps finished renders on disk for Range requests.
+    """
+
+    HOST = '127.0.0.1'
+    MAX_BODY_SIZE = 10 * 1024 * 1024
+    REASONS = {200: 'OK', 201: 'Created', 206: 'Partial Content', 400: 'Bad Request', 404: 'Not Found',
+               405: 'Method Not Allowed', 413: 'Payload Too Large', 416: 'Range Not Satisfiable',
+               500: 'Internal Server Error'}
+
+    def __init__(self, song_directory, port=8765, workers=None, max_concurrent_jobs=4, cache_size=64):
+        self.song_directory = song_directory
+        self.port = port
+        self.workers = workers
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # (content hash, job, parameters) -> response body
+        self.in_flight = {}  # Renders that are still running, shared by identical requests
+        self.executor = None
+        self.job_slots = None
+
+    def serve_forever(self):
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        server = await self.start()
+        print(f"Pianoman server listening on http://{self.HOST}:{self.port}/")
+        async with server:
+            await server.serve_forever()
+
+    async def start(self):
+        os.makedirs(self.song_directory, exist_ok=True)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.job_slots = asyncio.Semaphore(self.max_concurrent_jobs)
+        return await asyncio.start_server(self.handle_connection, self.HOST, self.port)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            try:
+                method, path, query, headers, body = await self.read_request(reader)
+                await self.route(writer, method, path, query, headers, body)
+            except HttpError as e:
+                await self.send_json(writer, {'error': e.message}, status=e.status)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            except Exception as e:
+                await self.send_json(writer, {'error': str(e)}, status=500)
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) != 3:
+            raise HttpError(400, "Malformed request line.")
+        method, target, _ = request_line
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1')
+            if line in ('\r\n', '\n', ''):
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get('content-length', 0) or 0)
+        if length > self.MAX_BODY_SIZE:
+            raise HttpError(413, "Request body too large.")
+        body = await reader.readexactly(length) if length else b''
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        return method, url.path, query, headers, body
+
+    async def route(self, writer, method, path, query, headers, body):
+        parts = [part for part in path.split('/') if part]
+        if parts == ['songs']:
+            if method == 'GET':
+                return await self.send_json(writer, self.list_songs())
+            if method == 'POST':
+                return await self.send_json(writer, self.store_song(self.parse_json(body)), status=201)
+            raise HttpError(405, "Use GET or POST.")
+        if parts == ['recognize']:
+            if method != 'POST':
+                raise HttpError(405, "Use POST.")
+            return await self.send_json(writer, self.recognize(self.parse_json(body)))
+        if len(parts) in (2, 3) and parts[0] == 'songs':
+            if method != 'GET':
+                raise HttpError(405, "Use GET.")
+            song_data = self.load_song(parts[1])
+            if len(parts) == 2:
+                return await self.send_json(writer, song_data)
+            if parts[2] == 'pdf':
+                pdf = await self.run_job(song_data, 'pdf', (), pdf_job, song_data)
+                return await self.send(writer, 200, 'application/pdf', pdf)
+            if parts[2] == 'audio.wav':
+                settings = self.audio_settings(query)
+                audio = await self.run_job(song_data, 'audio', tuple(sorted(settings.items())),
+                                           audio_job, song_data, settings)
+                return await self.send(writer, 200, 'audio/wav', audio)
+            if parts[2] == 'stream.wav':
+                settings = self.audio_settings(query)
+                cache_path = self.render_cache_path(song_data, settings)
+                if os.path.exists(cache_path):
+                    return await self.send_file_range(writer, cache_path, headers.get('range'))
+                return await self.stream_audio(writer, song_data, settings, cache_path)
+        raise HttpError(404, "Not found.")
+
+    @staticmethod
+    def parse_json(body):
+        try:
+            return json.loads(body.decode('utf-8'))
+        except (UnicodeDecodeError, ValueError):
+            raise HttpError(400, "Request body is not valid JSON.")
+
+    def song_path(self, song_id):
+        # Song ids are file names without extension; anything that could leave the directory is refused
+        if not re.fullmatch(r'[A-Za-z0-9 _.\-]+', song_id) or song_id.startswith('.'):
+            raise HttpError(404, "Song not found.")
+        return os.path.join(self.song_directory, song_id + '.json')
+
+    def list_songs(self):
+        songs = []
+        for file_name in sorted(os.listdir(self.song_directory)):
+            if file_name.endswith('.json'):
+                try:
+                    with open(os.path.join(self.song_directory, file_name), 'r') as f:
+                        song_data = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                songs.append({'id': file_name[:-5], 'song_name': song_data.get('song_name', ''),
+                              'chords': len(song_keyboards(song_data))})
+        return songs
+
+    def store_song(self, song_data):
+        if not isinstance(song_data, dict) or not isinstance(song_data.get('saved_keyboards', song_data.get('chords')), list):
+            raise HttpError(400, "A song needs a 'saved_keyboards' list or an interned 'chords' table.")
+        # Uploaded songs are named by content, so uploading the same song twice is harmless
+        song_id = song_content_hash(song_data)[:16]
+        with open(self.song_path(song_id), 'w') as f:
+            json.dump(song_data, f)
+        return {'id': song_id, 'song_name': song_data.get('song_name', '')}
+
+    def load_song(self, song_id):
+        try:
+            with open(self.song_path(song_id), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise HttpError(404, "Song not found.")
+
+    @staticmethod
+    def recognize(request):
+        # Accept MIDI notes, or key_states of a keyboard with the given number of octaves
+        if isinstance(request, dict) and 'notes' in request:
+            notes = request['notes']
+        elif isinstance(request, dict) and 'key_states' in request:
+            all_notes = keyboard_midi_notes(request.get('number_of_octaves', 4))
+            notes = [note for note, selected in zip(all_notes, request['key_states']) if selected]
+        else:
+            raise HttpError(400, "Send 'notes' or 'key_states'.")
+        return {'chord': recognize_chord_name([int(note) for note in notes])}
+
+    @staticmethod
+    def audio_settings(query):
+        try:
+            settings = {
+                'song_speed': int(query.get('song_speed', 10)),
+                'chord_speed': int(query.get('chord_speed', 0)),
+                'playback_octave': int(query.get('playback_octave', 0)),
+                'volume': float(query.get('volume', 0.5)),
+                'timbre': query.get('timbre', 'Sine'),
+            }
+        except ValueError:
+            raise HttpError(400, "Invalid audio parameter.")
+        if not 1 <= settings['song_speed'] <= 20 or not 0 <= settings['chord_speed'] <= 20 \
+                or not -4 <= settings['playback_octave'] <= 4 or not 0 <= settings['volume'] <= 1:
+            raise HttpError(400, "Audio parameter out of range.")
+        return settings
+
+    async def run_job(self, song_data, job, parameters, function, *args):
+        key = (song_content_hash(song_data), job, parameters)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            counters.count('server_cache.hits')
+            return self.cache[key]
+        counters.count('server_cache.misses')
+        # Identical requests that arrive while a render is running wait for the same result
+        if key in self.in_flight:
+            return await asyncio.shield(self.in_flight[key])
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            async with self.job_slots:
+                result = await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark as retrieved when nobody else is waiting
+            raise
+        finally:
+            del self.in_flight[key]
+        future.set_result(result)
+        self.cache[key] = result
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+
+    def render_cache_path(self, song_data, settings):
+        # Finished stream renders are kept on disk, named by song content and render settings
+        key = song_content_hash({'song': song_data, 'settings': settings})[:24]
+        return os.path.join(self.song_directory, '.renders', key + '.wav')
+
+    async def stream_audio(self, writer, song_data, settings, cache_path):
+        # Send the WAV with chunked transfer encoding while it is synthesized, so players can start right away
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temporary_path = f"{cache_path}.{os.getpid()}.{id(writer)}.part"
+        blocks = iter_song_audio_blocks(song_data, **settings)
+        loop = asyncio.get_running_loop()
+        data_size = 0
+        completed = False
+        async with self.job_slots:
+            self.write_head(writer, 200, {'Content-Type': 'audio/wav', 'Transfer-Encoding': 'chunked',
+                                          'Connection': 'close'})
+            try:
+                with open(temporary_path, 'wb') as cache_file:
+                    cache_file.write(wav_header())
+                    await self.write_chunk(writer, wav_header())
+                    while True:
+                        # Synthesis runs in a thread, so other requests are served in the meantime
+                        block = await loop.run_in_executor(None, next, blocks, None)
+                        if block is None:
+                            break
+                        data = block.astype('<i2').tobytes()
+                        cache_file.write(data)
+                        data_size += len(data)
+                        await self.write_chunk(writer, data)
+                    # The cached copy gets the real sizes, so Range requests know the length
+                    cache_file.seek(0)
+                    cache_file.write(wav_header(data_size))
+                await self.write_chunk(writer, b'')
+                os.replace(temporary_path, cache_path)
+                completed = True
+            finally:
+                if not completed and os.path.exists(temporary_path):
+                    os.remove(temporary_path)
+
+    async def send_file_range(self, writer, file_path, range_header):
+        # Cached renders cost no CPU: bytes are copied from disk, honouring a single "bytes=" range
+        file_size = os.path.getsize(file_path)
+        start, end, status = 0, file_size - 1, 200
+        if range_header:
+            match = re.fullmatch(r'bytes=(\d*)-(\d*)', range_header.strip())
+            if not match or match.groups() == ('', ''):
+                raise HttpError(416, "Invalid range.")
+            first, last = match.groups()
+            if first:
+                start = int(first)
+                end = min(int(last), file_size - 1) if last else file_size - 1
+            else:
+                start = max(0, file_size - int(last))
+            if start > end or start >= file_size:
+                self.write_head(writer, 416, {'Content-Range': f"bytes */{file_size}", 'Content-Length': '0',
+                                              'Connection': 'close'})
+                return await writer.drain()
+            status = 206
+        headers = {'Content-Type': 'audio/wav', 'Content-Length': str(end - start + 1), 'Accept-Ranges': 'bytes',
+                   'Connection': 'close'}
+        if status == 206:
+            headers['Content-Range'] = f"bytes {start}-{end}/{file_size}"
+        self.write_head(writer, status, headers)
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                data = f.read(min(remaining, 65536))
+                if not data:
+                    break
+                writer.write(data)
+                remaining -= len(data)
+                await writer.drain()
+
+    def write_head(self, writer, status, headers):
+        head = f"HTTP/1.1 {status} {self.REASONS.get(status, '')}\r\n"
+        head += ''.join(f"{name}: {value}\r\n" for name, value in headers.items()) + '\r\n'
+        writer.write(head.encode('latin-1'))
+
+    @staticmethod
+    async def write_chunk(writer, data):
+        # An empty chunk ends the chunked body
+        writer.write(f"{len(data):X}\r\n".encode('latin-1') + data + b'\r\n')
+        await writer.drain()
+
+    async def send(self, writer, status, content_type, body, extra_headers=None):
+        headers = {'Content-Type': content_type, 'Content-Length': str(len(body)), 'Connection': 'close'}
+        headers.update(extra_headers or {})
+        self.write_head(writer, status, headers)
+        writer.write(body)
+        await writer.drain()
+
+    async def send_json(self, writer, data, status=200):
+        await self.send(writer, status, 'application/json', json.dumps(data).encode('utf-8'))
+
+
+# Function to time a function: per-call seconds over `repeat` rounds of `number` calls each
+def time_function(function, repeat=5, number=1):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number)
+    return {'min': min(timings), 'median': float(np.median(timings)), 'mean': float(np.mean(timings)),
+            'repeat': repeat, 'number': number}
+
+
+# Function to build a song with a repeating progression, for benchmarks
+def benchmark_song(chords, octaves=4):
+    highest = 48 + octaves * 12 - 1
+    all_notes = keyboard_midi_notes(octaves)
+    progression = [(symbol, chord_symbol_notes(symbol, 48, highest)) for symbol in ["C", "Am7", "Fmaj7", "G7", "Dm9"]]
+    return {
+        "song_name": f"Benchmark {chords}",
+        "saved_keyboards": [{"chord_name": symbol, "key_states": [note in notes for note in all_notes]}
+                            for symbol, notes in (progression[i % len(progression)] for i in range(chords))],
+        "number_of_octaves": octaves
+    }
+
+
+# Function to measure the timing of the prerendered, deadline-scheduled song playback loop on a capture backend
+def measure_playback_jitter(chords=40, period=0.05):
+    global audio_backend
+    capture = CaptureAudioBackend(keep_audio=False)
+    previous_backend, audio_backend = audio_backend, capture
+    try:
+        frequencies = [[440 * 2 ** ((note - 69) / 12) for note in chord] for chord in
+                       ([60, 64, 67], [57, 60, 64, 67], [53, 57, 60, 64], [55, 59, 62, 65])]
+        prerenderer = ChordPrerenderer(render_chord_pc, [frequencies[i % 4] for i in range(chords)])
+        prerenderer.start()
+        next_due = time.perf_counter() + 0.1  # Let the prerenderer fill its queue
+        for _ in range(chords):
+            # The same sleep strategy as PianoApp._wait_until
+            while time.perf_counter() < next_due:
+                time.sleep(min(next_due - time.perf_counter(), 0.01))
+            audio = prerenderer.get()
+            audio_backend.play_buffer(audio, 1, 2, 44100)
+            next_due += period
+        prerenderer.stop()
+    finally:
+        audio_backend = previous_backend
+    return timing_jitter(capture.timestamps(), period)
+
+
+# Function to run the GUI benchmarks; needs a display (e.g. Xvfb) and is skipped without one
+def run_gui_benchmarks(results, quick=False):
+    global audio_backend
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        results['gui'] = {'skipped': str(e)}
+        return
+    # The app reads and writes settings.ini and library.sqlite in the working directory
+    working_directory = os.getcwd()
+    benchmark_directory = tempfile.mkdtemp()
+    os.chdir(benchmark_directory)
+    previous_backend, audio_backend = audio_backend, CaptureAudioBackend(keep_audio=False)
+    try:
+        app = PianoApp(root)
+        app.output_method.set("PC Audio")
+        root.update()
+        results['draw_piano'] = time_function(lambda: (app.draw_piano(), root.update_idletasks()), repeat=5)
+        song = benchmark_song(50 if quick else 200, app.octaves)
+
+        def create_saved_chords():
+            app.song_saved = True  # Skip the save prompt of new_song
+            app.new_song()
+            for keyboard_data in song["saved_keyboards"]:
+                app.add_saved_keyboard(keyboard_data["chord_name"], keyboard_data["key_states"])
+            root.update_idletasks()
+
+        results[f'create_saved_chords_{len(song["saved_keyboards"])}'] = time_function(create_saved_chords, repeat=3)
+
+        # Real song playback, timed through the capture backend
+        app.song_speed.set(20)
+        app.chord_speed.set(0)
+        del app.saved_keyboards[20:]
+        app.is_playing_song = True
+        app._play_song_thread()
+        results['song_playback_jitter'] = timing_jitter(audio_backend.timestamps(), 2.0 / app.song_speed.get())
+    finally:
+        audio_backend = previous_backend
+        root.destroy()
+        os.chdir(working_directory)
+
+
+# Function to run the benchmark suite; returns the results document that is stored as JSON
+def run_benchmarks(quick=False):
+    global audio_backend
+    results = {}
+    frequencies = [261.63, 329.63, 392.0, 493.88]
+
+    # Synthesis, with PC audio sent to the null backend
+    previous_backend, audio_backend = audio_backend, NullAudioBackend()
+    try:
+        results['play_note_pc'] = time_function(lambda: play_note_pc(440.0), repeat=5, number=20)
+        results['play_chord_pc_4_voices'] = time_function(lambda: play_chord_pc(frequencies), repeat=5, number=20)
+        results['render_arpeggio_pc_4_voices'] = time_function(
+            lambda: render_arpeggio_pc(frequencies, 0.1), repeat=5, number=10)
+    finally:
+        audio_backend = previous_backend
+
+    # Chord recognition
+    rng = np.random.default_rng(0)
+    chords = [sorted(set(rng.integers(48, 96, size=rng.integers(2, 6)).tolist())) for _ in range(1000)]
+    results['recognize_chord_name_1000'] = time_function(
+        lambda: [recognize_chord_name(chord) for chord in chords], repeat=5)
+    results['chord_symbol_notes_1000'] = time_function(
+        lambda: [chord_symbol_notes(symbol) for symbol in ["F#m7b5", "Bbmaj7", "C/E", "G13"] * 250], repeat=5)
+
+    # Song files, in the format and the way save_song and load_song read and write them
+    directory = tempfile.mkdtemp()
+    for chord_count in (10, 1000) if quick else (10, 1000, 100000):
+        song = benchmark_song(chord_count)
+        file_path = os.path.join(directory, f"song_{chord_count}.json")
+        repeat = 3 if chord_count >= 100000 else 10
+
+        def save():
+            with open(file_path, 'w') as f:
+                json.dump(song, f)
+
+        def load():
+            with open(file_path, 'r') as f:
+                json.load(f)
+
+        results[f'song_save_{chord_count}'] = time_function(save, repeat=repeat)
+        results[f'song_load_{chord_count}'] = time_function(load, repeat=repeat)
+
+    # PDF chord sheets of long songs
+    for chord_count in (100,) if quick else (100, 2000):
+        song = benchmark_song(chord_count)
+        results[f'render_song_pdf_{chord_count}'] = time_function(
+            lambda: render_song_pdf(song, io.BytesIO()), repeat=3)
+
+    # Playback scheduling
+    results['playback_jitter'] = measure_playback_jitter(chords=20 if quick else 60)
+
+    run_gui_benchmarks(results, quick)
+
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'quick': quick,
+        'results': results,
+    }
+
+
+# Function to compare benchmark results with a previous run; returns the names that got slower than threshold.
+# Differences below min_difference seconds are timer noise and never count.
+def compare_benchmarks(current, previous, threshold=1.2, min_difference=0.0002):
+    regressions = []
+    print(f"{'benchmark':<36}{'previous':>12}{'current':>12}{'ratio':>8}")
+    for name, result in current['results'].items():
+        old = previous.get('results', {}).get(name)
+        # Timings compare medians, jitter measurements compare the standard deviation
+        metric = 'median' if 'median' in result else 'jitter_std' if 'jitter_std' in result else None
+        if metric is None or not old or metric not in old:
+            continue
+        ratio = result[metric] / old[metric] if old[metric] else float('inf')
+        slower = ratio > threshold and result[metric] - old[metric] > min_difference
+        print(f"{name:<36}{old[metric] * 1000:>10.3f}ms{result[metric] * 1000:>10.3f}ms{ratio:>8.2f}"
+              f"{'  SLOWER' if slower else ''}")
+        if slower:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pianoman chord editor")
+    parser.add_argument('--serve', action='store_true', help="run the headless HTTP API on localhost instead of the GUI")
+    parser.add_argument('--port', type=int, default=8765, help="port of the HTTP API (default 8765)")
+    parser.add_argument('--songs', default='songs', help="directory with the songs served by the HTTP API")
+    parser.add_argument('--workers', type=int, default=None, help="number of render worker processes")
+    parser.add_argument('--max-jobs', type=int, default=4, help="maximum number of renders running at once")
+    parser.add_argument('--audio-backend', choices=['simpleaudio', 'null', 'capture'], default=None,
+                        help="where PC audio goes (default simpleaudio when installed)")
+    parser.add_argument('--midi-backend', choices=['mido', 'null', 'capture'], default=None,
+                        help="where MIDI output goes (default mido when python-rtmidi is installed)")
+    parser.add_argument('--capture-file', default='capture.json',
+                        help="JSON file for what the capture backends recorded (written on exit)")
+    parser.add_argument('--trace', metavar='FILE', help="trace latency and write a Chrome trace to FILE on exit")
+    parser.add_argument('--songbook', metavar='FILE', help="compile a songbook into a PDF instead of starting the GUI")
+    parser.add_argument('--songbook-output', metavar='PDF', help="PDF file for --songbook (default next to the songbook)")
+    parser.add_argument('--profile', choices=['counters', 'cprofile', 'sampling'],
+                        help="count subsystem activity, optionally profiling load/export/play actions")
+    parser.add_argument('--profile-dir', default='profiles',
+                        help="directory for the counters and profiles written in profiling mode")
+    parser.add_argument('--benchmark', action='store_true', help="run the benchmark suite instead of the GUI")
+    parser.add_argument('--benchmark-output', default='benchmark.json', help="JSON file for the benchmark results")
+    parser.add_argument('--compare', metavar='PREVIOUS', help="compare the benchmark results with a previous run")
+    parser.add_argument('--quick', action='store_true', help="run smaller benchmark sizes")
+    args = parser.parse_args()
+    if args.midi_backend == 'mido' and not rtmidi:
+        parser.error("The 'python-rtmidi' library is required for MIDI functionality.")
+
+    if args.benchmark:
+        results = run_benchmarks(quick=args.quick)
+        with open(args.benchmark_output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Benchmark results saved to '{args.benchmark_output}'.")
+        if args.compare:
+            with open(args.compare, 'r') as f:
+                previous = json.load(f)
+            regressions = compare_benchmarks(results, previous)
+            if regressions:
+                print(f"{len(regressions)} benchmarks got slower: {', '.join(regressions)}")
+                sys.exit(1)
+        return
+
+    if args.songbook:
+        pdf_path = args.songbook_output or os.path.splitext(args.songbook)[0] + '.pdf'
+        result = build_songbook_pdf(args.songbook, pdf_path, workers=args.workers)
+        print(f"Songbook saved to '{pdf_path}': {result['songs']} songs, {result['pages']} pages, "
+              f"{result['rendered']} drawn, {result['cached']} from the cache.")
+        return
+
+    if args.serve:
+        SongServer(args.songs, port=args.port, workers=args.workers, max_concurrent_jobs=args.max_jobs).serve_forever()
+        return
+
+    global audio_backend, midi_backend
+    if args.audio_backend:
+        audio_backend = {'simpleaudio': SimpleaudioBackend, 'null': NullAudioBackend,
+                         'capture': CaptureAudioBackend}[args.audio_backend]()
+    if args.midi_backend:
+        midi_backend = {'mido': MidoBackend, 'null': NullMidiBackend, 'capture': CaptureMidiBackend}[args.midi_backend]()
+
+    global tracer_forced
+    if args.trace:
+        tracer_forced = tracer.enabled = True
+
+    global profiling_forced, profiler_mode, profile_directory
+    profile_directory = args.profile_dir
+    if args.profile:
+        profiling_forced = counters.enabled = True
+        profiler_mode = {'counters': 'Off', 'cprofile': 'cProfile', 'sampling': 'Sampling'}[args.profile]
+
+    root = tk.Tk()
+    app = PianoApp(root)
+    root.mainloop()
+
+    if args.trace:
+        tracer.export_chrome_trace(args.trace)
+
+    if args.profile:
+        os.makedirs(profile_directory, exist_ok=True)
+        counters_path = os.path.join(profile_directory, f"counters-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        counters.dump(counters_path)
+        print(f"Counters saved to '{counters_path}'.")
+
+    if args.audio_backend == 'capture' or args.midi_backend == 'capture':
+        save_capture(args.capture_file,
+                     audio_backend if isinstance(audio_backend, CaptureAudioBackend) else None,
+                     midi_backend if isinstance(midi_backend, CaptureMidiBackend) else None)
+
+
+if __name__ == "__main__":
+    main()
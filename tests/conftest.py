@@ -0,0 +1,18 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+MODULE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Pianoman-v1.0.py')
+
+
+@pytest.fixture(scope='session')
+def pianoman():
+    # The application is a single script whose name is not importable, so it is loaded from its path
+    if 'pianoman' not in sys.modules:
+        spec = importlib.util.spec_from_file_location('pianoman', MODULE_PATH)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules['pianoman'] = module
+        spec.loader.exec_module(module)
+    return sys.modules['pianoman']
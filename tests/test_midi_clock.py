@@ -0,0 +1,41 @@
+import mido
+
+
+def feed_clock(follower, start, ticks, period):
+    for tick in range(ticks):
+        follower.handle(mido.Message('clock'), start + tick * period)
+    return start + (ticks - 1) * period
+
+
+def test_follows_steady_clock(pianoman):
+    follower = pianoman.MidiClockFollower()
+    follower.handle(mido.Message('start'), 0.0)
+    feed_clock(follower, 0.0, 48, 60 / 120 / 24)
+    assert abs(follower.bpm() - 120) < 0.1
+
+
+def test_stop_continue_keeps_tempo(pianoman):
+    period = 60 / 120 / 24
+    follower = pianoman.MidiClockFollower()
+    follower.handle(mido.Message('start'), 0.0)
+    last = feed_clock(follower, 0.0, 48, period)
+    follower.handle(mido.Message('stop'), last + period / 2)
+    # A five second pause, then the clock carries on where it stopped
+    resume = last + 5.0
+    follower.handle(mido.Message('continue'), resume)
+    feed_clock(follower, resume, 48, period)
+    assert abs(follower.bpm() - 120) < 0.1
+    predicted = follower.wait_for_tick(follower.tick + 24, follower.generation, lambda: True)
+    assert abs(predicted - (resume + (47 + 24) * period)) < 0.001
+
+
+def test_wait_for_tick_waits_for_the_first_tick_after_continue(pianoman):
+    period = 60 / 120 / 24
+    follower = pianoman.MidiClockFollower()
+    follower.handle(mido.Message('start'), 0.0)
+    feed_clock(follower, 0.0, 24, period)
+    follower.handle(mido.Message('stop'), 1.0)
+    follower.handle(mido.Message('continue'), 2.0)
+    # Without a tick since the continue message the phase is unknown
+    waits = iter([True, False])
+    assert follower.wait_for_tick(follower.tick, follower.generation, lambda: next(waits)) is None